@@ -0,0 +1,104 @@
+import os
+import json
+from pathlib import Path
+
+# --- Account Configuration ---
+# Optional. Without it every category has one account named after the category,
+# with credentials in <CATEGORY>_EMAIL / _USERNAME / _PASSWORD as before.
+ACCOUNTS_FILE = Path(os.getenv("ACCOUNTS_FILE", "accounts.json"))
+# Posts plus schedules one account may make in 24 hours, unless its entry sets "daily_limit"
+ACCOUNT_DAILY_LIMIT = int(os.getenv("ACCOUNT_DAILY_LIMIT", "100"))
+# Which account each queued row was given, so a retried row goes back to the same account
+SHARD_ASSIGNMENTS_FILE = Path(os.getenv("SHARD_ASSIGNMENTS_FILE", str(Path("state") / "shard_assignments.json")))
+
+# Example accounts.json:
+# {
+#   "news": [
+#     {"name": "news", "env_prefix": "NEWS"},
+#     {"name": "news_2", "env_prefix": "NEWS_2", "daily_limit": 50}
+#   ]
+# }
+
+
+class Account:
+    """One X account. Its browser profile, OTP file and caches live under ./<name>/."""
+
+    def __init__(self, category: str, name: str, env_prefix: str, daily_limit: int = ACCOUNT_DAILY_LIMIT):
+        self.category = category
+        self.name = name
+        self.env_prefix = env_prefix
+        self.daily_limit = daily_limit
+
+    def credentials(self):
+        """(email, username, password), or None if any of them is missing."""
+        values = [os.getenv(f"{self.env_prefix}_{field}") or "" for field in ("EMAIL", "USERNAME", "PASSWORD")]
+        return tuple(values) if all(values) else None
+
+    def __repr__(self):
+        return f"Account({self.category}/{self.name})"
+
+
+def load_accounts(categories: list, path: Path = ACCOUNTS_FILE) -> dict:
+    """Returns {category: [Account, ...]} for every category, from `path` or the env convention."""
+    try:
+        config = json.loads(Path(path).read_text(encoding="utf-8"))
+    except FileNotFoundError:
+        config = {}
+    accounts = {}
+    for category in categories:
+        entries = config.get(category) or [{"name": category, "env_prefix": category.upper()}]
+        accounts[category] = [
+            Account(
+                category,
+                entry["name"],
+                entry.get("env_prefix") or entry["name"].upper(),
+                int(entry.get("daily_limit", ACCOUNT_DAILY_LIMIT)),
+            )
+            for entry in entries
+        ]
+    return accounts
+
+
+def load_assignments(path: Path = SHARD_ASSIGNMENTS_FILE) -> dict:
+    try:
+        return json.loads(Path(path).read_text(encoding="utf-8"))
+    except (OSError, json.JSONDecodeError):
+        return {}
+
+
+def save_assignments(assignments: dict, path: Path = SHARD_ASSIGNMENTS_FILE):
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_suffix(".json.tmp")
+    tmp_path.write_text(json.dumps(assignments, indent=2), encoding="utf-8")
+    os.replace(tmp_path, path)
+
+
+def shard(rows: list, accounts: list, used: dict, assignments: dict = None) -> tuple:
+    """
+    Splits a category's rows across `accounts` (already filtered to healthy
+    ones). Each row goes to the account with the most headroom left, that is
+    its daily limit minus what `used` says it posted in the last 24 hours
+    minus what this split has already given it. Row order is kept within
+    each account.
+
+    A row already in `assignments` (str row id -> account name) only goes
+    back to that account, and waits if it is unusable or full this time:
+    scheduled posts are reconciled per account, so moving a row could
+    schedule it twice. New assignments are added to `assignments`.
+    Returns ({account name: rows}, rows that have to wait).
+    """
+    assignments = {} if assignments is None else assignments
+    headroom = {account.name: account.daily_limit - used.get(account.name, 0) for account in accounts}
+    shards = {account.name: [] for account in accounts}
+    overflow = []
+    for row in rows:
+        row_id = str(row.get("id"))
+        name = assignments.get(row_id) or max(headroom, key=headroom.get, default=None)
+        if name not in headroom or headroom[name] <= 0:
+            overflow.append(row)
+            continue
+        shards[name].append(row)
+        headroom[name] -= 1
+        assignments[row_id] = name
+    return shards, overflow
@@ -0,0 +1,114 @@
+import os
+import re
+import sys
+import json
+import hashlib
+import threading
+from pathlib import Path
+
+# --- Asset Cache Configuration ---
+ASSET_CACHE = os.getenv("ASSET_CACHE", "1") == "1"
+ASSET_CACHE_DIR = Path(os.getenv("ASSET_CACHE_DIR", "asset_cache"))
+ASSET_CACHE_MAX_MB = int(os.getenv("ASSET_CACHE_MAX_MB", "200"))
+
+# X's web client bundles carry a content hash in the file name (main.3f2a9c1e.js), so a URL
+# never changes content and can be served from disk without revalidation.
+IMMUTABLE_ASSET_PATTERN = re.compile(
+    r"^https://abs\.twimg\.com/[^?#]+[.-][0-9a-f]{8,}\.(?:js|css|woff2?|svg|png|ico)(?:\?[^#]*)?$"
+)
+# Response headers worth replaying; the rest describe the original transfer
+KEPT_HEADERS = {"content-type", "cache-control", "access-control-allow-origin", "timing-allow-origin"}
+
+
+class AssetCache:
+    """
+    On-disk cache for X's content-hashed static bundles, served through
+    Playwright request interception. Each entry is a body file plus a small
+    header file. Hits refresh the body's mtime, and `prune()` evicts the
+    least recently used entries once the cache is over its size cap.
+    """
+
+    def __init__(self, root: Path = ASSET_CACHE_DIR, max_bytes: int = ASSET_CACHE_MAX_MB * 1024 * 1024):
+        self.root = Path(root)
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.hit_bytes = 0
+        self._lock = threading.Lock()
+
+    def _paths(self, url: str):
+        key = hashlib.sha256(url.encode("utf-8")).hexdigest()
+        folder = self.root / key[:2]
+        return folder / f"{key}.body", folder / f"{key}.json"
+
+    def attach(self, context):
+        """Routes every immutable asset request of `context` through the cache."""
+        if not ASSET_CACHE:
+            return
+        context.route(IMMUTABLE_ASSET_PATTERN, self._handle)
+
+    def _handle(self, route):
+        url = route.request.url
+        body_path, meta_path = self._paths(url)
+        if body_path.exists() and meta_path.exists():
+            try:
+                body = body_path.read_bytes()
+                headers = json.loads(meta_path.read_text(encoding="utf-8"))
+                os.utime(body_path)
+            except (OSError, json.JSONDecodeError):
+                pass
+            else:
+                with self._lock:
+                    self.hits += 1
+                    self.hit_bytes += len(body)
+                route.fulfill(status=200, headers=headers, body=body)
+                return
+
+        with self._lock:
+            self.misses += 1
+        try:
+            response = route.fetch()
+        except Exception:
+            # Let the browser make (and fail) the request itself
+            route.continue_()
+            return
+        if response.status == 200:
+            try:
+                self._store(body_path, meta_path, response.body(), response.headers)
+            except OSError as e:
+                print(f"⚠️ Could not cache {url}: {e}", file=sys.stderr)
+        route.fulfill(response=response)
+
+    @staticmethod
+    def _store(body_path: Path, meta_path: Path, body: bytes, headers: dict):
+        body_path.parent.mkdir(parents=True, exist_ok=True)
+        kept = {name: value for name, value in headers.items() if name.lower() in KEPT_HEADERS}
+        for path, data in ((meta_path, json.dumps(kept).encode("utf-8")), (body_path, body)):
+            tmp_path = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+            tmp_path.write_bytes(data)
+            os.replace(tmp_path, path)
+
+    def prune(self):
+        """Evicts least recently used entries until the cache fits in its size cap."""
+        if not self.root.exists():
+            return
+        entries = []
+        total = 0
+        for body_path in self.root.glob("*/*.body"):
+            try:
+                stat = body_path.stat()
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, body_path))
+            total += stat.st_size
+        evicted = 0
+        for _, size, body_path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            body_path.unlink(missing_ok=True)
+            body_path.with_suffix(".json").unlink(missing_ok=True)
+            total -= size
+            evicted += 1
+        if self.hits or self.misses or evicted:
+            print(f"📦 Asset cache: {self.hits} hit(s) ({self.hit_bytes / 1024 / 1024:.1f} MB served), "
+                  f"{self.misses} miss(es), {evicted} evicted, {total / 1024 / 1024:.1f} MB on disk.")
@@ -0,0 +1,127 @@
+import os
+import time
+from pathlib import Path
+
+# --- Browser Launch Configuration ---
+# "full" is Chromium's defaults; "lite" trims what a headless bot never uses
+BROWSER_PROFILE = os.getenv("BROWSER_PROFILE", "full")
+
+LITE_ARGS = [
+    "--disable-gpu",
+    "--disable-dev-shm-usage",
+    "--disable-extensions",
+    "--disable-background-networking",
+    "--disable-component-update",
+    "--disable-default-apps",
+    "--disable-sync",
+    "--disable-breakpad",
+    "--disable-domain-reliability",
+    "--disable-features=Translate,MediaRouter,OptimizationHints,AutofillServerCommunication,InterestFeedContentSuggestions",
+    "--metrics-recording-only",
+    "--mute-audio",
+    "--no-first-run",
+    "--no-default-browser-check",
+    "--renderer-process-limit=2",
+]
+# Still wide enough for X to keep the side navigation with the compose button
+LITE_VIEWPORT = {"width": 1024, "height": 700}
+
+# Near-zero durations rather than `animation: none` or 0s: a 0s transition never fires
+# transitionend, and X's dialogs wait for animationend/transitionend before they settle
+NO_ANIMATIONS_SCRIPT = """
+(() => {
+  const css = `*, *::before, *::after {
+    animation-duration: 0.001s !important; animation-delay: 0s !important;
+    transition-duration: 0.001s !important; transition-delay: 0s !important;
+    scroll-behavior: auto !important; }`;
+  const add = () => {
+    const style = document.createElement("style");
+    style.textContent = css;
+    (document.head || document.documentElement).appendChild(style);
+  };
+  if (document.documentElement) add();
+  else document.addEventListener("DOMContentLoaded", add);
+})();
+"""
+
+
+def launch_context(playwright, user_data_dir: Path, viewport: dict, **kwargs):
+    """
+    Launches the persistent Chromium context for `user_data_dir` with the
+    BROWSER_PROFILE settings. `viewport` applies to the full profile only;
+    extra keyword arguments go straight to Playwright. Returns
+    (context, launch seconds).
+    """
+    started = time.monotonic()
+    if BROWSER_PROFILE == "lite":
+        kwargs.setdefault("args", LITE_ARGS)
+        kwargs.setdefault("reduced_motion", "reduce")
+        kwargs.setdefault("device_scale_factor", 1)
+        viewport = LITE_VIEWPORT
+    context = playwright.chromium.launch_persistent_context(
+        user_data_dir=str(user_data_dir),
+        headless=True,
+        viewport=viewport,
+        **kwargs,
+    )
+    if BROWSER_PROFILE == "lite":
+        context.add_init_script(NO_ANIMATIONS_SCRIPT)
+    launch_s = time.monotonic() - started
+    print(f"🌐 Chromium ({BROWSER_PROFILE} profile) launched in {launch_s:.1f}s")
+    return context, launch_s
+
+
+def _process_memory_bytes(pid: str) -> int:
+    # PSS splits shared pages between Chromium's processes, so their sum is not inflated
+    try:
+        for line in Path(f"/proc/{pid}/smaps_rollup").read_text().splitlines():
+            if line.startswith("Pss:"):
+                return int(line.split()[1]) * 1024
+    except (OSError, ValueError, IndexError):
+        pass
+    try:
+        return int(Path(f"/proc/{pid}/statm").read_text().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        return 0
+
+
+def browser_memory_mb():
+    """
+    Memory of the Chromium processes under this one, in MB, read from /proc.
+    Playwright's node driver is left out. None where /proc is not available.
+    """
+    proc = Path("/proc")
+    if not proc.is_dir():
+        return None
+    parents = {}
+    names = {}
+    for entry in proc.iterdir():
+        if not entry.name.isdigit():
+            continue
+        try:
+            stat = (entry / "stat").read_text()
+        except OSError:
+            continue
+        # The command name is in parentheses and may itself contain spaces
+        name_end = stat.rfind(")")
+        names[entry.name] = stat[stat.find("(") + 1:name_end]
+        parents[entry.name] = stat[name_end + 2:].split()[1]
+
+    descendants = set()
+    frontier = {str(os.getpid())}
+    while frontier:
+        frontier = {pid for pid, parent in parents.items() if parent in frontier} - descendants
+        descendants |= frontier
+    total = sum(_process_memory_bytes(pid) for pid in descendants if names.get(pid) != "node")
+    return total / 1024 / 1024
+
+
+def report_memory(label: str, metrics=None, **labels):
+    """Prints the browser's current memory and, given a MetricsRegistry, records it as a gauge."""
+    memory_mb = browser_memory_mb()
+    if memory_mb is None:
+        return None
+    print(f"🧠 Chromium memory at {label}: {memory_mb:.0f} MB")
+    if metrics is not None:
+        metrics.set("twitterbot_browser_memory_bytes", memory_mb * 1024 * 1024, at=label, **labels)
+    return memory_mb
@@ -0,0 +1,92 @@
+import os
+import re
+
+from dedup import PLACEHOLDER_TITLES, normalize_title
+
+# --- Composition Configuration ---
+# Per-category templates can be overridden with <CATEGORY>_TWEET_TEMPLATE, e.g. FORMULA_TWEET_TEMPLATE
+DEFAULT_TEMPLATE = '"{title}"\n\n{url}'
+CATEGORY_TEMPLATES = {}
+MAX_WEIGHTED_LENGTH = 280
+# t.co wraps every link, so X counts each URL as this many characters whatever its length
+URL_WEIGHT = 23
+ELLIPSIS = "…"
+MIN_TITLE_CHARS = 12
+
+URL_PATTERN = re.compile(r"https?://\S+")
+# twitter-text v3: code points in these ranges weigh 1, everything else (CJK, emoji, ...) weighs 2
+LIGHT_RANGES = ((0x0000, 0x10FF), (0x2000, 0x200D), (0x2010, 0x201F), (0x2032, 0x2037))
+
+
+class ComposeError(ValueError):
+    """The item cannot become a valid tweet; raised before any browser work."""
+
+
+def template_for(category: str) -> str:
+    return os.getenv(f"{(category or '').upper()}_TWEET_TEMPLATE") or CATEGORY_TEMPLATES.get(category, DEFAULT_TEMPLATE)
+
+
+def _char_weight(char: str) -> int:
+    code = ord(char)
+    return 1 if any(low <= code <= high for low, high in LIGHT_RANGES) else 2
+
+
+def weighted_length(text: str) -> int:
+    """Length of `text` as X counts it: URLs are 23, wide characters 2, the rest 1."""
+    length = 0
+    position = 0
+    for match in URL_PATTERN.finditer(text):
+        length += sum(_char_weight(c) for c in text[position:match.start()]) + URL_WEIGHT
+        position = match.end()
+    return length + sum(_char_weight(c) for c in text[position:])
+
+
+def truncate_title(title: str, budget: int) -> str:
+    """Cuts `title` to at most `budget` weighted characters, at a word boundary where possible."""
+    if weighted_length(title) <= budget:
+        return title
+    room = budget - weighted_length(ELLIPSIS)
+    cut, used = 0, 0
+    for index, char in enumerate(title):
+        used += _char_weight(char)
+        if used > room:
+            break
+        cut = index + 1
+    shortened = title[:cut]
+    boundary = shortened.rfind(" ")
+    # Only fall back to a mid-word cut when the last space would throw most of the title away
+    if boundary >= cut // 2:
+        shortened = shortened[:boundary]
+    return shortened.rstrip(" ,;:-–—") + ELLIPSIS
+
+
+def compose(item: dict) -> str:
+    """Renders the tweet for one queue row, or raises ComposeError if it should not be posted."""
+    title = (item.get("title") or "").strip()
+    url = (item.get("url") or "").strip()
+    if not url or not item.get("time"):
+        raise ComposeError("missing URL/time")
+    if normalize_title(title) in PLACEHOLDER_TITLES:
+        raise ComposeError(f"placeholder title {title!r}")
+
+    template = template_for(item.get("bot"))
+    title = " ".join(title.split())
+    budget = MAX_WEIGHTED_LENGTH - weighted_length(template.format(title="", url=url))
+    if budget < MIN_TITLE_CHARS:
+        raise ComposeError(f"template leaves only {budget} characters for the title")
+    return template.format(title=truncate_title(title, budget), url=url)
+
+
+def compose_batch(rows: list):
+    """
+    Composes every row up front. Returns (ready_rows, rejected) where each
+    ready row carries its text in "tweet_text" and `rejected` is a list of
+    (row, reason) pairs.
+    """
+    ready, rejected = [], []
+    for row in rows:
+        try:
+            ready.append(dict(row, tweet_text=compose(row)))
+        except (ComposeError, KeyError, IndexError) as e:
+            rejected.append((row, str(e)))
+    return ready, rejected
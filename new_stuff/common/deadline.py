@@ -0,0 +1,72 @@
+import os
+import time
+from datetime import datetime, timedelta
+
+import pytz
+
+# --- Deadline Configuration ---
+# Time kept back at the end for acking, history and the workflow's commit step
+DEADLINE_RESERVE_S = int(os.getenv("DEADLINE_RESERVE_S", "120"))
+ESTIMATE_DAYS = int(os.getenv("DEADLINE_ESTIMATE_DAYS", "14"))
+# Used until the run history has timings for a category
+DEFAULT_COSTS = {"session": 60.0, "posted": 30.0, "scheduled": 45.0}
+TIMEZONE = pytz.timezone("Asia/Kolkata")
+POST_NOW_WINDOW = timedelta(minutes=5)
+
+
+def item_step(row: dict) -> str:
+    """'posted' or 'scheduled', decided the same way process_bot.py decides it."""
+    time_str = (row.get("time") or "").split("+")[0]
+    try:
+        item_time = TIMEZONE.localize(datetime.fromisoformat(time_str))
+    except ValueError:
+        return "posted"
+    return "posted" if item_time <= datetime.now(TIMEZONE) + POST_NOW_WINDOW else "scheduled"
+
+
+class DeadlinePlanner:
+    """
+    Orders a run's work to finish as many items as possible before a
+    deadline. Costs are the p95 of recent timings per category and step, so
+    an estimate is rarely too low. Categories with the most items per second
+    (their session cost spread over their items) go first, and post-now
+    items go before scheduled ones inside a category.
+    """
+
+    def __init__(self, deadline_ts: float, history=None):
+        self.deadline_ts = deadline_ts
+        self.costs = {}
+        if history is not None:
+            for category, step, _count, _p50, p95 in history.step_stats(ESTIMATE_DAYS):
+                self.costs[(category, step)] = p95
+
+    def cost(self, category: str, step: str) -> float:
+        return self.costs.get((category, step), DEFAULT_COSTS[step])
+
+    def item_cost(self, category: str) -> float:
+        """Worst-case cost of one item, which the bot checks before starting each item."""
+        return max(self.cost(category, "posted"), self.cost(category, "scheduled"))
+
+    def remaining(self) -> float:
+        """Seconds left for bot work, after the reserve."""
+        return self.deadline_ts - DEADLINE_RESERVE_S - time.time()
+
+    def can_start(self, category: str) -> bool:
+        """True if there is time to open the category's session and finish one item."""
+        return self.remaining() >= self.cost(category, "session") + self.item_cost(category)
+
+    def order(self, categorized: dict) -> list:
+        """Returns the categories with work, best throughput first, each with its items reordered."""
+        plans = []
+        for category, rows in categorized.items():
+            if not rows:
+                continue
+            steps = {id(row): item_step(row) for row in rows}
+            ordered = sorted(rows, key=lambda row: (steps[id(row)] != "posted", row.get("time") or ""))
+            total = self.cost(category, "session") + sum(self.cost(category, steps[id(row)]) for row in rows)
+            plans.append((len(rows) / total, category, ordered))
+        plans.sort(key=lambda plan: -plan[0])
+        estimate = sum(len(rows) for _, _, rows in plans)
+        print(f"⏱️ {self.remaining():.0f}s of budget left for {estimate} item(s); "
+              f"category order: {', '.join(category for _, category, _ in plans)}")
+        return [(category, rows) for _, category, rows in plans]
@@ -0,0 +1,158 @@
+import os
+import sys
+import json
+import gzip
+import hashlib
+import time
+from pathlib import Path
+from datetime import datetime, timedelta
+
+try:
+    import zstandard
+except ImportError:  # Fall back to gzip so a missing wheel never breaks a run
+    zstandard = None
+
+# --- Retention Configuration ---
+DEBUG_RETENTION_RUNS = int(os.getenv("DEBUG_RETENTION_RUNS", "20"))
+DEBUG_RETENTION_DAYS = int(os.getenv("DEBUG_RETENTION_DAYS", "14"))
+SCREENSHOT_QUALITY = int(os.getenv("DEBUG_SCREENSHOT_QUALITY", "60"))
+
+
+class DebugStore:
+    """
+    Content-addressed store for per-step debug artifacts.
+
+    Layout under `root`:
+        blobs/<ab>/<sha256>.html.zst   (or .html.gz without zstandard)
+        blobs/<ab>/<sha256>.jpg
+        runs/<category>/<run_id>.json  (manifest: step name -> blob paths)
+
+    Identical pages and screenshots are stored once no matter how many
+    steps, items or runs reference them. `prune()` drops old manifests and
+    any blob that is no longer referenced by a surviving manifest. Ages come
+    from what the manifests record, never from file mtimes: a checkout gives
+    every committed file the same fresh mtime.
+    """
+
+    def __init__(self, root: Path, category: str, run_id: str = None):
+        self.root = Path(root)
+        self.category = category
+        self.run_id = run_id or datetime.now().strftime("%Y%m%dT%H%M%S")
+        self.blob_dir = self.root / "blobs"
+        self.run_dir = self.root / "runs" / category
+        self.manifest_path = self.run_dir / f"{self.run_id}.json"
+        self.started_ts = time.time()
+        self.written = set()
+        self.manifest = {
+            "run_id": self.run_id,
+            "category": category,
+            "started_at": datetime.now().isoformat(),
+            "steps": {},
+        }
+
+    # --- Blob Helpers ---
+    def _put_blob(self, data: bytes, suffix: str, digest: str = None, encode=None) -> str:
+        digest = digest or hashlib.sha256(data).hexdigest()
+        rel_path = Path("blobs") / digest[:2] / f"{digest}{suffix}"
+        blob_path = self.root / rel_path
+        if not blob_path.exists():
+            blob_path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = blob_path.with_name(blob_path.name + ".tmp")
+            tmp_path.write_bytes(encode(data) if encode else data)
+            os.replace(tmp_path, blob_path)
+        self.written.add(rel_path.as_posix())
+        return rel_path.as_posix()
+
+    def _put_html(self, html: str) -> str:
+        raw = html.encode("utf-8")
+        # Hash the raw page so the blob name does not depend on the codec
+        digest = hashlib.sha256(raw).hexdigest()
+        if zstandard:
+            return self._put_blob(raw, ".html.zst", digest, zstandard.ZstdCompressor(level=10).compress)
+        return self._put_blob(raw, ".html.gz", digest, lambda d: gzip.compress(d, compresslevel=9))
+
+    def _write_manifest(self):
+        self.run_dir.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.manifest_path.with_suffix(".json.tmp")
+        tmp_path.write_text(json.dumps(self.manifest, indent=2), encoding="utf-8")
+        os.replace(tmp_path, self.manifest_path)
+
+    # --- Public API ---
+    def record(self, page, name: str):
+        """Stores the page's HTML and a JPEG screenshot under step `name`."""
+        entry = {"logged_at": datetime.now().isoformat()}
+        try:
+            entry["screenshot"] = self._put_blob(
+                page.screenshot(type="jpeg", quality=SCREENSHOT_QUALITY), ".jpg"
+            )
+        except Exception as e:
+            print(f"⚠️ Could not take screenshot for '{name}': {e}", file=sys.stderr)
+        try:
+            entry["html"] = self._put_html(page.content())
+        except Exception as e:
+            print(f"⚠️ Could not capture HTML for '{name}': {e}", file=sys.stderr)
+        self.manifest["steps"][name] = entry
+        self._write_manifest()
+        return entry
+
+    def read_html(self, rel_path: str) -> str:
+        """Decompresses an HTML blob referenced from a manifest."""
+        data = (self.root / rel_path).read_bytes()
+        if rel_path.endswith(".zst"):
+            if not zstandard:
+                raise RuntimeError("zstandard is required to read .zst blobs.")
+            data = zstandard.ZstdDecompressor().decompress(data)
+        elif rel_path.endswith(".gz"):
+            data = gzip.decompress(data)
+        return data.decode("utf-8")
+
+    @staticmethod
+    def _started_at(manifest: dict):
+        for value, parse in ((manifest.get("started_at"), datetime.fromisoformat),
+                             (manifest.get("run_id"), lambda v: datetime.strptime(v, "%Y%m%dT%H%M%S"))):
+            try:
+                return parse(value)
+            except (TypeError, ValueError):
+                continue
+        return None
+
+    def prune(self, keep_runs: int = DEBUG_RETENTION_RUNS, keep_days: int = DEBUG_RETENTION_DAYS):
+        """
+        Applies the retention policy: per category keep at most `keep_runs`
+        manifests and none older than `keep_days`, then delete unreferenced blobs.
+        """
+        runs_root = self.root / "runs"
+        cutoff = datetime.now() - timedelta(days=keep_days)
+        removed_runs = 0
+        referenced = set()
+        for category_dir in (runs_root.iterdir() if runs_root.exists() else []):
+            if not category_dir.is_dir():
+                continue
+            manifests = sorted(category_dir.glob("*.json"), reverse=True)
+            for i, manifest_path in enumerate(manifests):
+                try:
+                    manifest = json.loads(manifest_path.read_text(encoding="utf-8"))
+                except (OSError, json.JSONDecodeError):
+                    manifest = {}
+                if manifest_path != self.manifest_path:
+                    started_at = self._started_at(manifest)
+                    if i >= keep_runs or (started_at is not None and started_at < cutoff):
+                        manifest_path.unlink()
+                        removed_runs += 1
+                        continue
+                for entry in manifest.get("steps", {}).values():
+                    referenced.update(v for k, v in entry.items() if k in ("html", "screenshot"))
+        referenced.update(self.written)
+
+        # A blob written since this process started may belong to another bot
+        # whose manifest does not list it yet, so it is never collected.
+        removed_blobs = 0
+        if self.blob_dir.exists():
+            for blob_path in self.blob_dir.glob("*/*"):
+                if blob_path.stat().st_mtime >= self.started_ts:
+                    continue
+                if blob_path.relative_to(self.root).as_posix() not in referenced:
+                    blob_path.unlink()
+                    removed_blobs += 1
+        if removed_runs or removed_blobs:
+            print(f"🧹 Debug store pruned {removed_runs} run(s) and {removed_blobs} blob(s).")
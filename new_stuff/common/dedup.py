@@ -0,0 +1,184 @@
+import os
+import re
+import hashlib
+import unicodedata
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
+
+# --- Dedup Configuration ---
+# keep: only report duplicates; drop: post each story once, from its earliest row;
+# route: post each story once, from the highest-ranked category in DEDUP_ROUTE_ORDER
+DEDUP_POLICY = os.getenv("DEDUP_POLICY", "route")
+DEDUP_ROUTE_ORDER = [c.strip() for c in os.getenv("DEDUP_ROUTE_ORDER", "news,formula,tech,movies,hollywood,unews").split(",") if c.strip()]
+TITLE_SIMILARITY = float(os.getenv("DEDUP_TITLE_SIMILARITY", "0.6"))
+
+SHINGLE_SIZE = 5
+NUM_PERM = 32
+LSH_BANDS = 16
+LSH_ROWS = NUM_PERM // LSH_BANDS
+_MERSENNE_PRIME = (1 << 61) - 1
+_PERMUTATIONS = [
+    (int.from_bytes(hashlib.blake2b(f"a{i}".encode(), digest_size=8).digest(), "big") % _MERSENNE_PRIME or 1,
+     int.from_bytes(hashlib.blake2b(f"b{i}".encode(), digest_size=8).digest(), "big") % _MERSENNE_PRIME)
+    for i in range(NUM_PERM)
+]
+
+TRACKING_PARAMS = {
+    "fbclid", "gclid", "dclid", "msclkid", "igshid", "mc_cid", "mc_eid", "ocid", "cmpid", "ref", "ref_src",
+    "ref_url", "smid", "sr_share", "guccounter", "guce_referrer", "guce_referrer_sig", "outputtype", "amp",
+}
+TRACKING_PREFIXES = ("utm_", "at_", "__twitter", "_ga", "_hs", "pk_", "mtm_")
+MOBILE_HOST_PREFIXES = ("www.", "m.", "mobile.", "amp.")
+# Titles the scraper writes when it could not read the page say nothing about the story
+PLACEHOLDER_TITLES = {"no title", "could not fetch preview", ""}
+
+
+def normalize_url(url: str) -> str:
+    """
+    Reduces a URL to a key that is equal for the same article: lower-cased
+    host without www/mobile/AMP prefixes, no AMP path variants, no tracking
+    parameters or fragment, sorted query and no trailing slash.
+    """
+    parts = urlsplit(url.strip())
+    host = (parts.hostname or "").lower()
+    stripped = True
+    while stripped:
+        stripped = False
+        for prefix in MOBILE_HOST_PREFIXES:
+            if host.startswith(prefix) and host.count(".") > 1:
+                host = host[len(prefix):]
+                stripped = True
+    # ampproject caches serve other sites' pages as <host-with-dashes>.cdn.ampproject.org/c/s/<host>/<path>
+    path = parts.path
+    if host.endswith("cdn.ampproject.org"):
+        match = re.match(r"^/[a-z]/(?:s/)?([^/]+)(/.*)?$", path)
+        if match:
+            return normalize_url(f"https://{match.group(1)}{match.group(2) or ''}")
+    path = re.sub(r"/amp(?=/|$)", "", path)
+    path = re.sub(r"\.amp(\.html?)$", r"\1", path)
+    path = re.sub(r"/+", "/", path).rstrip("/")
+
+    query = sorted(
+        (key, value) for key, value in parse_qsl(parts.query, keep_blank_values=True)
+        if key.lower() not in TRACKING_PARAMS and not key.lower().startswith(TRACKING_PREFIXES)
+    )
+    return urlunsplit(("https", host, path, urlencode(query), ""))
+
+
+def normalize_title(title: str) -> str:
+    text = unicodedata.normalize("NFKD", title or "")
+    text = "".join(ch for ch in text if not unicodedata.combining(ch)).lower()
+    return " ".join(re.findall(r"\w+", text))
+
+
+def shingles(text: str) -> set:
+    if len(text) <= SHINGLE_SIZE:
+        return {text} if text else set()
+    return {text[i:i + SHINGLE_SIZE] for i in range(len(text) - SHINGLE_SIZE + 1)}
+
+
+def minhash(shingle_set: set) -> list:
+    hashes = [int.from_bytes(hashlib.blake2b(s.encode(), digest_size=8).digest(), "big") for s in shingle_set]
+    return [min((a * h + b) % _MERSENNE_PRIME for h in hashes) for a, b in _PERMUTATIONS]
+
+
+def jaccard(first: set, second: set) -> float:
+    if not first or not second:
+        return 0.0
+    return len(first & second) / len(first | second)
+
+
+class _DisjointSet:
+    def __init__(self, size: int):
+        self.parent = list(range(size))
+
+    def find(self, i: int) -> int:
+        while self.parent[i] != i:
+            self.parent[i] = self.parent[self.parent[i]]
+            i = self.parent[i]
+        return i
+
+    def union(self, i: int, j: int):
+        self.parent[self.find(i)] = self.find(j)
+
+
+def find_duplicate_groups(rows: list) -> list:
+    """
+    Groups rows that are the same story: equal normalized URLs, or titles
+    whose shingle Jaccard similarity is at least TITLE_SIMILARITY. Candidate
+    title pairs come from MinHash LSH buckets, so the work grows roughly
+    linearly with the number of rows. Returns lists of row indexes, one per
+    group of two or more.
+    """
+    groups = _DisjointSet(len(rows))
+    by_url = {}
+    title_shingles = []
+    buckets = {}
+    for index, row in enumerate(rows):
+        url = row.get("url")
+        if url:
+            key = normalize_url(url)
+            if key in by_url:
+                groups.union(index, by_url[key])
+            else:
+                by_url[key] = index
+
+        title = normalize_title(row.get("title"))
+        shingle_set = set() if title in PLACEHOLDER_TITLES else shingles(title)
+        title_shingles.append(shingle_set)
+        if not shingle_set:
+            continue
+        signature = minhash(shingle_set)
+        for band in range(LSH_BANDS):
+            band_key = (band, tuple(signature[band * LSH_ROWS:(band + 1) * LSH_ROWS]))
+            buckets.setdefault(band_key, []).append(index)
+
+    checked = set()
+    for members in buckets.values():
+        for position, first in enumerate(members):
+            for second in members[position + 1:]:
+                if (first, second) in checked:
+                    continue
+                checked.add((first, second))
+                if groups.find(first) != groups.find(second) and \
+                        jaccard(title_shingles[first], title_shingles[second]) >= TITLE_SIMILARITY:
+                    groups.union(first, second)
+
+    clusters = {}
+    for index in range(len(rows)):
+        clusters.setdefault(groups.find(index), []).append(index)
+    return [members for members in clusters.values() if len(members) > 1]
+
+
+def _route_rank(row: dict) -> tuple:
+    category = row.get("bot")
+    rank = DEDUP_ROUTE_ORDER.index(category) if category in DEDUP_ROUTE_ORDER else len(DEDUP_ROUTE_ORDER)
+    return rank, str(row.get("time") or ""), str(row.get("id"))
+
+
+def _earliest(row: dict) -> tuple:
+    return str(row.get("time") or ""), str(row.get("id"))
+
+
+def dedupe(rows: list, policy: str = DEDUP_POLICY):
+    """
+    Applies `policy` to the duplicate groups in `rows`. Returns (kept_rows,
+    dropped) where `dropped` is a list of (row, kept_row) pairs. With 'keep'
+    nothing is dropped, but the groups are still reported.
+    """
+    duplicate_groups = find_duplicate_groups(rows)
+    dropped = []
+    drop_indexes = set()
+    for members in duplicate_groups:
+        chooser = _route_rank if policy == "route" else _earliest
+        winner = min(members, key=lambda i: chooser(rows[i]))
+        categories = sorted({str(rows[i].get("bot")) for i in members})
+        print(f"🔁 Duplicate story across {', '.join(categories)}: rows "
+              f"{', '.join(str(rows[i].get('id')) for i in members)} -> keeping row {rows[winner].get('id')}")
+        if policy == "keep":
+            continue
+        for index in members:
+            if index != winner:
+                drop_indexes.add(index)
+                dropped.append((rows[index], rows[winner]))
+    kept = [row for index, row in enumerate(rows) if index not in drop_indexes]
+    return kept, dropped
@@ -0,0 +1,44 @@
+import sys
+import json
+import time
+
+# Progress events are single JSON objects on their own stdout line. Human
+# log lines share the stream, so readers only treat a line as an event if it
+# decodes to an object carrying an "event" key.
+#
+# Events sent by process_bot.py:
+#   session_ok      {category, duration_s, logged_in}
+#   session_failed  {category, reason, duration_s}
+#   item_started    {row_id, url}
+#   item_posted     {row_id, url, action, created_id, duration_s}
+#   item_skipped    {row_id, url, reason}
+#   item_failed     {row_id, url, reason, duration_s}
+#   item_deferred   {row_id, url, reason}   (not started; handed back to the queue)
+#   run_finished    {category, duration_s, posted, skipped, failed}
+
+
+def emit(event: str, **fields):
+    """Writes one event line to stdout and flushes it immediately."""
+    record = {"event": event, "ts": round(time.time(), 3), **fields}
+    sys.stdout.write(json.dumps(record, default=str) + "\n")
+    sys.stdout.flush()
+
+
+def error_reason(exc: Exception) -> str:
+    """One-line failure reason for an event payload."""
+    text = str(exc).strip()
+    return text.splitlines()[0] if text else type(exc).__name__
+
+
+def parse_event(line: str):
+    """Returns the event dict encoded on `line`, or None for ordinary log output."""
+    line = line.strip()
+    if not line.startswith("{"):
+        return None
+    try:
+        record = json.loads(line)
+    except json.JSONDecodeError:
+        return None
+    if isinstance(record, dict) and "event" in record:
+        return record
+    return None
@@ -0,0 +1,151 @@
+import os
+import re
+import json
+import time
+import shutil
+import tempfile
+from datetime import timedelta
+from pathlib import Path
+
+# --- HAR Configuration ---
+# "record" saves each account's traffic to har/<account>.har; "replay" serves a
+# session from that file with no network at all. Replaying needs no secrets:
+#   BOT_HAR_MODE=replay BOT_CATEGORY=formula BOT_ACCOUNT=formula python common/process_bot.py '[]'
+# runs the recorded items again against the recorded responses.
+BOT_HAR_MODE = os.getenv("BOT_HAR_MODE", "off")
+HAR_DIR = Path(os.getenv("HAR_DIR", "har"))
+
+REDACTED = "REDACTED"
+# Stand-ins written over the real credentials; a replay logs in with them so
+# the recorded login requests match byte for byte.
+REPLAY_EMAIL = "redacted@example.com"
+REPLAY_USERNAME = "redacted_user"
+REPLAY_PASSWORD = "redacted-password"
+SECRET_HEADERS = {"authorization", "cookie", "set-cookie", "x-csrf-token", "x-guest-token"}
+# The username is a plain word, so it is only replaced where it is data, not inside scripts
+TEXT_MIME_TYPES = ("json", "html", "x-www-form-urlencoded")
+
+
+def _replace_all(text: str, value: str, placeholder: str, word: bool = False) -> str:
+    variants = {value, json.dumps(value)[1:-1]}
+    for variant in variants:
+        pattern = re.escape(variant)
+        if word:
+            pattern = rf"(?<![\w@]){pattern}(?![\w])"
+        text = re.sub(pattern, placeholder, text)
+    return text
+
+
+def redact_har(path: Path, email: str = None, username: str = None, password: str = None):
+    """Rewrites the HAR at `path` without cookies, tokens or the account's credentials."""
+    har = json.loads(Path(path).read_text(encoding="utf-8"))
+    secrets = [(value, placeholder, False) for value, placeholder in
+               ((password, REPLAY_PASSWORD), (email, REPLAY_EMAIL)) if value]
+    if username:
+        secrets.append((username, REPLAY_USERNAME, True))
+
+    def scrub(text: str, data_only: bool) -> str:
+        for value, placeholder, word in secrets:
+            if data_only or not word:
+                text = _replace_all(text, value, placeholder, word)
+        return text
+
+    for entry in har["log"]["entries"]:
+        request, response = entry["request"], entry["response"]
+        for part in (request, response):
+            for header in part.get("headers", []):
+                if header["name"].lower() in SECRET_HEADERS:
+                    header["value"] = REDACTED
+            for cookie in part.get("cookies", []):
+                cookie["value"] = REDACTED
+        request["url"] = scrub(request["url"], True)
+        for param in request.get("queryString", []):
+            param["value"] = scrub(param["value"], True)
+        if request.get("postData", {}).get("text"):
+            request["postData"]["text"] = scrub(request["postData"]["text"], True)
+        content = response.get("content", {})
+        if content.get("text") and content.get("encoding") != "base64":
+            is_data = any(kind in content.get("mimeType", "") for kind in TEXT_MIME_TYPES)
+            content["text"] = scrub(content["text"], is_data)
+
+    tmp_path = Path(f"{path}.tmp")
+    tmp_path.write_text(json.dumps(har), encoding="utf-8")
+    os.replace(tmp_path, path)
+
+
+class HarSession:
+    """
+    Records or replays one account's network traffic. In record mode the
+    context writes the HAR when it closes, `finish()` redacts it and saves
+    the processed items and start time beside it. In replay mode every
+    request is answered from the HAR and anything it lacks is aborted, the
+    profile is a throwaway one, and `clock_offset()` moves "now" back to
+    the recording so items take the same post/schedule decisions.
+    """
+
+    def __init__(self, account: str, mode: str = BOT_HAR_MODE, har_dir: Path = HAR_DIR):
+        self.mode = mode if mode in ("record", "replay") else "off"
+        self.har_path = Path(har_dir) / f"{account}.har"
+        self.meta_path = Path(har_dir) / f"{account}.meta.json"
+        self.started_at = time.time()
+        self.items = []
+        self.replay_profile = None
+
+    @property
+    def enabled(self) -> bool:
+        return self.mode != "off"
+
+    def profile_dir(self, default: Path) -> Path:
+        """The browser profile to use; a replay must not pick up a live session's cookies."""
+        if self.mode != "replay":
+            return default
+        if self.replay_profile is None:
+            self.replay_profile = Path(tempfile.mkdtemp(prefix="har_replay_"))
+        return self.replay_profile
+
+    def launch_options(self) -> dict:
+        if self.mode != "record":
+            return {}
+        self.har_path.parent.mkdir(parents=True, exist_ok=True)
+        return {"record_har_path": str(self.har_path), "record_har_content": "embed", "record_har_mode": "full"}
+
+    def attach(self, context):
+        if self.mode != "replay":
+            return
+        if not self.har_path.exists():
+            raise FileNotFoundError(f"No recording to replay at {self.har_path}")
+        context.route_from_har(str(self.har_path), not_found="abort")
+        print(f"📼 Replaying network traffic from {self.har_path}")
+
+    def note_item(self, item: dict):
+        if self.mode == "record":
+            self.items.append(item)
+
+    def recorded_items(self) -> list:
+        try:
+            return json.loads(self.meta_path.read_text(encoding="utf-8"))["items"]
+        except (OSError, json.JSONDecodeError, KeyError):
+            return []
+
+    def clock_offset(self) -> timedelta:
+        if self.mode != "replay":
+            return timedelta(0)
+        try:
+            recorded_at = json.loads(self.meta_path.read_text(encoding="utf-8"))["started_at"]
+        except (OSError, json.JSONDecodeError, KeyError):
+            return timedelta(0)
+        return timedelta(seconds=self.started_at - recorded_at)
+
+    def finish(self, email: str = None, username: str = None, password: str = None):
+        """Call after the context has closed: redacts a recording, or removes a replay's profile."""
+        if self.replay_profile is not None:
+            shutil.rmtree(self.replay_profile, ignore_errors=True)
+        if self.mode != "record" or not self.har_path.exists():
+            return
+        redact_har(self.har_path, email, username, password)
+        self.meta_path.write_text(json.dumps({
+            "started_at": self.started_at,
+            "items": self.items,
+        }, indent=2, default=str), encoding="utf-8")
+        size_mb = self.har_path.stat().st_size / 1024 / 1024
+        print(f"📼 Saved redacted recording to {self.har_path} ({size_mb:.1f} MB, {len(self.items)} item(s))")
@@ -6,33 +6,39 @@ from pathlib import Path
 from playwright.sync_api import sync_playwright
 import git
 
+from login_flow import run_login, wait_for_home
+from metrics import MetricsRegistry
+from asset_cache import AssetCache, ASSET_CACHE
+from browser_launch import launch_context, report_memory
+from debug_store import DebugStore
+
 # --- Credentials from Generic Environment Variables ---
 EMAIL = os.getenv("TWITTER_EMAIL")
 PASSWORD = os.getenv("TWITTER_PASSWORD")
 USERNAME = os.getenv("TWITTER_USERNAME")
 BOT_CATEGORY = os.getenv("BOT_CATEGORY") # e.g., "formula", "tech"
+BOT_ACCOUNT = os.getenv("BOT_ACCOUNT") or BOT_CATEGORY
 
 # --- Directory and Repository Setup ---
-LOGIN_DATA_DIR = Path(f"./{BOT_CATEGORY}/login_data")
-SCREENSHOT_DIR = Path(f"./debug_screenshots/{BOT_CATEGORY}")
-TEMP_OTP_DIR = Path(f"./{BOT_CATEGORY}/temp_otp_repo")
+LOGIN_DATA_DIR = Path(f"./{BOT_ACCOUNT}/login_data")
+DEBUG_DIR = Path("./debug")
+TEMP_OTP_DIR = Path(f"./{BOT_ACCOUNT}/temp_otp_repo")
 LOGIN_DATA_DIR.mkdir(parents=True, exist_ok=True)
-SCREENSHOT_DIR.mkdir(parents=True, exist_ok=True)
 
 # --- OTP Configuration ---
 OTP_REPO_URL = "https://github.com/twitterbotf1/login_otps"
-OTP_FILE_IN_REPO = Path(f"{BOT_CATEGORY}/otp.txt")
-OTP_CHECK_TEXT = "check your email"
-EXTRA_VERIFICATION_TEXT = "unusual login activity"
+OTP_FILE_IN_REPO = Path(f"{BOT_ACCOUNT}/otp.txt")
+OTP_WAIT_BUCKETS = (30, 60, 120, 180, 240, 300, 360, 480, 600)
+
+METRICS = MetricsRegistry(f"twitterbot_login_{BOT_ACCOUNT}.prom", account=BOT_ACCOUNT)
+ASSETS = AssetCache()
+# Own category, so login runs do not count against the bot's retention
+DEBUG_STORE = DebugStore(DEBUG_DIR, f"login_{BOT_ACCOUNT}")
 
 # --- Helper Functions ---
 def take_shot(page, name):
-    screenshot_path = SCREENSHOT_DIR / f"{name}.png"
-    print(f"📸 Taking screenshot: {screenshot_path}")
-    try:
-        page.screenshot(path=screenshot_path)
-    except Exception as e:
-        print(f"⚠️ Could not take screenshot: {e}", file=sys.stderr)
+    DEBUG_STORE.record(page, name)
+    print(f"📸 Logged page state: {name}")
 
 def get_otp_from_repo():
     for attempt in range(3):
@@ -57,11 +63,17 @@ def get_otp_from_repo():
     print("❌ All 3 attempts to fetch OTP from the repository failed.", file=sys.stderr)
     return None
 
+def timed_otp_from_repo():
+    started = time.monotonic()
+    try:
+        return get_otp_from_repo()
+    finally:
+        METRICS.observe("twitterbot_otp_wait_seconds", time.monotonic() - started,
+                        buckets=OTP_WAIT_BUCKETS, category=BOT_CATEGORY)
+
 def is_logged_in(page):
-    page.wait_for_timeout(5000)
-    page_text = page.inner_text("body").lower()
-    logged_in = "home" in page_text or "post" in page_text
-    print(f"🕵️‍♂️ Verification check: Is 'Home' or 'Post' visible? {logged_in}")
+    logged_in = wait_for_home(page, timeout_ms=15000)
+    print(f"🕵️‍♂️ Verification check: Is the home UI visible? {logged_in}")
     return logged_in
 
 # --- Main Login Function ---
@@ -74,63 +86,24 @@ def main():
         browser = None
         try:
             print(f"🚀 Launching browser for '{BOT_CATEGORY}'...")
-            browser = p.chromium.launch_persistent_context(
-                user_data_dir=str(LOGIN_DATA_DIR),
-                headless=True,
-                viewport={"width": 1280, "height": 720}
+            browser, launch_s = launch_context(
+                p, LOGIN_DATA_DIR,
+                viewport={"width": 1280, "height": 720},
+                service_workers="block" if ASSET_CACHE else "allow",
             )
+            METRICS.set("twitterbot_browser_launch_seconds", launch_s, category=BOT_CATEGORY)
+            report_memory("launch", METRICS, category=BOT_CATEGORY)
+            ASSETS.attach(browser)
             page = browser.new_page()
-            page.goto("https://x.com/login")
-            page.wait_for_timeout(5000)
-            take_shot(page, "01_start_page")
-
-            print("Typing email...")
-            page.mouse.click(580, 350)
-            page.keyboard.type(EMAIL)
-            take_shot(page, "02_email_entered")
-
-            print("Clicking 'Next' after email...")
-            page.mouse.click(640, 430)
-            page.wait_for_timeout(5000)
-            take_shot(page, "03_after_email_next")
-
-            if EXTRA_VERIFICATION_TEXT in page.inner_text("body").lower():
-                print("🔹 Extra verification step detected. Entering username.")
-                page.mouse.click(520, 320)
-                page.keyboard.type(USERNAME)
-                take_shot(page, "04_extra_username_entered")
-                print("Clicking 'Next' after username...")
-                page.mouse.click(640, 640)
-                page.wait_for_timeout(5000)
-                take_shot(page, "05_after_username_next")
-
-            print("Typing password...")
-            page.mouse.click(500, 300)
-            page.keyboard.type(PASSWORD)
-            take_shot(page, "06_password_entered")
-
-            print("Clicking final 'Login' button...")
-            page.mouse.click(640, 590)
-            page.wait_for_timeout(7000)
-            take_shot(page, "07_after_password_login_click")
-
-            if OTP_CHECK_TEXT in page.inner_text("body").lower():
-                print("-> OTP screen detected. Starting OTP retrieval process...")
-                take_shot(page, "08a_otp_screen_detected")
-                otp_code = get_otp_from_repo()
-                if otp_code:
-                    print(f"✅ OTP found. Entering it now.")
-                    page.mouse.click(550, 350)
-                    page.keyboard.type(otp_code)
-                    take_shot(page, "08b_otp_entered")
-                    print("Clicking 'Next' after OTP...")
-                    page.mouse.click(640, 640)
-                    page.wait_for_timeout(7000)
-                    take_shot(page, "08c_after_otp_next_click")
-                else:
-                    print("❌ OTP retrieval process failed after multiple attempts.", file=sys.stderr)
-                    take_shot(page, "98_otp_failure")
-                    sys.exit(1)
+            login_started = time.monotonic()
+            logged_in = run_login(page, EMAIL, USERNAME, PASSWORD, log_func=take_shot, otp_provider=timed_otp_from_repo)
+            METRICS.inc("twitterbot_login_attempts_total", category=BOT_CATEGORY, result="ok" if logged_in else "failed")
+            METRICS.observe("twitterbot_step_duration_seconds", time.monotonic() - login_started,
+                            category=BOT_CATEGORY, step="login")
+            if not logged_in:
+                print(f"❌ Login flow did not complete for '{BOT_CATEGORY}'.", file=sys.stderr)
+                take_shot(page, "99_final_failure")
+                sys.exit(1)
 
             if is_logged_in(page):
                 print(f"✅ Login successful for '{BOT_CATEGORY}'. Main feed is visible.")
@@ -148,6 +121,9 @@ def main():
         finally:
             if browser:
                 browser.close()
+            METRICS.write()
+            DEBUG_STORE.prune()
+            ASSETS.prune()
             if TEMP_OTP_DIR.exists():
                 shutil.rmtree(TEMP_OTP_DIR)
                 print("🧹 Cleaned up temporary OTP directory.")
@@ -0,0 +1,120 @@
+import sys
+import time
+from playwright.sync_api import Page, TimeoutError as PlaywrightTimeoutError
+
+# --- Screen Detection Selectors ---
+# Each login screen is recognised by an element that only it renders. The
+# username challenge and the OTP prompt share the same generic text input,
+# so they are told apart by the prompt text next to it.
+HOME_SELECTOR = '[data-testid="SideNav_NewTweet_Button"], [data-testid="AppTabBar_Home_Link"]'
+EMAIL_SELECTOR = 'input[autocomplete="username"]'
+PASSWORD_SELECTOR = 'input[name="password"]'
+CHALLENGE_SELECTOR = 'input[data-testid="ocfEnterTextTextInput"]'
+
+OTP_CHECK_TEXT = "check your email"
+
+SCREEN_SELECTORS = {
+    "home": HOME_SELECTOR,
+    "password": PASSWORD_SELECTOR,
+    "challenge": CHALLENGE_SELECTOR,
+    "email": EMAIL_SELECTOR,
+}
+
+LOGIN_URL = "https://x.com/login"
+STEP_TIMEOUT_MS = 30000
+MAX_TRANSITIONS = 8
+
+
+def detect_screen(page: Page, timeout_ms: int = STEP_TIMEOUT_MS):
+    """
+    Waits until any known login screen is showing and returns its name:
+    'home', 'password', 'username', 'otp' or 'email'. Returns None on timeout.
+    """
+    try:
+        page.wait_for_selector(", ".join(SCREEN_SELECTORS.values()), state="visible", timeout=timeout_ms)
+    except PlaywrightTimeoutError:
+        return None
+    for screen, selector in SCREEN_SELECTORS.items():
+        if page.locator(selector).first.is_visible():
+            if screen != "challenge":
+                return screen
+            body_text = page.inner_text("body").lower()
+            return "otp" if OTP_CHECK_TEXT in body_text else "username"
+    return None
+
+
+def wait_for_home(page: Page, timeout_ms: int = STEP_TIMEOUT_MS) -> bool:
+    """Returns True as soon as the logged-in home UI renders."""
+    try:
+        page.wait_for_selector(HOME_SELECTOR, state="visible", timeout=timeout_ms)
+        return True
+    except PlaywrightTimeoutError:
+        return False
+
+
+def _submit(page: Page, selector: str, value: str):
+    field = page.locator(selector).first
+    field.fill(value)
+    field.press("Enter")
+
+
+def _wait_for_change(page: Page, selector: str, timeout_ms: int):
+    # The submitted field detaching is the earliest signal that the next screen is on its way.
+    try:
+        page.locator(selector).first.wait_for(state="detached", timeout=timeout_ms)
+    except PlaywrightTimeoutError:
+        pass
+
+
+def run_login(page: Page, email: str, username: str, password: str, log_func=None, otp_provider=None) -> bool:
+    """
+    Drives the X login flow as a state machine keyed on the visible screen.
+
+    Every screen is handled as soon as its selector appears and every input is
+    filled in one shot, so the only waiting is real page latency. `otp_provider`
+    is a callable returning the code (or None) when an OTP screen shows up.
+    """
+    def log(name):
+        if log_func:
+            log_func(page, name)
+
+    started = time.monotonic()
+    page.goto(LOGIN_URL, wait_until="domcontentloaded", timeout=60000)
+    handled = []
+    for _ in range(MAX_TRANSITIONS):
+        screen = detect_screen(page)
+        print(f"🔎 Login screen detected: {screen}")
+        if screen == "home":
+            print(f"✅ Login reached home in {time.monotonic() - started:.1f}s.")
+            return True
+        if screen is None:
+            log("98_login_no_known_screen")
+            return False
+        if handled and handled[-1] == screen:
+            print(f"❌ Login stuck on the '{screen}' screen.", file=sys.stderr)
+            log(f"98_login_stuck_{screen}")
+            return False
+        handled.append(screen)
+
+        if screen == "email":
+            _submit(page, EMAIL_SELECTOR, email)
+            _wait_for_change(page, EMAIL_SELECTOR, STEP_TIMEOUT_MS)
+        elif screen == "username":
+            print("🔹 Extra verification step detected. Entering username.")
+            _submit(page, CHALLENGE_SELECTOR, username)
+            _wait_for_change(page, CHALLENGE_SELECTOR, STEP_TIMEOUT_MS)
+        elif screen == "password":
+            _submit(page, PASSWORD_SELECTOR, password)
+            _wait_for_change(page, PASSWORD_SELECTOR, STEP_TIMEOUT_MS)
+        elif screen == "otp":
+            log("08a_otp_screen_detected")
+            otp_code = otp_provider() if otp_provider else None
+            if not otp_code:
+                print("❌ OTP screen reached but no OTP code is available.", file=sys.stderr)
+                log("98_otp_failure")
+                return False
+            _submit(page, CHALLENGE_SELECTOR, otp_code)
+            _wait_for_change(page, CHALLENGE_SELECTOR, STEP_TIMEOUT_MS)
+
+    print("❌ Login did not reach home within the allowed transitions.", file=sys.stderr)
+    return False
@@ -0,0 +1,150 @@
+import os
+import re
+import threading
+from pathlib import Path
+
+# --- Metrics Configuration ---
+# Point this at node-exporter's --collector.textfile.directory; unset disables writing.
+METRICS_TEXTFILE_DIR = os.getenv("METRICS_TEXTFILE_DIR")
+DEFAULT_BUCKETS = (0.5, 1, 2.5, 5, 10, 20, 30, 60, 120, 300, 600)
+
+METRIC_HELP = {
+    "twitterbot_posts_total": "Posts published immediately.",
+    "twitterbot_schedules_total": "Posts scheduled for later.",
+    "twitterbot_skipped_total": "Queue items skipped without browser work.",
+    "twitterbot_failures_total": "Failed items and sessions by reason.",
+    "twitterbot_login_attempts_total": "Full login attempts by result.",
+    "twitterbot_otp_wait_seconds": "Time spent waiting for an OTP code.",
+    "twitterbot_step_duration_seconds": "Duration of bot steps.",
+    "twitterbot_category_runs_total": "Bot process runs by category and result.",
+    "twitterbot_fetched_rows": "Rows fetched from the queue by the latest run.",
+    "twitterbot_last_run_timestamp_seconds": "Unix time the latest controller run finished.",
+    "twitterbot_run_duration_seconds": "Wall time of the latest controller run.",
+    "twitterbot_browser_launch_seconds": "Time the latest browser launch took.",
+    "twitterbot_browser_memory_bytes": "Browser memory at a point of the latest run.",
+    "twitterbot_recycles_total": "Pages and contexts replaced by kind.",
+}
+
+_SAMPLE_PATTERN = re.compile(r'^([a-zA-Z_:][a-zA-Z0-9_:]*)(?:\{(.*)\})?\s+(\S+)$')
+_LABEL_PATTERN = re.compile(r'(\w+)="((?:[^"\\]|\\.)*)"')
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _label_text(labels: tuple) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{key}="{_escape(value)}"' for key, value in labels) + "}"
+
+
+def _sample_order(item):
+    (sample, labels), _ = item
+    plain = tuple(pair for pair in labels if pair[0] != "le")
+    le = dict(labels).get("le")
+    return sample, plain, float("inf") if le in (None, "+Inf") else float(le)
+
+
+def _format(value: float) -> str:
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+
+class MetricsRegistry:
+    """
+    Tiny Prometheus registry rendered to a node-exporter textfile.
+
+    Counters and histograms are reloaded from the previous file on start, so
+    they keep increasing across the short-lived runs of this bot. Writes go
+    to a temp file that is renamed into place, so the exporter never reads a
+    half-written file. `default_labels` are added to every series, including
+    ones reloaded from a file written without them.
+    """
+
+    def __init__(self, filename: str, **default_labels):
+        self.path = Path(METRICS_TEXTFILE_DIR) / filename if METRICS_TEXTFILE_DIR else None
+        self.default_labels = {key: str(value) for key, value in default_labels.items() if value is not None}
+        self.meta = {}
+        self.values = {}
+        self._lock = threading.Lock()
+        self._load()
+
+    def _labels(self, labels: dict) -> tuple:
+        return tuple(sorted({**self.default_labels, **labels}.items()))
+
+    def _declare(self, name: str, kind: str):
+        self.meta[name] = {"kind": kind, "help": METRIC_HELP.get(name, name)}
+
+    def inc(self, name: str, amount: float = 1, **labels):
+        self._declare(name, "counter")
+        key = (name, self._labels(labels))
+        with self._lock:
+            self.values[key] = self.values.get(key, 0) + amount
+
+    def set(self, name: str, value: float, **labels):
+        self._declare(name, "gauge")
+        with self._lock:
+            self.values[(name, self._labels(labels))] = value
+
+    def observe(self, name: str, value: float, buckets=DEFAULT_BUCKETS, **labels):
+        self._declare(name, "histogram")
+        label_key = self._labels(labels)
+        with self._lock:
+            for bound in tuple(buckets) + ("+Inf",):
+                le = _format(bound) if bound != "+Inf" else bound
+                key = (f"{name}_bucket", tuple(sorted(label_key + (("le", le),))))
+                hit = bound == "+Inf" or value <= bound
+                self.values[key] = self.values.get(key, 0) + (1 if hit else 0)
+            self.values[(f"{name}_sum", label_key)] = self.values.get((f"{name}_sum", label_key), 0) + value
+            self.values[(f"{name}_count", label_key)] = self.values.get((f"{name}_count", label_key), 0) + 1
+
+    def _load(self):
+        if not self.path or not self.path.exists():
+            return
+        for line in self.path.read_text(encoding="utf-8").splitlines():
+            if line.startswith("# TYPE "):
+                _, _, name, kind = line.split(maxsplit=3)
+                self.meta.setdefault(name, {"kind": kind, "help": METRIC_HELP.get(name, name)})
+                continue
+            if line.startswith("#"):
+                continue
+            match = _SAMPLE_PATTERN.match(line)
+            if not match:
+                continue
+            name, label_body, value = match.groups()
+            base = re.sub(r"_(bucket|sum|count)$", "", name)
+            # Gauges describe the latest run only, so they are not carried over
+            if self.meta.get(base, self.meta.get(name, {})).get("kind") == "gauge":
+                continue
+            labels = self._labels({
+                key: raw.replace('\\"', '"').replace("\\n", "\n").replace("\\\\", "\\")
+                for key, raw in _LABEL_PATTERN.findall(label_body or "")
+            })
+            key = (name, labels)
+            self.values[key] = self.values.get(key, 0) + float(value)
+
+    def render(self) -> str:
+        lines = []
+        with self._lock:
+            for name in sorted(self.meta):
+                meta = self.meta[name]
+                samples = sorted((
+                    (key, value) for key, value in self.values.items()
+                    if key[0] == name or (meta["kind"] == "histogram" and key[0] in (
+                        f"{name}_bucket", f"{name}_sum", f"{name}_count"))
+                ), key=_sample_order)
+                if not samples:
+                    continue
+                lines.append(f"# HELP {name} {meta['help']}")
+                lines.append(f"# TYPE {name} {meta['kind']}")
+                lines.extend(f"{sample}{_label_text(labels)} {_format(value)}" for (sample, labels), value in samples)
+        return "\n".join(lines) + "\n"
+
+    def write(self):
+        """Atomically replaces the textfile. A no-op when METRICS_TEXTFILE_DIR is unset."""
+        if not self.path:
+            return
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_name(f".{self.path.name}.{os.getpid()}.tmp")
+        tmp_path.write_text(self.render(), encoding="utf-8")
+        os.replace(tmp_path, self.path)
@@ -9,7 +9,19 @@ import pytz
 from playwright.sync_api import sync_playwright, Page
 from dotenv import load_dotenv
 
-from tweeting_logic import post_now, schedule_post
+from collections import deque
+from tweeting_logic import post_now_steps, schedule_post_steps, run_steps
+from x_api import XApi
+from scheduled_queue import ScheduledQueue, SCHEDULE_RECONCILE
+from events import emit, error_reason
+from metrics import MetricsRegistry
+from profiling import BotProfiler
+from asset_cache import AssetCache, ASSET_CACHE
+from browser_launch import launch_context, report_memory
+from recycling import SessionRecycler
+from har_mode import HarSession, REPLAY_EMAIL, REPLAY_USERNAME, REPLAY_PASSWORD
+from debug_store import DebugStore
+from login_flow import run_login, wait_for_home
 
 load_dotenv()
 
@@ -18,50 +30,69 @@ EMAIL = os.getenv("TWITTER_EMAIL")
 PASSWORD = os.getenv("TWITTER_PASSWORD")
 USERNAME = os.getenv("TWITTER_USERNAME")
 BOT_CATEGORY = os.getenv("BOT_CATEGORY")
+# Which of the category's accounts this is; its profile and caches live under ./<BOT_ACCOUNT>/
+BOT_ACCOUNT = os.getenv("BOT_ACCOUNT") or BOT_CATEGORY
+# Set by `main_controller.py --deadline`: no item is started that could not finish before BOT_DEADLINE_TS
+BOT_DEADLINE_TS = float(os.getenv("BOT_DEADLINE_TS") or 0)
+BOT_ITEM_ESTIMATE_S = float(os.getenv("BOT_ITEM_ESTIMATE_S") or 0)
+# Pages composing inside the one logged-in context, capped per account; only their settle delays overlap (see run_tabs)
+BOT_TABS = int(os.getenv("BOT_TABS", "1"))
+BOT_MAX_TABS = int(os.getenv("BOT_MAX_TABS", "4"))
 
 # --- Paths & Directories ---
-LOGIN_DATA_DIR = Path(f"./{BOT_CATEGORY}/login_data")
-DEBUG_DIR = Path(f"./debug/{BOT_CATEGORY}")
+LOGIN_DATA_DIR = Path(f"./{BOT_ACCOUNT}/login_data")
+DEBUG_DIR = Path("./debug")
+RESULTS_FILE = Path(f"./debug_logs/posted_{BOT_CATEGORY}.jsonl")
 TIMEZONE = pytz.timezone("Asia/Kolkata")
+DEBUG_STORE = DebugStore(DEBUG_DIR, BOT_ACCOUNT)
+RUN_COUNTS = {"posted": 0, "skipped": 0, "failed": 0}
+METRICS = MetricsRegistry(f"twitterbot_bot_{BOT_ACCOUNT}.prom", account=BOT_ACCOUNT)
+PROFILER = BotProfiler()
+ASSETS = AssetCache()
+# BOT_HAR_MODE=record|replay; see har_mode.py
+HAR = HarSession(BOT_ACCOUNT)
+if HAR.mode == "replay":
+    # The recording was redacted to these, and its login requests only match them
+    EMAIL, USERNAME, PASSWORD = REPLAY_EMAIL, REPLAY_USERNAME, REPLAY_PASSWORD
 
 
 # --- Unified Helper Function for Logging ---
 def log_page(page: Page, name: str):
-    DEBUG_DIR.mkdir(parents=True, exist_ok=True)
     time.sleep(2)
-    page.screenshot(path=DEBUG_DIR / f"{name}.png")
-    (DEBUG_DIR / f"{name}.html").write_text(page.content(), encoding="utf-8")
+    snapshot_page(page, name)
+
+def snapshot_page(page: Page, name: str):
+    """log_page without the settle delay, for pages sharing the thread with other tabs."""
+    DEBUG_STORE.record(page, name)
     print(f"✅ Logged page state: {name}")
 
 
+# --- Helper Function: record_result ---
+def record_result(item: dict, action: str, created_id: str):
+    """Appends what was created for a queue row, so runs can be audited and compared."""
+    RESULTS_FILE.parent.mkdir(parents=True, exist_ok=True)
+    with open(RESULTS_FILE, "a", encoding="utf-8") as f:
+        f.write(json.dumps({
+            "row_id": item.get("id"),
+            "url": item.get("url"),
+            "action": action,
+            "created_id": created_id,
+            "recorded_at": datetime.now(TIMEZONE).isoformat(),
+        }) + "\n")
+
+
 # --- Helper Function: is_logged_in ---
 def is_logged_in(page: Page):
-    page.wait_for_timeout(5000)
-    page_text = page.inner_text("body").lower()
-    return "for you" in page_text or "following" in page_text
+    return wait_for_home(page, timeout_ms=15000)
 
 # --- Sub-Process: Login ---
 def perform_login(page: Page):
     print("🚀 Starting full login process...")
-    page.goto("https://x.com/login", timeout=60000)
-    log_page(page, "01_login_start")
-    page.mouse.click(580, 350)
-    page.keyboard.type(EMAIL)
-    page.mouse.click(640, 430)
-    page.wait_for_timeout(5000)
-    log_page(page, "02_login_after_email")
-    if "unusual login" in page.inner_text("body").lower():
-        page.mouse.click(520, 320)
-        page.keyboard.type(USERNAME)
-        page.mouse.click(640, 640)
-        page.wait_for_timeout(5000)
-        log_page(page, "03_login_after_username")
-    page.mouse.click(500, 300)
-    page.keyboard.type(PASSWORD)
-    page.mouse.click(640, 590)
-    page.wait_for_timeout(7000)
-    log_page(page, "04_login_after_password")
-    if not is_logged_in(page):
+    started = time.monotonic()
+    logged_in = run_login(page, EMAIL, USERNAME, PASSWORD, log_func=log_page)
+    METRICS.inc("twitterbot_login_attempts_total", category=BOT_CATEGORY, result="ok" if logged_in else "failed")
+    METRICS.observe("twitterbot_step_duration_seconds", time.monotonic() - started, category=BOT_CATEGORY, step="login")
+    if not logged_in:
         log_page(page, "98_login_failure")
         return False
     print("✅ Full login successful.")
@@ -69,28 +100,292 @@ def perform_login(page: Page):
     return True
 
 
+# --- Per-Item Processing ---
+def current_ist():
+    """The current IST time, or the recording's time while replaying a HAR."""
+    return datetime.now(TIMEZONE) - HAR.clock_offset()
+
+def parse_item_time(time_str: str):
+    # --- THIS IS THE CORRECTED LOGIC ---
+    # 1. Remove any timezone info from the end of the string.
+    if '+' in time_str:
+        time_str = time_str.split('+')[0]
+    # 2. Parse the string into a "naive" datetime object (no timezone).
+    naive_dt = datetime.fromisoformat(time_str)
+    # 3. Tell Python that this naive time is in the IST timezone.
+    return TIMEZONE.localize(naive_dt)
+    # --- END OF CORRECTION ---
+
+def is_post_now(item: dict) -> bool:
+    try:
+        return parse_item_time(item.get("time") or "") <= current_ist() + timedelta(minutes=5)
+    except ValueError:
+        return True
+
+def handle_item_steps(page: Page, item: dict, index: int, api: XApi = None, scheduled: ScheduledQueue = None,
+                      log_func=log_page):
+    """
+    Posts or schedules one item. Returns (action, created_id), or ("skipped", reason).
+    A generator that yields its waits, like the *_steps functions in tweeting_logic.
+    """
+    now_ist = current_ist()
+    post_now_threshold = now_ist + timedelta(minutes=5)
+
+    title = item.get("title", "No Title")
+    url = item.get("url")
+    time_str = item.get("time")
+
+    if not url or not time_str:
+        print(f"⚠️ Skipping item {index} due to missing URL/time.")
+        return "skipped", "missing URL/time"
+
+    # The controller composes and validates the text up front; the fallback keeps direct runs working
+    tweet_text = item.get("tweet_text") or f'"{title}"\n\n{url}'
+    item_id = f"{index}_{url.split('/')[-1]}"
+
+    item_time = parse_item_time(time_str)
+
+    # --- Timestamp Debugging Block ---
+    print("\n--- TIMESTAMP DEBUG ---")
+    print(f"Original DB String:   {item.get('time')}")
+    print(f"Current IST Time:       {now_ist.isoformat()}")
+    print(f"'Post Now' Threshold:   {post_now_threshold.isoformat()}")
+    print(f"Item Time (as IST):     {item_time.isoformat()}")
+    comparison_result = item_time <= post_now_threshold
+    print(f"Comparison Result:      {comparison_result}")
+    decision = "Post Now" if comparison_result else "Schedule"
+    print(f"--> Decision: {decision}")
+    print("-----------------------\n")
+
+    if item_time <= post_now_threshold:
+        tweet_id = yield from post_now_steps(page, tweet_text, log_func, item_id, api)
+        record_result(item, "posted", tweet_id)
+        return "posted", tweet_id
+    else:
+        if scheduled is not None and scheduled.loaded:
+            action, stale_ids = scheduled.plan(url, item_time)
+            for scheduled_id in stale_ids:
+                scheduled.delete(scheduled_id, url)
+            if action == "skip":
+                print(f"⏭️ Item {item_id} is already scheduled for {item_time.isoformat()}. Skipping.")
+                return "skipped", "already scheduled"
+        scheduled_id = yield from schedule_post_steps(page, tweet_text, item_time, log_func, item_id, scheduled)
+        record_result(item, "scheduled", scheduled_id)
+        return "scheduled", scheduled_id
+
+
+def process_item(page: Page, item: dict, index: int, api: XApi = None, scheduled: ScheduledQueue = None):
+    return run_steps(process_item_steps(page, item, index, api, scheduled))
+
+def process_item_steps(page: Page, item: dict, index: int, api: XApi = None, scheduled: ScheduledQueue = None,
+                       log_func=log_page):
+    """Runs `handle_item_steps` and reports its progress and outcome as events."""
+    row_id, url = item.get("id"), item.get("url")
+    started = time.monotonic()
+    HAR.note_item(item)
+    emit("item_started", row_id=row_id, url=url)
+    try:
+        action, detail = yield from handle_item_steps(page, item, index, api, scheduled, log_func)
+    except Exception as e:
+        RUN_COUNTS["failed"] += 1
+        METRICS.inc("twitterbot_failures_total", category=BOT_CATEGORY, reason=type(e).__name__)
+        METRICS.write()
+        emit("item_failed", row_id=row_id, url=url, reason=error_reason(e),
+             duration_s=round(time.monotonic() - started, 3))
+        raise
+    duration = time.monotonic() - started
+    if action == "skipped":
+        RUN_COUNTS["skipped"] += 1
+        METRICS.inc("twitterbot_skipped_total", category=BOT_CATEGORY)
+        emit("item_skipped", row_id=row_id, url=url, reason=detail)
+    else:
+        RUN_COUNTS["posted"] += 1
+        METRICS.inc("twitterbot_posts_total" if action == "posted" else "twitterbot_schedules_total", category=BOT_CATEGORY)
+        METRICS.observe("twitterbot_step_duration_seconds", duration, category=BOT_CATEGORY, step=action)
+        emit("item_posted", row_id=row_id, url=url, action=action, created_id=detail,
+             duration_s=round(duration, 3))
+    METRICS.write()
+
+
+def defer_items(items: list):
+    """Hands items back to the controller unstarted, because the run deadline is too close."""
+    print(f"⏳ Deadline reached: deferring {len(items)} item(s) to a later run.")
+    for item in items:
+        emit("item_deferred", row_id=item.get("id"), url=item.get("url"), reason="run deadline")
+
+
+def deadline_reached() -> bool:
+    return bool(BOT_DEADLINE_TS) and time.time() + BOT_ITEM_ESTIMATE_S > BOT_DEADLINE_TS
+
+
+# --- Multi-Tab Composing ---
+def tab_lane(pages: list, slot: int, own_items: deque, shared_items: deque, api: XApi, scheduled: ScheduledQueue,
+             session: SessionRecycler = None):
+    """
+    Works through `own_items` in order, then takes items from `shared_items`
+    until both are empty, on `pages[slot]`. A recycled page replaces it there.
+    A failed item is reported and the lane moves on, as a streamed item does.
+    """
+    while own_items or shared_items:
+        if deadline_reached():
+            defer_items([item for _, item in own_items] + [item for _, item in shared_items])
+            own_items.clear()
+            shared_items.clear()
+            return
+        index, item = own_items.popleft() if own_items else shared_items.popleft()
+        try:
+            yield from process_item_steps(pages[slot], item, index, api, scheduled, log_func=snapshot_page)
+        except Exception as e:
+            # Already reported as item_failed; raising here would end every lane, not just this one
+            print(f"❌ Failed to process item {index} on tab {slot + 1}: {e}", file=sys.stderr)
+            snapshot_page(pages[slot], f"98_tab_{slot + 1}_item_{index}_failure")
+        if session is not None and (own_items or shared_items):
+            # Restarting the browser would pull the pages out from under the other lanes
+            pages[slot] = session.item_done(pages[slot], allow_context=False)
+
+def run_tabs(pages: list, items: list, api: XApi, scheduled: ScheduledQueue, session: SessionRecycler = None):
+    """
+    Processes items on several pages of the one logged-in context. The sync
+    Playwright API is single-threaded, so each page is a generator lane and
+    whichever lane's wait ends first runs next. Only those yielded waits (the
+    fixed settle delays between composer steps) overlap: navigation, selector
+    waits and waiting for the create response still block the thread, so the
+    gain is bounded by the settle delays. Post-now items all stay on the
+    first page, in their original order; scheduled items go to whichever
+    page is free.
+    """
+    post_now_items, scheduled_items = deque(), deque()
+    for index, item in enumerate(items, start=1):
+        (post_now_items if is_post_now(item) else scheduled_items).append((index, item))
+    lanes = [tab_lane(pages, 0, post_now_items, scheduled_items, api, scheduled, session)]
+    lanes += [tab_lane(pages, slot, deque(), scheduled_items, api, scheduled, session)
+              for slot in range(1, len(pages))]
+    print(f"🗂️ Composing on {len(pages)} tabs: {len(post_now_items)} post-now, {len(scheduled_items)} scheduled.")
+    wake_at = {lane: 0.0 for lane in lanes}
+    while wake_at:
+        lane = min(wake_at, key=wake_at.get)
+        delay = wake_at[lane] - time.monotonic()
+        if delay > 0:
+            # Lets Playwright keep delivering events for every page while all lanes wait
+            pages[0].wait_for_timeout(delay * 1000)
+        try:
+            wake_at[lane] = time.monotonic() + next(lane)
+        except StopIteration:
+            del wake_at[lane]
+
+def process_batch(page: Page, items: list, api: XApi, scheduled: ScheduledQueue, session: SessionRecycler):
+    """Processes a run's items, on several tabs if BOT_TABS asks for it. Returns the page in use at the end."""
+    print("\n🚀 Starting tweeting process...")
+    tabs = min(BOT_TABS, BOT_MAX_TABS, len(items))
+    if tabs > 1:
+        pages = [page] + [session.new_page() for _ in range(tabs - 1)]
+        try:
+            run_tabs(pages, items, api, scheduled, session)
+        finally:
+            for extra_page in pages[1:]:
+                session.close_page(extra_page)
+        return pages[0]
+    for i, item in enumerate(items):
+        if deadline_reached():
+            defer_items(items[i:])
+            break
+        process_item(page, item, i + 1, api, scheduled)
+        if i + 1 < len(items):
+            page = session.item_done(page)
+    return page
+
+def serve_stdin(page: Page, api: XApi = None, scheduled: ScheduledQueue = None, session: SessionRecycler = None):
+    """
+    Keeps the logged-in session warm and processes items as the controller
+    streams them in, one JSON object per line, until stdin is closed. A
+    line holding a JSON array is a whole batch, handled like the items
+    passed on the command line. Returns the page in use at the end, which
+    recycling may have replaced. A finished item is only counted towards
+    recycling when the next line arrives, so the last one never triggers a
+    page or browser restart that nothing would use.
+    """
+    print(f"👂 Warm session for '{BOT_CATEGORY}' waiting for items on stdin...")
+    item_pending = False
+    for index, line in enumerate(sys.stdin, start=1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            data = json.loads(line)
+        except json.JSONDecodeError:
+            print(f"❌ Ignoring streamed line {index}: not valid JSON.", file=sys.stderr)
+            continue
+        if item_pending and session is not None:
+            page = session.item_done(page)
+        item_pending = False
+        if isinstance(data, list):
+            # As with a command-line batch, a failure here ends the run with an error
+            page = process_batch(page, data, api, scheduled, session)
+            item_pending = bool(data)
+            continue
+        if deadline_reached():
+            defer_items([data])
+            continue
+        try:
+            process_item(page, data, index, api, scheduled)
+        except Exception as e:
+            # One bad item must not take the warm session down with it
+            print(f"❌ Failed to process streamed item {index}: {e}", file=sys.stderr)
+            log_page(page, f"98_stream_item_{index}_failure")
+        item_pending = True
+    return page
+
+
 # --- Main Orchestration ---
+def open_context(p):
+    """Launches the account's persistent browser context with the asset cache attached."""
+    context, launch_s = launch_context(
+        p, HAR.profile_dir(LOGIN_DATA_DIR),
+        viewport={"width": 1280, "height": 800},
+        # X's service worker would answer requests before the asset cache or HAR routing sees them
+        service_workers="block" if ASSET_CACHE or HAR.enabled else "allow",
+        **HAR.launch_options(),
+    )
+    METRICS.set("twitterbot_browser_launch_seconds", launch_s, category=BOT_CATEGORY)
+    report_memory("launch", METRICS, category=BOT_CATEGORY)
+    if HAR.enabled:
+        # A recording should hold the real responses, and a replay serves nothing else
+        HAR.attach(context)
+    else:
+        ASSETS.attach(context)
+    return context
+
 def main():
     if not all([EMAIL, PASSWORD, USERNAME, BOT_CATEGORY]):
         sys.exit("❌ FATAL: Credentials or BOT_CATEGORY not set.")
     if len(sys.argv) < 2:
         sys.exit("❌ FATAL: No data passed.")
+    preflight = sys.argv[1] == "--preflight"
+    stream = sys.argv[1] == "--stdin"
     try:
-        items_to_process = json.loads(sys.argv[1])
+        items_to_process = [] if preflight or stream else json.loads(sys.argv[1])
     except json.JSONDecodeError:
         sys.exit("❌ FATAL: Invalid JSON data.")
+    if HAR.mode == "replay" and not (preflight or stream or items_to_process):
+        items_to_process = HAR.recorded_items()
 
+    run_started = time.monotonic()
+    PROFILER.start()
     with sync_playwright() as p:
-        browser = None
+        session = None
+        session_ready = False
         try:
-            print(f"--- Starting session for bot: '{BOT_CATEGORY}' ---")
+            print(f"--- Starting session for bot: '{BOT_CATEGORY}' (account '{BOT_ACCOUNT}') ---")
             LOGIN_DATA_DIR.mkdir(parents=True, exist_ok=True)
-            browser = p.chromium.launch_persistent_context(
-                user_data_dir=str(LOGIN_DATA_DIR),
-                headless=True,
-                viewport={"width": 1280, "height": 800},
-            )
-            page = browser.new_page()
+            # The trace and a HAR recording belong to the first context, so the browser is only
+            # restarted when neither is on
+            session = SessionRecycler(lambda: open_context(p), metrics=METRICS, category=BOT_CATEGORY,
+                                      context_recycling=not PROFILER.enabled and not HAR.enabled)
+            PROFILER.trace(session.context)
+            page = session.new_page()
+            # Must be attached before /home loads so it can copy the app's API credentials
+            api = XApi(page)
+            session.api = api
             page.goto("https://twitter.com/home", timeout=60000)
             log_page(page, "00_init_check_login")
             
@@ -98,66 +393,53 @@ def main():
                 print("⚠️ Session invalid. Performing full login.")
                 if not perform_login(page):
                      raise Exception("Login failed, cannot proceed.")
+                logged_in = True
             else:
                 print("✅ Reused existing session successfully.")
+                logged_in = False
+            session_ready = True
+            METRICS.observe("twitterbot_step_duration_seconds", time.monotonic() - run_started,
+                            category=BOT_CATEGORY, step="session")
+            emit("session_ok", category=BOT_CATEGORY, logged_in=logged_in,
+                 duration_s=round(time.monotonic() - run_started, 3))
+
+            scheduled = None
+            if SCHEDULE_RECONCILE and not preflight:
+                scheduled = ScheduledQueue(api)
+                scheduled.load()
 
-            if not items_to_process:
+            if preflight:
+                print(f"✅ Pre-flight session check passed for '{BOT_CATEGORY}'.")
+            elif stream:
+                page = serve_stdin(page, api, scheduled, session)
+            elif not items_to_process:
                 print("ℹ️ No items to process.")
             else:
-                print("\n🚀 Starting tweeting process...")
-                now_ist = datetime.now(TIMEZONE)
-                post_now_threshold = now_ist + timedelta(minutes=5)
-
-                for i, item in enumerate(items_to_process):
-                    title = item.get("title", "No Title")
-                    url = item.get("url")
-                    time_str = item.get("time")
-                    
-                    if not url or not time_str:
-                        print(f"⚠️ Skipping item {i+1} due to missing URL/time.")
-                        continue
-
-                    tweet_text = f'"{title}"\n\n{url}'
-                    item_id = f"{i+1}_{url.split('/')[-1]}"
-
-                    # --- THIS IS THE CORRECTED LOGIC ---
-                    # 1. Remove any timezone info from the end of the string.
-                    if '+' in time_str:
-                        time_str = time_str.split('+')[0]
-                    # 2. Parse the string into a "naive" datetime object (no timezone).
-                    naive_dt = datetime.fromisoformat(time_str)
-                    # 3. Tell Python that this naive time is in the IST timezone.
-                    item_time = TIMEZONE.localize(naive_dt)
-                    # --- END OF CORRECTION ---
-
-                    # --- Timestamp Debugging Block ---
-                    print("\n--- TIMESTAMP DEBUG ---")
-                    print(f"Original DB String:   {item.get('time')}")
-                    print(f"Current IST Time:       {now_ist.isoformat()}")
-                    print(f"'Post Now' Threshold:   {post_now_threshold.isoformat()}")
-                    print(f"Item Time (as IST):     {item_time.isoformat()}")
-                    comparison_result = item_time <= post_now_threshold
-                    print(f"Comparison Result:      {comparison_result}")
-                    decision = "Post Now" if comparison_result else "Schedule"
-                    print(f"--> Decision: {decision}")
-                    print("-----------------------\n")
-
-                    if item_time <= post_now_threshold:
-                        post_now(page, tweet_text, log_page, item_id)
-                    else:
-                        schedule_post(page, tweet_text, item_time, log_page, item_id)
+                page = process_batch(page, items_to_process, api, scheduled, session)
 
             print(f"--- Session for bot '{BOT_CATEGORY}' finished successfully. ---")
+            emit("run_finished", category=BOT_CATEGORY, duration_s=round(time.monotonic() - run_started, 3), **RUN_COUNTS)
             log_page(page, "99_final_success")
 
         except Exception as e:
             print(f"❌ A critical error occurred: {e}", file=sys.stderr)
+            if not session_ready:
+                METRICS.inc("twitterbot_failures_total", category=BOT_CATEGORY, reason="session")
+                emit("session_failed", category=BOT_CATEGORY, reason=error_reason(e),
+                     duration_s=round(time.monotonic() - run_started, 3))
             if 'page' in locals():
                 log_page(page, "99_CRITICAL_FAILURE")
             sys.exit(1)
         finally:
-            if browser:
-                browser.close()
+            # The trace has to be saved while the context is still open
+            PROFILER.stop()
+            if session:
+                report_memory("end", METRICS, category=BOT_CATEGORY)
+                session.close()
+            HAR.finish(EMAIL, USERNAME, PASSWORD)
+            METRICS.write()
+            DEBUG_STORE.prune()
+            ASSETS.prune()
 
 if __name__ == "__main__":
     main()
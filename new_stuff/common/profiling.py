@@ -0,0 +1,84 @@
+import io
+import os
+import sys
+import pstats
+import cProfile
+import tracemalloc
+from pathlib import Path
+
+# --- Profiling Configuration ---
+# Set by `main_controller.py --profile`; each bot process writes into its own directory
+PROFILE_DIR = os.getenv("BOT_PROFILE_DIR")
+SUMMARY_TOP_FUNCTIONS = 15
+SUMMARY_TOP_ALLOCATIONS = 10
+TRACEMALLOC_FRAMES = 10
+
+SUMMARY_FILE = "summary.txt"
+
+
+class BotProfiler:
+    """
+    Collects a cProfile dump, a Playwright trace and tracemalloc peaks for
+    one bot process. Every method is a no-op unless BOT_PROFILE_DIR is set,
+    so the bot can call them unconditionally.
+    """
+
+    def __init__(self, directory=PROFILE_DIR):
+        self.directory = Path(directory) if directory else None
+        self.profile = None
+        self.context = None
+
+    @property
+    def enabled(self) -> bool:
+        return self.directory is not None
+
+    def start(self):
+        if not self.enabled:
+            return
+        self.directory.mkdir(parents=True, exist_ok=True)
+        tracemalloc.start(TRACEMALLOC_FRAMES)
+        self.profile = cProfile.Profile()
+        self.profile.enable()
+        print(f"🔬 Profiling into {self.directory}")
+
+    def trace(self, context):
+        """Starts Playwright tracing for `context`; call before the first navigation."""
+        if not self.enabled:
+            return
+        self.context = context
+        context.tracing.start(screenshots=True, snapshots=True, sources=False)
+
+    def stop(self):
+        """Saves the trace and profiles and writes the summary. Safe to call more than once."""
+        if not self.enabled or self.profile is None:
+            return
+        self.profile.disable()
+        if self.context is not None:
+            try:
+                self.context.tracing.stop(path=str(self.directory / "trace.zip"))
+                print(f"🔬 Open the trace with: playwright show-trace {self.directory / 'trace.zip'}")
+            except Exception as e:
+                print(f"⚠️ Could not save the Playwright trace: {e}", file=sys.stderr)
+            self.context = None
+        current, peak = tracemalloc.get_traced_memory()
+        snapshot = tracemalloc.take_snapshot()
+        tracemalloc.stop()
+
+        self.profile.dump_stats(str(self.directory / "cprofile.pstats"))
+        summary = self._summary(current, peak, snapshot)
+        (self.directory / SUMMARY_FILE).write_text(summary, encoding="utf-8")
+        self.profile = None
+        print(f"🔬 Profile saved to {self.directory}")
+
+    def _summary(self, current: int, peak: int, snapshot) -> str:
+        stream = io.StringIO()
+        stream.write(f"tracemalloc: current {current / 1024 / 1024:.1f} MiB, peak {peak / 1024 / 1024:.1f} MiB\n\n")
+        stream.write(f"Top {SUMMARY_TOP_ALLOCATIONS} allocation sites:\n")
+        for stat in snapshot.statistics("lineno")[:SUMMARY_TOP_ALLOCATIONS]:
+            stream.write(f"  {stat}\n")
+        stream.write(f"\nTop {SUMMARY_TOP_FUNCTIONS} functions by cumulative time:\n")
+        stats = pstats.Stats(self.profile, stream=stream)
+        stats.strip_dirs().sort_stats("cumulative").print_stats(SUMMARY_TOP_FUNCTIONS)
+        stream.write(f"Top {SUMMARY_TOP_FUNCTIONS} functions by own time:\n")
+        stats.sort_stats("tottime").print_stats(SUMMARY_TOP_FUNCTIONS)
+        return stream.getvalue()
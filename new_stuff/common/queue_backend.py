@@ -0,0 +1,396 @@
+import os
+import sys
+import copy
+import json
+import uuid
+import socket
+import sqlite3
+import threading
+from abc import ABC, abstractmethod
+from pathlib import Path
+from datetime import datetime, timedelta, timezone
+
+from watermark import WatermarkStore
+
+# --- Queue Configuration ---
+QUEUE_BACKEND = os.getenv("QUEUE_BACKEND", "supabase")
+QUEUE_DB = Path(os.getenv("QUEUE_DB", str(Path("state") / "queue.sqlite3")))
+QUEUE_MAX_ATTEMPTS = int(os.getenv("QUEUE_MAX_ATTEMPTS", "3"))
+SUPABASE_TABLES = ["processed_urls", "to_process"]
+# A claimed row belongs to its runner until the lease expires; a live runner renews it every third of this
+QUEUE_LEASE_SECONDS = int(os.getenv("QUEUE_LEASE_SECONDS", "900"))
+# Most rows one runner claims per category at a time (0 = all it fetched)
+QUEUE_CLAIM_LIMIT = int(os.getenv("QUEUE_CLAIM_LIMIT", "0"))
+RUNNER_ID = os.getenv("QUEUE_RUNNER_ID") or f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+# Run once in the Supabase SQL editor to let several runners share the tables
+LEASE_MIGRATION_SQL = """
+ALTER TABLE processed_urls ADD COLUMN IF NOT EXISTS lease_owner text,
+    ADD COLUMN IF NOT EXISTS lease_expires_at timestamptz, ADD COLUMN IF NOT EXISTS acked_at timestamptz,
+    ADD COLUMN IF NOT EXISTS created_id text;
+ALTER TABLE to_process ADD COLUMN IF NOT EXISTS lease_owner text,
+    ADD COLUMN IF NOT EXISTS lease_expires_at timestamptz, ADD COLUMN IF NOT EXISTS acked_at timestamptz,
+    ADD COLUMN IF NOT EXISTS created_id text;
+"""
+
+ROW_FIELDS = ("url", "bot", "time", "title")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS queue (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    url TEXT,
+    bot TEXT,
+    time TEXT,
+    title TEXT,
+    status TEXT NOT NULL DEFAULT 'pending',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    last_error TEXT,
+    updated_at TEXT,
+    lease_owner TEXT,
+    lease_expires_at TEXT,
+    created_id TEXT
+);
+CREATE INDEX IF NOT EXISTS queue_status ON queue (status, id);
+"""
+# Added after the first release; older queue files get them on open
+ADDED_COLUMNS = ("lease_owner", "lease_expires_at", "created_id")
+
+
+def _utc_now() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+def _lease_expiry() -> str:
+    return (datetime.now(timezone.utc) + timedelta(seconds=QUEUE_LEASE_SECONDS)).isoformat()
+
+
+def _claim_window(rows: list) -> list:
+    return rows[:QUEUE_CLAIM_LIMIT] if QUEUE_CLAIM_LIMIT > 0 else rows
+
+
+class QueueBackend(ABC):
+    """
+    Where queued rows come from and where their outcome goes. A run calls
+    `fetch()`, `claim()`s what it is about to post, `renew()`s the lease
+    while it works, then `ack()`s rows that were posted or deliberately
+    skipped, `fail()`s rows whose bot tried and failed and `release()`s the
+    rest so another runner can take them.
+    """
+
+    name = "base"
+
+    @abstractmethod
+    def fetch(self, full_reconcile: bool = False) -> list:
+        """Returns the rows that still need handling."""
+
+    def claim(self, rows: list) -> list:
+        """Leases rows to this runner. Returns the subset it now owns."""
+        return rows
+
+    def renew(self, rows: list):
+        """Extends the lease on rows this runner still owns."""
+
+    def release(self, rows: list):
+        """Gives up the lease on rows without recording an outcome."""
+
+    @abstractmethod
+    def ack(self, rows: list, created_ids: dict = None):
+        """Records rows as done; `created_ids` maps str(row id) to the post or schedule id made for it."""
+
+    def fail(self, rows: list, reasons: dict = None):
+        """Records failed attempts and releases the rows; `reasons` maps str(row id) to a short reason."""
+        self.release(rows)
+
+    def save(self):
+        """Persists any state buffered by the calls above."""
+
+
+class SupabaseQueue(QueueBackend):
+    """
+    Reads 'processed_urls', falling back to 'to_process', past a local
+    watermark. Leases live in the lease_owner / lease_expires_at / acked_at
+    columns (see LEASE_MIGRATION_SQL) and are taken with one conditional
+    UPDATE, so two runners can never both win a row. Without those columns
+    it warns once and runs unleased, as a single runner.
+    """
+
+    name = "supabase"
+
+    def __init__(self, supabase, watermark_file: Path):
+        self.supabase = supabase
+        self.watermarks = WatermarkStore(watermark_file)
+        self.source_table = None
+        self.leases = True
+
+    def _without_leases(self, error: Exception):
+        self.leases = False
+        print(f"⚠️ Queue leases are unavailable ({error}). Running as a single runner; "
+              f"apply LEASE_MIGRATION_SQL to share the queue:{LEASE_MIGRATION_SQL}", file=sys.stderr)
+
+    def _ids(self, rows: list) -> list:
+        return [row["id"] for row in rows if row.get("id") is not None]
+
+    def for_table(self, table: str) -> "SupabaseQueue":
+        """This queue bound to `table` without a fetch, for rows that arrive some other way (subscribe)."""
+        view = copy.copy(self)
+        view.source_table = table
+        return view
+
+    def _is_empty(self, table: str) -> bool:
+        return not (self.supabase.table(table).select("id").limit(1).execute().data or [])
+
+    def fetch(self, full_reconcile: bool = False) -> list:
+        """
+        Fetches rows past the watermark of 'processed_urls', or of 'to_process'
+        only while 'processed_urls' is empty, as the controller always has.
+        A table with nothing new does not send the run to the next one.
+        """
+        for table in SUPABASE_TABLES:
+            if table != SUPABASE_TABLES[-1] and self._is_empty(table):
+                print(f"ℹ️ '{table}' is empty. Falling back to the next table.")
+                continue
+            print(f"Attempting to fetch new data from '{table}'...")
+            self.source_table = table
+            rows = self.watermarks.fetch(self.supabase, table, full_reconcile)
+            # Rows another runner finished are only new to this runner's watermark
+            done_elsewhere = [row for row in rows if row.get("acked_at")]
+            if done_elsewhere:
+                self.watermarks.mark_seen(table, done_elsewhere)
+                rows = [row for row in rows if not row.get("acked_at")]
+            print(f"✅ {len(rows)} new row(s) found in '{table}'." if rows else f"ℹ️ No new rows in '{table}'.")
+            return rows
+        return []
+
+    def claim(self, rows: list) -> list:
+        rows = _claim_window(rows)
+        if not self.leases or not rows or not self.source_table:
+            return rows
+        now = _utc_now()
+        try:
+            claimed = (
+                self.supabase.table(self.source_table)
+                .update({"lease_owner": RUNNER_ID, "lease_expires_at": _lease_expiry()})
+                .in_("id", self._ids(rows))
+                .is_("acked_at", "null")
+                .or_(f'lease_expires_at.is.null,lease_expires_at.lt."{now}",lease_owner.eq."{RUNNER_ID}"')
+                .execute().data or []
+            )
+        except Exception as e:
+            self._without_leases(e)
+            return rows
+        claimed_ids = {row["id"] for row in claimed}
+        if len(claimed_ids) < len(rows):
+            print(f"🔒 {len(rows) - len(claimed_ids)} row(s) are leased or done by another runner.")
+        return [row for row in rows if row["id"] in claimed_ids]
+
+    def renew(self, rows: list):
+        if not self.leases or not rows:
+            return
+        (self.supabase.table(self.source_table)
+         .update({"lease_expires_at": _lease_expiry()})
+         .in_("id", self._ids(rows)).eq("lease_owner", RUNNER_ID).execute())
+
+    def release(self, rows: list):
+        if not rows or not self.source_table:
+            return
+        # Not acked, so the next fetch asks for these rows again whatever the watermark says
+        self.watermarks.mark_pending(self.source_table, rows)
+        if not self.leases:
+            return
+        (self.supabase.table(self.source_table)
+         .update({"lease_owner": None, "lease_expires_at": None})
+         .in_("id", self._ids(rows)).eq("lease_owner", RUNNER_ID).execute())
+
+    def ack(self, rows: list, created_ids: dict = None):
+        if not self.source_table:
+            return
+        if self.leases and rows:
+            # acked_at is what stops other runners, whose watermarks have not seen these rows, from reposting them.
+            # Rows never claimed (rejected or duplicate) are unleased; a lease another runner took since is left alone.
+            try:
+                (self.supabase.table(self.source_table)
+                 .update({"acked_at": _utc_now(), "lease_owner": None, "lease_expires_at": None})
+                 .in_("id", self._ids(rows))
+                 .or_(f'lease_owner.is.null,lease_owner.eq."{RUNNER_ID}"')
+                 .execute())
+            except Exception as e:
+                self._without_leases(e)
+        if self.leases and created_ids:
+            self._store_created_ids(rows, created_ids)
+        self.watermarks.mark_seen(self.source_table, rows)
+
+    def _store_created_ids(self, rows: list, created_ids: dict):
+        # One UPDATE per row, since every row gets its own value
+        for row in rows:
+            created_id = created_ids.get(str(row.get("id")))
+            if not created_id:
+                continue
+            try:
+                (self.supabase.table(self.source_table)
+                 .update({"created_id": created_id}).eq("id", row["id"]).execute())
+            except Exception as e:
+                print(f"⚠️ Could not store created ids ({e}); apply LEASE_MIGRATION_SQL.", file=sys.stderr)
+                return
+
+    def save(self):
+        # Reconcile timestamps need persisting even when nothing was acked
+        self.watermarks.save()
+
+
+class SqliteQueue(QueueBackend):
+    """
+    Local queue in a single SQLite file, for running the whole pipeline
+    without Supabase and for high-volume setups fed in bulk with `import_rows`.
+    """
+
+    name = "sqlite"
+
+    def __init__(self, path: Path = QUEUE_DB):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.conn = sqlite3.connect(str(self.path), check_same_thread=False, timeout=30)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.executescript(SCHEMA)
+        columns = {record["name"] for record in self.conn.execute("PRAGMA table_info(queue)")}
+        for column in ADDED_COLUMNS:
+            if column not in columns:
+                self.conn.execute(f"ALTER TABLE queue ADD COLUMN {column} TEXT")
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _row(record) -> dict:
+        return {"id": record["id"], **{field: record[field] for field in ROW_FIELDS}}
+
+    def fetch(self, full_reconcile: bool = False) -> list:
+        # 'claimed' rows with a lapsed lease were left behind by a runner that died
+        records = self.conn.execute(
+            "SELECT * FROM queue WHERE (status IN ('pending', 'claimed') "
+            "OR (status = 'failed' AND attempts < ?)) "
+            "AND (lease_expires_at IS NULL OR lease_expires_at < ? OR lease_owner = ?) ORDER BY id",
+            (QUEUE_MAX_ATTEMPTS, _utc_now(), RUNNER_ID),
+        ).fetchall()
+        print(f"✅ {len(records)} row(s) ready in the local queue.")
+        return [self._row(record) for record in records]
+
+    def _set_status(self, rows: list, status: str, extra_sql: str = "", extra_args=None):
+        now = datetime.now().isoformat()
+        with self._lock, self.conn:
+            self.conn.executemany(
+                f"UPDATE queue SET status = ?, updated_at = ?, lease_owner = NULL, lease_expires_at = NULL{extra_sql} "
+                f"WHERE id = ? AND (lease_owner IS NULL OR lease_owner = ?)",
+                [(status, now, *(extra_args(row) if extra_args else ()), row["id"], RUNNER_ID) for row in rows],
+            )
+
+    def claim(self, rows: list) -> list:
+        rows = _claim_window(rows)
+        now = _utc_now()
+        with self._lock:
+            # BEGIN IMMEDIATE takes the write lock up front, so concurrent runners claim one after another
+            self.conn.execute("BEGIN IMMEDIATE")
+            try:
+                self.conn.executemany(
+                    "UPDATE queue SET status = 'claimed', lease_owner = ?, lease_expires_at = ?, updated_at = ? "
+                    "WHERE id = ? AND status != 'done' "
+                    "AND (lease_expires_at IS NULL OR lease_expires_at < ? OR lease_owner = ?)",
+                    [(RUNNER_ID, _lease_expiry(), datetime.now().isoformat(), row["id"], now, RUNNER_ID) for row in rows],
+                )
+                claimed_ids = {record["id"] for record in self.conn.execute(
+                    "SELECT id FROM queue WHERE lease_owner = ?", (RUNNER_ID,)
+                )}
+                self.conn.commit()
+            except Exception:
+                self.conn.rollback()
+                raise
+        owned = [row for row in rows if row["id"] in claimed_ids]
+        if len(owned) < len(rows):
+            print(f"🔒 {len(rows) - len(owned)} row(s) are leased or done by another runner.")
+        return owned
+
+    def renew(self, rows: list):
+        with self._lock, self.conn:
+            self.conn.executemany(
+                "UPDATE queue SET lease_expires_at = ? WHERE id = ? AND lease_owner = ?",
+                [(_lease_expiry(), row["id"], RUNNER_ID) for row in rows],
+            )
+
+    def release(self, rows: list):
+        with self._lock, self.conn:
+            self.conn.executemany(
+                "UPDATE queue SET lease_owner = NULL, lease_expires_at = NULL WHERE id = ? AND lease_owner = ?",
+                [(row["id"], RUNNER_ID) for row in rows],
+            )
+
+    def ack(self, rows: list, created_ids: dict = None):
+        created_ids = created_ids or {}
+        self._set_status(rows, "done", ", created_id = ?", lambda row: (created_ids.get(str(row["id"])),))
+
+    def fail(self, rows: list, reasons: dict = None):
+        reasons = reasons or {}
+        self._set_status(rows, "failed", ", attempts = attempts + 1, last_error = ?",
+                         lambda row: (reasons.get(str(row["id"])),))
+
+    def import_rows(self, rows: list) -> int:
+        """Bulk-inserts rows in one transaction. Returns how many were added."""
+        now = datetime.now().isoformat()
+        with self.conn:
+            self.conn.executemany(
+                "INSERT INTO queue (url, bot, time, title, updated_at) VALUES (?, ?, ?, ?, ?)",
+                [tuple(row.get(field) for field in ROW_FIELDS) + (now,) for row in rows],
+            )
+        return len(rows)
+
+
+class LeaseKeeper:
+    """Renews the leases of every row handed to `add()` in the background until `stop()`."""
+
+    def __init__(self, queue: QueueBackend, interval: float = QUEUE_LEASE_SECONDS / 3):
+        self.queue = queue
+        self.interval = interval
+        self.rows = []
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def add(self, rows: list):
+        with self._lock:
+            self.rows.extend(rows)
+
+    def remove(self, rows: list):
+        """Stops renewing rows that have been acked, failed or released."""
+        row_ids = {row.get("id") for row in rows}
+        with self._lock:
+            self.rows = [row for row in self.rows if row.get("id") not in row_ids]
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            with self._lock:
+                rows = list(self.rows)
+            try:
+                self.queue.renew(rows)
+            except Exception as e:
+                print(f"⚠️ Could not renew queue leases: {e}", file=sys.stderr)
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+
+def open_queue(supabase_url: str = None, supabase_key: str = None, watermark_file: Path = None) -> QueueBackend:
+    """Returns the backend chosen by QUEUE_BACKEND."""
+    if QUEUE_BACKEND == "sqlite":
+        return SqliteQueue()
+    if QUEUE_BACKEND != "supabase":
+        raise ValueError(f"Unknown QUEUE_BACKEND '{QUEUE_BACKEND}' (expected 'supabase' or 'sqlite').")
+    if not supabase_url or not supabase_key:
+        raise ValueError("Supabase environment variables not set.")
+    from supabase import create_client
+    return SupabaseQueue(create_client(supabase_url, supabase_key), watermark_file)
+
+
+def load_import_file(path: Path) -> list:
+    """Reads a JSON array (or JSON Lines) of rows for `SqliteQueue.import_rows`."""
+    text = Path(path).read_text(encoding="utf-8").strip()
+    if text.startswith("["):
+        return json.loads(text)
+    return [json.loads(line) for line in text.splitlines() if line.strip()]
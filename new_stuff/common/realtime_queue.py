@@ -0,0 +1,94 @@
+import os
+import sys
+import json
+import time
+from urllib.parse import urlencode
+
+from websockets.sync.client import connect
+from websockets.exceptions import ConnectionClosed
+
+# --- Realtime Configuration ---
+HEARTBEAT_INTERVAL = 25
+RECONNECT_MAX_DELAY = 60
+
+
+def realtime_url(supabase_url: str, supabase_key: str) -> str:
+    """
+    Builds the Supabase Realtime websocket URL. REALTIME_URL overrides it so
+    a local websocket stand-in can be used in tests.
+    """
+    override = os.getenv("REALTIME_URL")
+    if override:
+        return override
+    base = supabase_url.rstrip("/").replace("https://", "wss://").replace("http://", "ws://")
+    return f"{base}/realtime/v1/websocket?{urlencode({'apikey': supabase_key, 'vsn': '1.0.0'})}"
+
+
+class RealtimeSubscriber:
+    """
+    Minimal Supabase Realtime (Phoenix channel) client that yields rows
+    inserted into the given tables. Heartbeats keep the socket alive and a
+    dropped connection is re-established with exponential backoff.
+    """
+
+    def __init__(self, url: str, api_key: str, tables):
+        self.url = url
+        self.api_key = api_key
+        self.tables = list(tables)
+        self._ref = 0
+
+    def _send(self, ws, topic: str, event: str, payload: dict):
+        self._ref += 1
+        ws.send(json.dumps({"topic": topic, "event": event, "payload": payload, "ref": str(self._ref)}))
+
+    def _join(self, ws):
+        for table in self.tables:
+            self._send(ws, f"realtime:public:{table}", "phx_join", {
+                "config": {"postgres_changes": [{"event": "INSERT", "schema": "public", "table": table}]},
+                "access_token": self.api_key,
+            })
+
+    @staticmethod
+    def _extract_insert(message: dict):
+        """Returns (table, row) for insert notifications, in either payload format."""
+        payload = message.get("payload") or {}
+        if message.get("event") == "postgres_changes":
+            data = payload.get("data") or {}
+            if data.get("type") == "INSERT":
+                return data.get("table"), data.get("record")
+        elif message.get("event") == "INSERT":
+            return payload.get("table"), payload.get("record")
+        return None, None
+
+    def listen(self):
+        """Yields (table, row) for every insert, forever."""
+        delay = 1
+        while True:
+            try:
+                with connect(self.url) as ws:
+                    self._join(ws)
+                    print(f"📡 Subscribed to inserts on {', '.join(self.tables)}.")
+                    delay = 1
+                    next_heartbeat = time.monotonic() + HEARTBEAT_INTERVAL
+                    while True:
+                        try:
+                            raw = ws.recv(timeout=max(0.1, next_heartbeat - time.monotonic()))
+                        except TimeoutError:
+                            self._send(ws, "phoenix", "heartbeat", {})
+                            next_heartbeat = time.monotonic() + HEARTBEAT_INTERVAL
+                            continue
+                        try:
+                            message = json.loads(raw)
+                        except (json.JSONDecodeError, TypeError):
+                            # A stray frame must not end the subscription
+                            print(f"⚠️ Ignoring a non-JSON realtime frame: {str(raw)[:80]!r}", file=sys.stderr)
+                            continue
+                        if not isinstance(message, dict):
+                            continue
+                        table, row = self._extract_insert(message)
+                        if row:
+                            yield table, row
+            except (ConnectionClosed, OSError) as e:
+                print(f"⚠️ Realtime connection lost ({e}). Reconnecting in {delay}s...", file=sys.stderr)
+                time.sleep(delay)
+                delay = min(delay * 2, RECONNECT_MAX_DELAY)
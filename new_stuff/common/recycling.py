@@ -0,0 +1,113 @@
+import os
+import time
+
+from browser_launch import browser_memory_mb
+
+# --- Recycling Configuration ---
+# A page is replaced after this many items or this much JS heap; 0 turns a limit off
+RECYCLE_PAGE_ITEMS = int(os.getenv("RECYCLE_PAGE_ITEMS", "25"))
+RECYCLE_PAGE_MB = int(os.getenv("RECYCLE_PAGE_MB", "400"))
+# The whole browser is restarted on the same profile after this many items or this much memory
+RECYCLE_CONTEXT_ITEMS = int(os.getenv("RECYCLE_CONTEXT_ITEMS", "150"))
+RECYCLE_CONTEXT_MB = int(os.getenv("RECYCLE_CONTEXT_MB", "1500"))
+HOME_URL = "https://x.com/home"
+
+_HEAP_SCRIPT = "() => (performance.memory && performance.memory.usedJSHeapSize) || 0"
+
+
+def page_heap_mb(page) -> float:
+    """The page's used JS heap in MB, as Chromium reports it, or 0 if it cannot be read."""
+    try:
+        return page.evaluate(_HEAP_SCRIPT) / 1024 / 1024
+    except Exception:
+        return 0.0
+
+
+class SessionRecycler:
+    """
+    Owns a bot's browser context and hands out fresh pages before old ones
+    grow too large. After each item, `item_done(page)` counts the item and,
+    once the page or the context is over its limit, swaps it for a new one.
+    The login session survives both: a new page shares the context's
+    cookies, and a restarted context reopens the same persistent profile.
+    The XApi bound to a replaced page is moved to its successor, so callers
+    only have to continue with the page `item_done` returns.
+    """
+
+    def __init__(self, launch, api=None, metrics=None, category: str = None, context_recycling: bool = True):
+        self.launch = launch
+        self.api = api
+        self.metrics = metrics
+        self.category = category
+        self.context_recycling = context_recycling
+        self.context = launch()
+        self.page_items = {}
+        self.context_items = 0
+
+    def new_page(self):
+        page = self.context.new_page()
+        self.page_items[page] = 0
+        return page
+
+    def close_page(self, page):
+        self.page_items.pop(page, None)
+        page.close()
+
+    def item_done(self, page, allow_context: bool = True):
+        """Counts one finished item on `page` and returns the page to use for the next one."""
+        self.page_items[page] = self.page_items.get(page, 0) + 1
+        self.context_items += 1
+
+        if allow_context and self.context_recycling and len(self.page_items) == 1:
+            reason = self._over_limit(self.context_items, RECYCLE_CONTEXT_ITEMS,
+                                      browser_memory_mb() or 0, RECYCLE_CONTEXT_MB)
+            if reason:
+                return self._replace_context(page, reason)
+
+        reason = self._over_limit(self.page_items[page], RECYCLE_PAGE_ITEMS, page_heap_mb(page), RECYCLE_PAGE_MB)
+        if reason:
+            return self._replace_page(page, reason)
+        return page
+
+    @staticmethod
+    def _over_limit(items: int, max_items: int, memory_mb: float, max_mb: int) -> str:
+        if max_items and items >= max_items:
+            return f"{items} items"
+        if max_mb and memory_mb >= max_mb:
+            return f"{memory_mb:.0f} MB"
+        return ""
+
+    def _open_home(self, page):
+        page.goto(HOME_URL, wait_until="domcontentloaded", timeout=60000)
+        if "login" in page.url:
+            raise RuntimeError("Session was lost while recycling the browser.")
+        if self.api is not None and (self.api.page is None or self.api.page.is_closed()):
+            self.api.attach(page)
+
+    def _replace_page(self, page, reason: str):
+        started = time.monotonic()
+        self.close_page(page)
+        new_page = self.new_page()
+        self._open_home(new_page)
+        self._count("page", reason, started)
+        return new_page
+
+    def _replace_context(self, page, reason: str):
+        started = time.monotonic()
+        self.page_items.clear()
+        self.context.close()
+        self.context = self.launch()
+        self.context_items = 0
+        new_page = self.new_page()
+        self._open_home(new_page)
+        self._count("context", reason, started)
+        return new_page
+
+    def _count(self, kind: str, reason: str, started: float):
+        print(f"♻️ Replaced the {kind} after {reason} ({time.monotonic() - started:.1f}s).")
+        if self.metrics is not None:
+            self.metrics.inc("twitterbot_recycles_total", category=self.category, kind=kind)
+
+    def close(self):
+        self.page_items.clear()
+        self.context.close()
@@ -0,0 +1,192 @@
+import os
+import math
+import sqlite3
+import threading
+from pathlib import Path
+from datetime import datetime, timedelta
+
+# --- History Configuration ---
+HISTORY_DB = Path("state") / "run_history.sqlite3"
+BASELINE_RUNS = int(os.getenv("STATS_BASELINE_RUNS", "10"))
+REGRESSION_THRESHOLD = float(os.getenv("STATS_REGRESSION_THRESHOLD", "1.5"))
+# The database is committed to state/ after every run, so old runs are dropped
+RETENTION_DAYS = int(os.getenv("STATS_RETENTION_DAYS", "90"))
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    command TEXT NOT NULL,
+    started_at TEXT NOT NULL,
+    finished_at TEXT,
+    posted INTEGER DEFAULT 0,
+    skipped INTEGER DEFAULT 0,
+    failed INTEGER DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS timings (
+    run_id INTEGER NOT NULL REFERENCES runs(id),
+    category TEXT NOT NULL,
+    step TEXT NOT NULL,
+    item_id TEXT,
+    duration_s REAL,
+    outcome TEXT NOT NULL,
+    recorded_at TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS timings_step ON timings (category, step, run_id);
+"""
+
+# Event kind -> (step name, outcome) for events that carry a duration
+EVENT_STEPS = {
+    "session_ok": ("session", "ok"),
+    "session_failed": ("session", "failed"),
+    "item_failed": ("item", "failed"),
+    "run_finished": ("bot_run", "ok"),
+}
+
+
+def percentile(values, pct: float):
+    """Nearest-rank percentile of a non-empty list."""
+    ordered = sorted(values)
+    rank = max(1, math.ceil(pct / 100 * len(ordered)))
+    return ordered[rank - 1]
+
+
+class RunHistory:
+    """
+    Append-only SQLite history of every run's per-phase and per-item
+    timings and outcomes, with percentile and regression queries on top.
+    Runs older than RETENTION_DAYS are dropped whenever a new one starts.
+    """
+
+    def __init__(self, path: Path = HISTORY_DB):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.conn = sqlite3.connect(str(self.path), check_same_thread=False)
+        self.conn.executescript(SCHEMA)
+        self._lock = threading.Lock()
+
+    # --- Recording ---
+    def start_run(self, command: str) -> int:
+        self.prune()
+        with self._lock, self.conn:
+            cursor = self.conn.execute(
+                "INSERT INTO runs (command, started_at) VALUES (?, ?)", (command, datetime.now().isoformat())
+            )
+        return cursor.lastrowid
+
+    def record(self, run_id: int, category: str, step: str, duration_s, outcome: str = "ok", item_id=None):
+        with self._lock, self.conn:
+            self.conn.execute(
+                "INSERT INTO timings VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (run_id, category, step, None if item_id is None else str(item_id),
+                 duration_s, outcome, datetime.now().isoformat()),
+            )
+
+    def finish_run(self, run_id: int):
+        with self._lock, self.conn:
+            self.conn.execute(
+                """
+                UPDATE runs SET finished_at = ?,
+                    posted = (SELECT COUNT(*) FROM timings WHERE run_id = ? AND step IN ('posted', 'scheduled')),
+                    skipped = (SELECT COUNT(*) FROM timings WHERE run_id = ? AND outcome = 'skipped'),
+                    failed = (SELECT COUNT(*) FROM timings WHERE run_id = ? AND step = 'item' AND outcome = 'failed')
+                WHERE id = ?
+                """,
+                (datetime.now().isoformat(), run_id, run_id, run_id, run_id),
+            )
+
+    def prune(self, days: int = RETENTION_DAYS) -> int:
+        """Deletes runs started more than `days` days ago with their timings. Returns how many runs went."""
+        cutoff = (datetime.now() - timedelta(days=days)).isoformat()
+        with self._lock:
+            with self.conn:
+                self.conn.execute(
+                    "DELETE FROM timings WHERE run_id IN (SELECT id FROM runs WHERE started_at < ?)", (cutoff,)
+                )
+                deleted = self.conn.execute("DELETE FROM runs WHERE started_at < ?", (cutoff,)).rowcount
+            if deleted:
+                # Gives the freed pages back, so the committed file actually shrinks
+                self.conn.execute("VACUUM")
+        return deleted
+
+    def listener(self, run_id: int):
+        """Returns a RunProgress listener that records every timed event of the run."""
+        def on_event(category: str, event: dict):
+            kind = event["event"]
+            if kind == "item_posted":
+                self.record(run_id, category, event.get("action") or "item", event.get("duration_s"),
+                            "ok", event.get("row_id"))
+            elif kind == "item_skipped":
+                self.record(run_id, category, "item", None, "skipped", event.get("row_id"))
+            elif kind in EVENT_STEPS:
+                step, outcome = EVENT_STEPS[kind]
+                self.record(run_id, category, step, event.get("duration_s"), outcome, event.get("row_id"))
+        return on_event
+
+    # --- Queries ---
+    def step_stats(self, days: int = 30):
+        """Yields (category, step, count, p50, p95) over the last `days` days."""
+        since = (datetime.now() - timedelta(days=days)).isoformat()
+        rows = self.conn.execute(
+            "SELECT category, step, duration_s FROM timings "
+            "WHERE recorded_at >= ? AND duration_s IS NOT NULL AND outcome = 'ok' ORDER BY category, step",
+            (since,),
+        ).fetchall()
+        groups = {}
+        for category, step, duration in rows:
+            groups.setdefault((category, step), []).append(duration)
+        for (category, step), durations in groups.items():
+            yield category, step, len(durations), percentile(durations, 50), percentile(durations, 95)
+
+    def daily_stats(self, step: str, days: int = 30):
+        """Yields (day, count, p50, p95) of `step` across all categories."""
+        since = (datetime.now() - timedelta(days=days)).isoformat()
+        rows = self.conn.execute(
+            "SELECT substr(recorded_at, 1, 10), duration_s FROM timings "
+            "WHERE step = ? AND recorded_at >= ? AND duration_s IS NOT NULL AND outcome = 'ok'",
+            (step, since),
+        ).fetchall()
+        groups = {}
+        for day, duration in rows:
+            groups.setdefault(day, []).append(duration)
+        for day in sorted(groups):
+            yield day, len(groups[day]), percentile(groups[day], 50), percentile(groups[day], 95)
+
+    def regressions(self, threshold: float = REGRESSION_THRESHOLD, baseline_runs: int = BASELINE_RUNS):
+        """
+        Compares each run's per-step median with the median of that step over
+        the `baseline_runs` runs before it. Yields (run_id, category, step,
+        p50, baseline) for the most recent run of each step that is slower
+        than `threshold` times its baseline.
+        """
+        rows = self.conn.execute(
+            "SELECT run_id, category, step, duration_s FROM timings "
+            "WHERE duration_s IS NOT NULL AND outcome = 'ok' ORDER BY run_id"
+        ).fetchall()
+        per_run = {}
+        for run_id, category, step, duration in rows:
+            per_run.setdefault((category, step), {}).setdefault(run_id, []).append(duration)
+        for (category, step), runs in per_run.items():
+            run_ids = sorted(runs)
+            latest = run_ids[-1]
+            history = [percentile(runs[r], 50) for r in run_ids[:-1][-baseline_runs:]]
+            if len(history) < 3:
+                continue
+            baseline = percentile(history, 50)
+            current = percentile(runs[latest], 50)
+            if baseline > 0 and current > threshold * baseline:
+                yield latest, category, step, current, baseline
+
+    def recent_counts(self, hours: int = 24) -> dict:
+        """Posts plus schedules per category (or account) over the last `hours` hours."""
+        since = (datetime.now() - timedelta(hours=hours)).isoformat()
+        return dict(self.conn.execute(
+            "SELECT category, COUNT(*) FROM timings WHERE step IN ('posted', 'scheduled') "
+            "AND outcome = 'ok' AND recorded_at >= ? GROUP BY category",
+            (since,),
+        ).fetchall())
+
+    def recent_runs(self, limit: int = 10):
+        return self.conn.execute(
+            "SELECT id, command, started_at, finished_at, posted, skipped, failed FROM runs ORDER BY id DESC LIMIT ?",
+            (limit,),
+        ).fetchall()
@@ -0,0 +1,196 @@
+import os
+import sys
+import json
+import subprocess
+import threading
+from collections import deque
+from pathlib import Path
+from datetime import datetime
+
+from events import parse_event
+
+# --- Progress Configuration ---
+ITEM_STATUS_FILE = Path("debug_logs") / "item_status.json"
+# Finished items a long-lived consumer (subscribe) keeps in the status file
+ITEM_STATUS_MAX_FINISHED = int(os.getenv("ITEM_STATUS_MAX_FINISHED", "200"))
+CHILD_LOG_TAIL_LINES = 200
+
+FINAL_STATUSES = {
+    "item_posted": "posted", "item_skipped": "skipped", "item_failed": "failed", "item_deferred": "deferred",
+}
+
+
+class RunProgress:
+    """
+    Consumes progress events from bot processes as they stream in, prints
+    them live and rewrites the per-item status file after every item event.
+    Extra listeners receive every (category, event) pair as well. Entries
+    stay until `forget()` drops them, or, given `max_finished`, only that
+    many finished entries are kept and the oldest are dropped.
+    """
+
+    def __init__(self, status_file: Path = ITEM_STATUS_FILE, max_finished: int = None):
+        self.status_file = Path(status_file)
+        self.max_finished = max_finished
+        self.items = {}
+        self.listeners = []
+        self._lock = threading.Lock()
+
+    def add_listener(self, listener):
+        self.listeners.append(listener)
+
+    def handle(self, category: str, event: dict):
+        kind = event["event"]
+        with self._lock:
+            if kind.startswith("item_"):
+                self._update_item(category, event)
+            for listener in self.listeners:
+                listener(category, event)
+        self._print(category, event)
+
+    def _update_item(self, category: str, event: dict):
+        row_id = str(event.get("row_id"))
+        entry = self.items.setdefault(row_id, {"category": category, "url": event.get("url")})
+        entry["status"] = FINAL_STATUSES.get(event["event"], "started")
+        entry["updated_at"] = datetime.now().isoformat()
+        for key in ("action", "created_id", "reason", "duration_s"):
+            if key in event:
+                entry[key] = event[key]
+        if self.max_finished is not None and entry["status"] != "started":
+            # Moved to the end, so the dict stays in finishing order
+            self.items[row_id] = self.items.pop(row_id)
+            finished = [key for key, item in self.items.items() if item["status"] != "started"]
+            for key in finished[:len(finished) - self.max_finished]:
+                del self.items[key]
+        self._write_status()
+
+    def _write_status(self):
+        self.status_file.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.status_file.with_suffix(".json.tmp")
+        tmp_path.write_text(json.dumps(self.items, indent=2), encoding="utf-8")
+        os.replace(tmp_path, self.status_file)
+
+    def forget(self, row_ids):
+        """
+        Drops the entries of `row_ids` once the queue no longer needs their
+        status. The status file keeps them until the next item event.
+        """
+        with self._lock:
+            for row_id in row_ids:
+                self.items.pop(str(row_id), None)
+
+    @staticmethod
+    def _print(category: str, event: dict):
+        kind = event["event"]
+        if kind == "session_ok":
+            how = "logged in" if event.get("logged_in") else "reused session"
+            print(f"[{category}] 🔑 Session ready ({how}) in {event.get('duration_s')}s")
+        elif kind == "session_failed":
+            print(f"[{category}] ❌ Session failed: {event.get('reason')}", file=sys.stderr)
+        elif kind == "item_posted":
+            print(f"[{category}] ✅ Row {event.get('row_id')} {event.get('action')} "
+                  f"id={event.get('created_id')} in {event.get('duration_s')}s")
+        elif kind == "item_skipped":
+            print(f"[{category}] ⏭️ Row {event.get('row_id')} skipped: {event.get('reason')}")
+        elif kind == "item_failed":
+            print(f"[{category}] ❌ Row {event.get('row_id')} failed: {event.get('reason')}", file=sys.stderr)
+        elif kind == "item_deferred":
+            print(f"[{category}] ⏳ Row {event.get('row_id')} deferred: {event.get('reason')}")
+        elif kind == "run_finished":
+            print(f"[{category}] 🏁 Finished in {event.get('duration_s')}s: {event.get('posted')} posted, "
+                  f"{event.get('skipped')} skipped, {event.get('failed')} failed")
+
+    def failure_reasons(self):
+        """Maps the row id of every failed item to its failure reason."""
+        with self._lock:
+            return {row_id: entry.get("reason") for row_id, entry in self.items.items() if entry["status"] == "failed"}
+
+    def created_ids(self):
+        """Maps the row id of every posted or scheduled item to the id X gave it, where one was captured."""
+        with self._lock:
+            return {row_id: entry["created_id"] for row_id, entry in self.items.items()
+                    if entry["status"] == "posted" and entry.get("created_id")}
+
+    def finished_rows(self, category: str, statuses=("posted", "skipped")):
+        """Row ids of `category` whose latest status is in `statuses` (posted or deliberately skipped by default)."""
+        with self._lock:
+            return {
+                row_id for row_id, entry in self.items.items()
+                if entry["category"] == category and entry["status"] in statuses
+            }
+
+
+def spawn_bot(script_path: str, args, proc_env: dict, stdin=None):
+    """Starts a bot process whose stdout (with stderr merged) is read line by line."""
+    proc_env = dict(proc_env, PYTHONUNBUFFERED="1")
+    return subprocess.Popen(
+        [sys.executable, script_path, *args],
+        env=proc_env, stdin=stdin, stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
+        text=True, encoding="utf-8", errors="replace",
+    )
+
+
+def consume_output(category: str, proc, progress: RunProgress):
+    """
+    Feeds a bot's events to `progress` as they arrive and waits for it to
+    exit. Only the last CHILD_LOG_TAIL_LINES log lines are kept, for
+    failure reports, so memory stays flat however long the run is.
+    """
+    tail = deque(maxlen=CHILD_LOG_TAIL_LINES)
+    for line in proc.stdout:
+        event = parse_event(line)
+        if event:
+            progress.handle(category, event)
+        else:
+            tail.append(line.rstrip("\n"))
+    proc.wait()
+    return list(tail)
+
+
+class BotSession:
+    """
+    A bot started in --stdin mode. It launches Chromium and checks its
+    session at once, then waits for its rows, so that startup overlaps
+    whatever the controller is doing meanwhile. Its output is consumed on
+    a background thread from the start.
+    """
+
+    def __init__(self, name: str, script_path: str, proc_env: dict, progress: RunProgress):
+        self.name = name
+        self.proc = spawn_bot(script_path, ["--stdin"], proc_env, stdin=subprocess.PIPE)
+        self.tail = []
+        self._reader = threading.Thread(target=self._read, args=(progress,), daemon=True)
+        self._reader.start()
+
+    def _read(self, progress: RunProgress):
+        self.tail = consume_output(self.name, self.proc, progress)
+
+    def send_batch(self, rows: list) -> bool:
+        """Hands the bot all of its rows as one line and closes stdin, so it exits once they are done."""
+        try:
+            self.proc.stdin.write(json.dumps(rows) + "\n")
+            self.proc.stdin.flush()
+            return True
+        except OSError as e:
+            print(f"❌ Could not hand {len(rows)} row(s) to '{self.name}': {e}", file=sys.stderr)
+            return False
+        finally:
+            self.close()
+
+    def close(self):
+        """Closes stdin; a bot that got no rows then shuts its browser down and exits."""
+        try:
+            self.proc.stdin.close()
+        except OSError:
+            pass
+
+    def wait(self, timeout: float = None) -> int:
+        """Waits for the bot to exit, killing it if it is still running after `timeout` seconds."""
+        try:
+            self.proc.wait(timeout=timeout)
+        except subprocess.TimeoutExpired:
+            print(f"⚠️ Bot for '{self.name}' did not exit within {timeout:.0f}s. Stopping it.", file=sys.stderr)
+            self.proc.kill()
+            self.proc.wait()
+        self._reader.join()
+        return self.proc.returncode
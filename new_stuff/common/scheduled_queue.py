@@ -0,0 +1,105 @@
+import os
+import re
+import sys
+
+from x_api import XApi, XApiError, created_scheduled_id
+
+# --- Scheduled Queue Configuration ---
+FETCH_SCHEDULED_QUERY_ID = os.getenv("FETCH_SCHEDULED_QUERY_ID", "ITtjAzvlZni2wWXwf295Qg")
+CREATE_SCHEDULED_QUERY_ID = os.getenv("CREATE_SCHEDULED_QUERY_ID", "LCVzRQGxOaGnOnYH01NQXg")
+DELETE_SCHEDULED_QUERY_ID = os.getenv("DELETE_SCHEDULED_QUERY_ID", "CTOVqej0JBXAZSwkp1US0g")
+SCHEDULE_RECONCILE = os.getenv("SCHEDULE_RECONCILE", "1") == "1"
+# X only schedules to the minute, so anything closer than this is "the same time"
+TIME_TOLERANCE_SECONDS = 60
+
+URL_PATTERN = re.compile(r"https?://\S+")
+
+
+def _url_key(url: str) -> str:
+    return url.rstrip("/")
+
+
+class ScheduledQueue:
+    """
+    In-memory index of the account's scheduled posts, keyed by the URL in
+    their text. It is read once per run; `plan()` then decides per item
+    whether the post is already scheduled, has moved, or is missing.
+    """
+
+    def __init__(self, api: XApi):
+        self.api = api
+        self.by_url = {}
+        self.loaded = False
+
+    def load(self) -> bool:
+        """Reads the scheduled queue. Returns False if it could not be read."""
+        try:
+            data = self.api.graphql("FetchScheduledTweets", FETCH_SCHEDULED_QUERY_ID, {"ascending": True}, method="GET")
+            scheduled = data["viewer"]["scheduled_tweet_list"]
+        except (XApiError, KeyError, TypeError) as e:
+            print(f"⚠️ Could not read the scheduled queue ({e}). Scheduling without reconciliation.", file=sys.stderr)
+            return False
+        for entry in scheduled:
+            text = (entry.get("tweet_create_request") or {}).get("status", "")
+            execute_at = (entry.get("scheduling_info") or {}).get("execute_at")
+            for url in URL_PATTERN.findall(text):
+                self.by_url.setdefault(_url_key(url), []).append({
+                    "id": entry.get("rest_id"),
+                    "execute_at": int(execute_at) // 1000 if execute_at else None,
+                })
+        self.loaded = True
+        print(f"📋 Scheduled queue holds {len(scheduled)} post(s).")
+        return True
+
+    def plan(self, url: str, item_time) -> tuple:
+        """
+        Returns (action, stale_ids): 'skip' when the URL is already scheduled at
+        this time, 'reschedule' when it is scheduled at another time (the
+        stale ids should be deleted first) and 'create' when it is missing.
+        """
+        existing = self.by_url.get(_url_key(url), [])
+        target = int(item_time.timestamp())
+        matching = [e for e in existing if e["execute_at"] and abs(e["execute_at"] - target) < TIME_TOLERANCE_SECONDS]
+        if matching:
+            # Keep one match; any other copies of the same URL are duplicates from earlier runs
+            return "skip", [e["id"] for e in existing if e is not matching[0] and e["id"]]
+        if existing:
+            return "reschedule", [e["id"] for e in existing if e["id"]]
+        return "create", []
+
+    def delete(self, scheduled_id: str, url: str) -> bool:
+        try:
+            self.api.graphql("DeleteScheduledTweet", DELETE_SCHEDULED_QUERY_ID, {"scheduled_tweet_id": scheduled_id})
+        except XApiError as e:
+            print(f"⚠️ Could not delete scheduled post {scheduled_id} ({e}).", file=sys.stderr)
+            return False
+        self.by_url[_url_key(url)] = [e for e in self.by_url.get(_url_key(url), []) if e["id"] != scheduled_id]
+        print(f"🗑️ Deleted stale scheduled post {scheduled_id}.")
+        return True
+
+    def create(self, tweet_text: str, item_time):
+        """
+        Schedules `tweet_text` with a single request and returns the scheduled
+        post id (None if the response did not carry it). Raises XApiRejected
+        if nothing was scheduled.
+        """
+        execute_at = int(item_time.timestamp())
+        data = self.api.graphql("CreateScheduledTweet", CREATE_SCHEDULED_QUERY_ID, {
+            "post_tweet_request": {
+                "auto_populate_reply_metadata": False,
+                "status": tweet_text,
+                "exclude_reply_user_ids": [],
+                "media_ids": [],
+            },
+            "execute_at": execute_at,
+        })
+        scheduled_id = created_scheduled_id(data)
+        self.remember(tweet_text, item_time, scheduled_id)
+        return scheduled_id
+
+    def remember(self, tweet_text: str, item_time, scheduled_id: str = None):
+        """Records a newly scheduled post so later items in this run see it."""
+        for url in URL_PATTERN.findall(tweet_text):
+            self.by_url.setdefault(_url_key(url), []).append({
+                "id": scheduled_id, "execute_at": int(item_time.timestamp()),
+            })
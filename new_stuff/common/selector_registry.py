@@ -0,0 +1,134 @@
+import os
+import sys
+import json
+import time
+import threading
+from pathlib import Path
+
+# --- Selector Configuration ---
+# One cache per account, next to its login data, so it travels with the session
+SELECTOR_CACHE_FILE = Path(
+    os.getenv("SELECTOR_CACHE_FILE")
+    or f"./{os.getenv('BOT_ACCOUNT') or os.getenv('BOT_CATEGORY')}/selector_cache.json"
+)
+SELECTOR_TIMEOUT_MS = 15000
+# How long the remembered candidate is waited on alone before the others are tried too
+SELECTOR_CACHED_TIMEOUT_MS = int(os.getenv("SELECTOR_CACHED_TIMEOUT_MS", "5000"))
+
+# Ordered candidates per logical element. The first is what X serves today;
+# the rest are older or alternative markup seen on the composer and schedule modal.
+CANDIDATES = {
+    "new_tweet_button": [
+        '[data-testid="SideNav_NewTweet_Button"]',
+        'a[href="/compose/post"]',
+        'a[href="/compose/tweet"]',
+    ],
+    "composer_textarea": [
+        'div[data-testid="tweetTextarea_0"]',
+        'div[role="textbox"][data-testid^="tweetTextarea"]',
+        'div.public-DraftEditor-content[contenteditable="true"]',
+    ],
+    "post_inline_button": [
+        'button[data-testid="tweetButtonInline"]',
+        'button[data-testid="tweetButton"]',
+    ],
+    "post_button": [
+        'button[data-testid="tweetButton"]',
+        'div[role="dialog"] button[data-testid="tweetButtonInline"]',
+    ],
+    "schedule_option": [
+        "button[data-testid='scheduleOption']",
+        "button[aria-label='Schedule post']",
+        "button[aria-label='Schedule Tweet']",
+    ],
+    "schedule_date": ['input[type="date"]'],
+    "schedule_hour": [
+        "select[aria-label='Hour']",
+        "select#SELECTOR_4",
+    ],
+    "schedule_minute": [
+        "select[aria-label='Minute']",
+        "select#SELECTOR_5",
+    ],
+    "schedule_ampm": [
+        "select[aria-label='AM/PM']",
+        "select#SELECTOR_6",
+    ],
+    "schedule_confirm": [
+        "button[data-testid='scheduledConfirmationPrimaryAction']",
+        "div[role='dialog'] button:has-text('Confirm')",
+    ],
+}
+
+
+class SelectorRegistry:
+    """
+    Resolves logical element names to a live locator. The candidate that
+    matched last time is remembered per account and waited on alone first.
+    Only when it has not shown up within SELECTOR_CACHED_TIMEOUT_MS are all
+    candidates waited on together, each filtered to visible elements so a
+    stale one that still matches hidden markup cannot hold up the wait.
+    """
+
+    def __init__(self, cache_file: Path = SELECTOR_CACHE_FILE, candidates: dict = None):
+        self.cache_file = Path(cache_file)
+        self.candidates = candidates or CANDIDATES
+        self._lock = threading.Lock()
+        try:
+            self.cache = json.loads(self.cache_file.read_text(encoding="utf-8"))
+        except (OSError, json.JSONDecodeError):
+            self.cache = {}
+
+    def _ordered(self, name: str) -> list:
+        candidates = list(self.candidates[name])
+        cached = self.cache.get(name)
+        if cached in candidates:
+            candidates.remove(cached)
+            candidates.insert(0, cached)
+        return candidates
+
+    @staticmethod
+    def _filtered(candidate: str, state: str) -> str:
+        return f"{candidate}:visible" if state == "visible" else candidate
+
+    def locator(self, page, name: str, state: str = "visible", timeout_ms: int = SELECTOR_TIMEOUT_MS):
+        """Waits until a candidate for `name` reaches `state` and returns it, trying the remembered one first."""
+        candidates = self._ordered(name)
+        started = time.monotonic()
+        if self.cache.get(name) in candidates:
+            locator = page.locator(self._filtered(candidates[0], state)).first
+            try:
+                locator.wait_for(state=state, timeout=min(timeout_ms, SELECTOR_CACHED_TIMEOUT_MS))
+                return locator
+            except Exception:
+                pass
+
+        remaining_ms = max(1, timeout_ms - (time.monotonic() - started) * 1000)
+        try:
+            page.locator(", ".join(self._filtered(c, state) for c in candidates)).first.wait_for(
+                state=state, timeout=remaining_ms)
+        except Exception:
+            pass
+        for candidate in candidates:
+            locator = page.locator(self._filtered(candidate, state)).first
+            if locator.count():
+                self._remember(name, candidate, started)
+                return locator
+        raise LookupError(f"No selector for '{name}' matched after {timeout_ms} ms (tried {len(candidates)}).")
+
+    def _remember(self, name: str, candidate: str, started: float):
+        previous = self.cache.get(name)
+        if previous == candidate:
+            return
+        if previous:
+            print(f"🩹 Selector '{name}' healed: {previous} -> {candidate} "
+                  f"({(time.monotonic() - started) * 1000:.0f} ms)", file=sys.stderr)
+        with self._lock:
+            self.cache[name] = candidate
+            self.cache_file.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = self.cache_file.with_suffix(".json.tmp")
+            tmp_path.write_text(json.dumps(self.cache, indent=2), encoding="utf-8")
+            os.replace(tmp_path, self.cache_file)
+
+
+SELECTORS = SelectorRegistry()
@@ -0,0 +1,134 @@
+import os
+import sys
+import json
+import threading
+from collections import OrderedDict
+
+from dedup import normalize_url
+from compose import compose, ComposeError
+from queue_backend import LeaseKeeper
+
+# --- Stream Configuration ---
+# URLs of finished rows remembered to drop the same story inserted into the other table
+STREAM_RECENT_URLS = int(os.getenv("STREAM_RECENT_URLS", "1000"))
+
+FINISHED_EVENTS = {"item_posted", "item_skipped", "item_failed", "item_deferred"}
+
+
+class StreamDispatcher:
+    """
+    Hands rows streamed by the realtime subscription to their category's
+    warm session, through the same queue as a batch run: a row is claimed
+    (and its lease kept alive) before it is handed over, then acked, failed
+    or released once its bot reports the outcome, so other runners never
+    post it too. It is also marked pending when handed over, so a bot that
+    dies without reporting leaves it for the next fetch. The same story
+    inserted into both tables is dispatched once; the URLs of rows in
+    flight and of the last STREAM_RECENT_URLS finished ones are remembered
+    for that.
+    """
+
+    def __init__(self, queues: dict, sessions: dict, restart):
+        # table -> SupabaseQueue bound to it (see SupabaseQueue.for_table)
+        self.queues = queues
+        self.leases = {table: LeaseKeeper(queue) for table, queue in queues.items()}
+        # category -> warm bot process (None when its secrets are missing)
+        self.sessions = sessions
+        self.restart = restart
+        self.in_flight = {}
+        self.recent_urls = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _remember_url(self, url_key: str):
+        self.recent_urls[url_key] = True
+        self.recent_urls.move_to_end(url_key)
+        while len(self.recent_urls) > STREAM_RECENT_URLS:
+            self.recent_urls.popitem(last=False)
+
+    def _settle(self, table: str, row: dict, settle):
+        queue = self.queues[table]
+        self.leases[table].remove([row])
+        settle(queue)
+        queue.save()
+
+    def _drop_in_flight(self, category: str):
+        # Released and still pending, so this or another runner picks the rows up again
+        for row_id, (table, row, url_key) in list(self.in_flight.items()):
+            if row.get("bot") == category:
+                del self.in_flight[row_id]
+                self.recent_urls.pop(url_key, None)
+                self._settle(table, row, lambda queue: queue.release([row]))
+
+    def dispatch(self, table: str, row: dict) -> bool:
+        """Claims one streamed row and sends it to its bot. Returns True if it was handed over."""
+        category = row.get("bot")
+        row_id = str(row.get("id"))
+        url_key = normalize_url(row.get("url") or "")
+        queue = self.queues.get(table)
+        with self._lock:
+            if queue is None or category not in self.sessions or row_id in self.in_flight \
+                    or url_key in self.recent_urls or not queue.watermarks.is_new(table, row):
+                return False
+            session = self.sessions[category]
+            if session is None:
+                print(f"⚠️ No warm session for '{category}' (missing secrets). Leaving row {row_id} queued.")
+                return False
+            if session.poll() is not None:
+                print(f"⚠️ Warm session for '{category}' exited with code {session.returncode}. Restarting.")
+                self._drop_in_flight(category)
+                session = self.sessions[category] = self.restart(category)
+
+            try:
+                row = dict(row, tweet_text=compose(row))
+            except (ComposeError, KeyError, IndexError) as e:
+                print(f"🚫 Row {row_id} cannot be posted: {e}")
+                self._settle(table, row, lambda queue: queue.ack([row]))
+                return False
+
+            if not queue.claim([row]):
+                return False
+            self.leases[table].add([row])
+            queue.watermarks.mark_pending(table, [row])
+            queue.save()
+            print(f"📨 Row {row_id} from '{table}' -> '{category}'")
+            try:
+                session.stdin.write(json.dumps(row) + "\n")
+                session.stdin.flush()
+            except OSError as e:
+                print(f"❌ Could not hand row {row_id} to '{category}': {e}", file=sys.stderr)
+                self._settle(table, row, lambda queue: queue.release([row]))
+                return False
+            self.in_flight[row_id] = (table, row, url_key)
+            self._remember_url(url_key)
+            return True
+
+    def listener(self, _category: str, event: dict):
+        """RunProgress listener: settles a dispatched row once its bot reports the outcome."""
+        kind = event["event"]
+        if kind not in FINISHED_EVENTS:
+            return
+        row_id = str(event.get("row_id"))
+        with self._lock:
+            entry = self.in_flight.pop(row_id, None)
+            if entry is None:
+                return
+            table, row, url_key = entry
+            if kind in ("item_posted", "item_skipped"):
+                created_ids = {row_id: event["created_id"]} if event.get("created_id") else None
+                self._settle(table, row, lambda queue: queue.ack([row], created_ids))
+                return
+            # Another insert of the same story may be tried again
+            self.recent_urls.pop(url_key, None)
+            if kind == "item_failed":
+                self._settle(table, row, lambda queue: queue.fail([row], {row_id: event.get("reason")}))
+            else:
+                self._settle(table, row, lambda queue: queue.release([row]))
+
+    def close(self):
+        """Call once the bots have exited: releases rows they never reported on and stops renewing leases."""
+        with self._lock:
+            for table, row, _url_key in self.in_flight.values():
+                self._settle(table, row, lambda queue: queue.release([row]))
+            self.in_flight.clear()
+        for keeper in self.leases.values():
+            keeper.stop()
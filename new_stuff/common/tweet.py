@@ -6,6 +6,7 @@ from datetime import datetime, timedelta
 import pytz
 from playwright.sync_api import sync_playwright
 from dotenv import load_dotenv
+from browser_launch import launch_context, report_memory
 
 load_dotenv()
 
@@ -36,11 +37,8 @@ def main():
     print(f"Received {len(items_to_process)} items to process for '{BOT_CATEGORY}' bot.")
 
     with sync_playwright() as p:
-        browser = p.chromium.launch_persistent_context(
-            user_data_dir=str(LOGIN_DATA_DIR),
-            headless=True,
-            viewport={"width": 1280, "height": 800}
-        )
+        browser, _ = launch_context(p, LOGIN_DATA_DIR, viewport={"width": 1280, "height": 800})
+        report_memory("launch")
         page = browser.new_page()
 
         try:
@@ -1,50 +1,150 @@
 from playwright.sync_api import Page
+import os
 import time
 
-def post_now(page: Page, tweet_text: str, log_func, item_id: str):
+from x_api import XApiError, XApiRejected, check_payload, created_tweet_id, created_scheduled_id
+from selector_registry import SELECTORS
+
+# "ui" drives the composer; "api" sends the create-post request from the page and falls back to "ui"
+POSTING_BACKEND = os.getenv("POSTING_BACKEND", "ui")
+CREATE_RESPONSE_TIMEOUT_MS = 20000
+
+def run_steps(steps):
+    """
+    Drives a *_steps generator on its own, sleeping through each wait it
+    yields, and returns its result. The generators yield their waits instead
+    of sleeping so several pages can share one thread (see process_bot.run_tabs).
+    """
+    try:
+        while True:
+            time.sleep(next(steps))
+    except StopIteration as done:
+        return done.value
+
+def _click_and_capture(page: Page, locator, operation: str, **click_kwargs):
+    """
+    Clicks `locator` and returns the data of the `operation` GraphQL response
+    it triggers, as soon as that response arrives. Once the click has gone
+    through the post may exist, so a response that never arrives or cannot
+    be read returns None instead of raising; only an outright rejection
+    (XApiRejected) still fails the item.
+    """
+    clicked = False
+    try:
+        with page.expect_response(
+            lambda r: f"/{operation}" in r.url and r.request.method == "POST",
+            timeout=CREATE_RESPONSE_TIMEOUT_MS,
+        ) as response_info:
+            locator.click(**click_kwargs)
+            clicked = True
+        response = response_info.value
+        try:
+            payload = response.json()
+        except Exception:
+            error = XApiRejected if response.status >= 400 else XApiError
+            raise error(f"{operation} returned HTTP {response.status} with a non-JSON body.")
+        return check_payload(operation, payload, response.status)
+    except XApiRejected:
+        raise
+    except Exception as e:
+        if not clicked:
+            raise
+        print(f"⚠️ Clicked, but could not read the {operation} response ({e}). Recording the item without an id.")
+        return None
+
+def post_now_api(page: Page, tweet_text: str, api, item_id: str):
+    """
+    Posts a tweet with a single authenticated request from the page context.
+    Returns the new post id, which is None if the post was made but its id
+    could not be read. Raises XApiRejected if nothing was posted.
+    """
+    print("-> Logic: Post Now (direct request)")
+    if not page.url.startswith("https://x.com"):
+        page.goto("https://x.com/home", wait_until="domcontentloaded")
+    try:
+        tweet_id = api.create_tweet(tweet_text)
+    except XApiRejected:
+        raise
+    except XApiError as e:
+        # The request got through, so it may well have posted; the composer would post it again
+        print(f"⚠️ Direct post for {item_id} gave an unreadable response ({e}). Treating it as posted.")
+        return None
+    print(f"✅ Tweet posted successfully! id={tweet_id}")
+    return tweet_id
+
+def post_now(page: Page, tweet_text: str, log_func, item_id: str, api=None):
+    """Posts a tweet immediately and returns its id."""
+    return run_steps(post_now_steps(page, tweet_text, log_func, item_id, api))
+
+def post_now_steps(page: Page, tweet_text: str, log_func, item_id: str, api=None):
     """
     Posts a tweet immediately from the main feed.
     Based on your verified post_now script.
     """
+    if POSTING_BACKEND == "api" and api is not None and api.ready:
+        try:
+            return post_now_api(page, tweet_text, api, item_id)
+        except XApiRejected as e:
+            print(f"⚠️ Direct post for {item_id} rejected ({e}). Falling back to the composer.")
+
     print("-> Logic: Post Now (from main feed)")
     page.goto("https://x.com/home", wait_until="load")
-    page.wait_for_selector('div[data-testid="tweetTextarea_0"]', timeout=15000)
+    textarea = SELECTORS.locator(page, "composer_textarea")
     log_func(page, f"A_{item_id}_postnow_homepage_loaded")
     
     print("--> Typing tweet...")
-    page.fill('div[data-testid="tweetTextarea_0"]', tweet_text)
-    time.sleep(3)
+    textarea.fill(tweet_text)
+    yield 3
     log_func(page, f"B_{item_id}_postnow_tweet_typed")
 
     print("--> Clicking the Post button...")
-    post_button = page.locator('button[data-testid="tweetButtonInline"]')
-    post_button.click(timeout=10000)
-    time.sleep(5)
+    post_button = SELECTORS.locator(page, "post_inline_button")
+    data = _click_and_capture(page, post_button, "CreateTweet", timeout=10000)
+    tweet_id = created_tweet_id(data) if data is not None else None
+    print(f"✅ Tweet posted successfully! id={tweet_id}")
     log_func(page, f"C_{item_id}_postnow_tweet_posted")
-    print("✅ Tweet posted successfully!")
+    return tweet_id
+
+def schedule_post(page: Page, tweet_text: str, item_time, log_func, item_id: str, scheduled=None):
+    """Schedules a tweet and returns the scheduled post id."""
+    return run_steps(schedule_post_steps(page, tweet_text, item_time, log_func, item_id, scheduled))
 
-def schedule_post(page: Page, tweet_text: str, item_time, log_func, item_id: str):
+def schedule_post_steps(page: Page, tweet_text: str, item_time, log_func, item_id: str, scheduled=None):
     """
     Schedules a tweet using the composer modal.
     Based on your verified schedule script.
     """
+    if POSTING_BACKEND == "api" and scheduled is not None and scheduled.api.ready:
+        print("-> Logic: Schedule (direct request)")
+        try:
+            scheduled_id = scheduled.create(tweet_text, item_time)
+            print(f"✅ Tweet successfully scheduled! id={scheduled_id}")
+            return scheduled_id
+        except XApiRejected as e:
+            print(f"⚠️ Direct schedule for {item_id} rejected ({e}). Falling back to the composer.")
+        except XApiError as e:
+            # The request got through, so it may well have scheduled; the modal would schedule it again
+            print(f"⚠️ Direct schedule for {item_id} gave an unreadable response ({e}). Treating it as scheduled.")
+            scheduled.remember(tweet_text, item_time)
+            return None
+
     print("-> Logic: Schedule (from modal)")
     page.goto("https://twitter.com/home", wait_until="load")
-    time.sleep(5)
+    yield 5
     log_func(page, f"A_{item_id}_schedule_home_loaded")
 
     print("--> Opening tweet composer...")
-    page.click('[data-testid="SideNav_NewTweet_Button"]')
-    time.sleep(2)
+    SELECTORS.locator(page, "new_tweet_button").click()
+    yield 2
     log_func(page, f"B_{item_id}_schedule_composer_opened")
 
     print("--> Typing tweet...")
-    page.fill('div[data-testid="tweetTextarea_0"]', tweet_text)
+    SELECTORS.locator(page, "composer_textarea").fill(tweet_text)
     log_func(page, f"C_{item_id}_schedule_text_filled")
 
     print("--> Opening schedule modal...")
-    page.click("button[data-testid='scheduleOption']")
-    time.sleep(2)
+    SELECTORS.locator(page, "schedule_option").click()
+    yield 2
     log_func(page, f"D_{item_id}_schedule_modal_opened")
 
     # Set date/time from Supabase data
@@ -53,21 +153,23 @@ def schedule_post(page: Page, tweet_text: str, item_time, log_func, item_id: str
     minute = item_time.strftime("%M")
     ampm = item_time.strftime("%p")
     print(f"--> Setting schedule: {schedule_date} {hour}:{minute} {ampm}")
-    page.fill('input[type="date"]', schedule_date)
-    page.select_option("select#SELECTOR_4", hour)
-    page.select_option("select#SELECTOR_5", minute)
-    page.select_option("select#SELECTOR_6", ampm)
+    SELECTORS.locator(page, "schedule_date").fill(schedule_date)
+    SELECTORS.locator(page, "schedule_hour").select_option(hour)
+    SELECTORS.locator(page, "schedule_minute").select_option(minute)
+    SELECTORS.locator(page, "schedule_ampm").select_option(ampm)
     log_func(page, f"E_{item_id}_schedule_date_time_set")
 
     print("--> Confirming schedule modal...")
-    page.click("button[data-testid='scheduledConfirmationPrimaryAction']")
-    time.sleep(3)
+    SELECTORS.locator(page, "schedule_confirm").click()
+    yield 3
     log_func(page, f"F_{item_id}_schedule_modal_confirmed")
     
     print("--> Finalizing tweet scheduling...")
-    final_btn = page.locator('button[data-testid="tweetButton"]')
-    final_btn.wait_for(state="visible", timeout=15000)
-    final_btn.click(force=True, timeout=10000)
-    time.sleep(4)
+    final_btn = SELECTORS.locator(page, "post_button")
+    data = _click_and_capture(page, final_btn, "CreateScheduledTweet", force=True, timeout=10000)
+    scheduled_id = created_scheduled_id(data) if data is not None else None
+    if scheduled is not None:
+        scheduled.remember(tweet_text, item_time, scheduled_id)
+    print(f"✅ Tweet successfully scheduled! id={scheduled_id}")
     log_func(page, f"G_{item_id}_schedule_tweet_scheduled_final")
-    print("✅ Tweet successfully scheduled!")
+    return scheduled_id
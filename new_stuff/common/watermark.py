@@ -0,0 +1,111 @@
+import os
+import json
+from pathlib import Path
+from datetime import datetime, timedelta
+
+# --- Watermark Configuration ---
+FULL_RECONCILE_HOURS = int(os.getenv("FULL_RECONCILE_HOURS", "24"))
+SEEN_ROWS_LIMIT = int(os.getenv("WATERMARK_SEEN_LIMIT", "5000"))
+
+
+class WatermarkStore:
+    """
+    Persists a high-water mark (last seen `id` and `time`) per source table.
+
+    Incremental fetches only ask Supabase for rows past the mark. A bounded
+    map of recently seen `id -> time` lets the occasional full reconcile
+    (which only pulls the `id` and `time` columns) pick out rows that were
+    written late or had their time changed, without reposting everything.
+    Rows that were fetched but not handled (failed, deferred, leased by
+    another runner) are kept as pending and asked for again on every fetch,
+    however far the mark has moved past them.
+    """
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        try:
+            self.state = json.loads(self.path.read_text(encoding="utf-8"))
+        except (OSError, json.JSONDecodeError):
+            self.state = {}
+
+    def _table_state(self, table: str):
+        return self.state.setdefault(table, {
+            "last_id": None, "last_time": None, "last_full_reconcile": None, "seen_floor": None, "seen": {},
+            "pending": [],
+        })
+
+    def needs_full_reconcile(self, table: str) -> bool:
+        last = self._table_state(table)["last_full_reconcile"]
+        if last is None:
+            return True
+        return datetime.now() - datetime.fromisoformat(last) > timedelta(hours=FULL_RECONCILE_HOURS)
+
+    def fetch(self, supabase, table: str, full_reconcile: bool = False):
+        """Returns the rows of `table` that have not been seen yet."""
+        state = self._table_state(table)
+        if full_reconcile or state["last_id"] is None or self.needs_full_reconcile(table):
+            return self._reconcile(supabase, table)
+
+        conditions = [f'id.gt.{state["last_id"]}']
+        if state["last_time"]:
+            conditions.append(f'time.gt."{state["last_time"]}"')
+        if state.get("pending"):
+            conditions.append(f'id.in.({",".join(str(row_id) for row_id in state["pending"])})')
+        rows = supabase.table(table).select("*").or_(",".join(conditions)).order("id").execute().data or []
+        return [row for row in rows if self._is_new(state, row)]
+
+    def _reconcile(self, supabase, table: str):
+        state = self._table_state(table)
+        print(f"🔄 Full reconcile of '{table}' against the watermark...")
+        keys = supabase.table(table).select("id,time").execute().data or []
+        missing_ids = [row["id"] for row in keys if self._is_new(state, row)]
+        state["last_full_reconcile"] = datetime.now().isoformat()
+        if not missing_ids:
+            return []
+        rows = supabase.table(table).select("*").in_("id", missing_ids).order("id").execute().data or []
+        return [row for row in rows if self._is_new(state, row)]
+
+    def is_new(self, table: str, row) -> bool:
+        """True if `row` has not been handled under the current watermark."""
+        return self._is_new(self._table_state(table), row)
+
+    @staticmethod
+    def _is_new(state, row) -> bool:
+        if row.get("id") in state.get("pending", []):
+            return True
+        row_id = str(row.get("id"))
+        if row_id not in state["seen"]:
+            # Ids that aged out of the bounded seen map are treated as already handled
+            return state["seen_floor"] is None or row.get("id") > state["seen_floor"]
+        return state["seen"][row_id] != row.get("time")
+
+    def mark_pending(self, table: str, rows):
+        """Remembers fetched rows that were not handled, so every later fetch returns them again."""
+        state = self._table_state(table)
+        pending = set(state.setdefault("pending", []))
+        pending.update(row["id"] for row in rows if row.get("id") is not None)
+        state["pending"] = sorted(pending)
+
+    def mark_seen(self, table: str, rows):
+        """Advances the watermark past `rows`. Call `save()` to persist it."""
+        state = self._table_state(table)
+        handled = {row.get("id") for row in rows}
+        state["pending"] = [row_id for row_id in state.setdefault("pending", []) if row_id not in handled]
+        for row in rows:
+            if row.get("id") is None:
+                continue
+            state["seen"][str(row["id"])] = row.get("time")
+            if state["last_id"] is None or row["id"] > state["last_id"]:
+                state["last_id"] = row["id"]
+            if row.get("time") and (state["last_time"] is None or row["time"] > state["last_time"]):
+                state["last_time"] = row["time"]
+        if len(state["seen"]) > SEEN_ROWS_LIMIT:
+            ordered = sorted(state["seen"], key=int)
+            state["seen_floor"] = int(ordered[-SEEN_ROWS_LIMIT - 1])
+            state["seen"] = {row_id: state["seen"][row_id] for row_id in ordered[-SEEN_ROWS_LIMIT:]}
+
+    def save(self):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_suffix(".json.tmp")
+        tmp_path.write_text(json.dumps(self.state, indent=2), encoding="utf-8")
+        os.replace(tmp_path, self.path)
@@ -0,0 +1,158 @@
+import os
+import json
+from urllib.parse import urlencode
+from playwright.sync_api import Page, Error as PlaywrightError
+
+# --- API Configuration ---
+# Endpoint and operation ids are overridable because X rotates them, and so
+# a local stand-in can replace the real API in tests.
+API_BASE_URL = os.getenv("X_API_BASE_URL", "https://x.com/i/api/graphql")
+CREATE_TWEET_QUERY_ID = os.getenv("CREATE_TWEET_QUERY_ID", "oB-5XsHNAbjvARJEc8CZFw")
+DEFAULT_FEATURES = {
+    "communities_web_enable_tweet_community_results_fetch": True,
+    "c9s_tweet_anatomy_moderator_badge_enabled": True,
+    "tweetypie_unmention_optimization_enabled": True,
+    "responsive_web_edit_tweet_api_enabled": True,
+    "graphql_is_translatable_rweb_tweet_is_translatable_enabled": True,
+    "view_counts_everywhere_api_enabled": True,
+    "longform_notetweets_consumption_enabled": True,
+    "responsive_web_twitter_article_tweet_consumption_enabled": True,
+    "tweet_awards_web_tipping_enabled": False,
+    "longform_notetweets_rich_text_read_enabled": True,
+    "longform_notetweets_inline_media_enabled": True,
+    "rweb_video_timestamps_enabled": True,
+    "responsive_web_graphql_exclude_directive_enabled": True,
+    "verified_phone_label_enabled": False,
+    "freedom_of_speech_not_reach_fetch_enabled": True,
+    "standardized_nudges_misinfo": True,
+    "tweet_with_visibility_results_prefer_gql_limited_actions_policy_enabled": True,
+    "responsive_web_graphql_skip_user_profile_image_extensions_enabled": False,
+    "responsive_web_graphql_timeline_navigation_enabled": True,
+    "responsive_web_enhance_cards_enabled": False,
+}
+FEATURES = json.loads(os.getenv("X_API_FEATURES", "null")) or DEFAULT_FEATURES
+
+# Runs inside the page so the request carries the session cookies; the CSRF
+# token is the ct0 cookie, which the web app itself echoes in a header.
+_FETCH_SCRIPT = """
+async ({url, method, headers, body}) => {
+    const ct0 = (document.cookie.match(/(?:^|; )ct0=([^;]+)/) || [])[1] || "";
+    const response = await fetch(url, {
+        method,
+        credentials: "include",
+        headers: {
+            ...headers,
+            "content-type": "application/json",
+            "x-csrf-token": ct0,
+            "x-twitter-auth-type": "OAuth2Session",
+            "x-twitter-active-user": "yes",
+        },
+        body,
+    });
+    return {status: response.status, text: await response.text()};
+}
+"""
+
+
+class XApiError(Exception):
+    """The API returned no usable result; the request may or may not have taken effect."""
+
+
+class XApiRejected(XApiError):
+    """The API refused the request, so nothing was created and it is safe to try another way."""
+
+
+def check_payload(operation: str, payload: dict, status: int = 200) -> dict:
+    """
+    Returns a GraphQL response's `data`. Raises XApiRejected for an HTTP
+    error or `errors` without any `data`; errors next to data are partial
+    failures of a request that did go through, so they are only logged.
+    """
+    messages = "; ".join(err.get("message", "?") for err in payload.get("errors") or [])
+    if status >= 400 or (payload.get("errors") and not payload.get("data")):
+        raise XApiRejected(f"{operation} rejected with HTTP {status}: {messages or 'no details'}")
+    if messages:
+        print(f"⚠️ {operation} went through with errors: {messages}")
+    return payload.get("data") or {}
+
+
+def created_tweet_id(data: dict):
+    """Extracts the new post id from CreateTweet response data, or None if the response shape changed."""
+    try:
+        return data["create_tweet"]["tweet_results"]["result"]["rest_id"]
+    except (KeyError, TypeError):
+        # The post exists; trying again would post it twice
+        print("⚠️ CreateTweet succeeded but the response carried no post id. Recording it without one.")
+        return None
+
+
+def created_scheduled_id(data: dict):
+    """Extracts the scheduled post id from CreateScheduledTweet response data, or None if the shape changed."""
+    try:
+        return data["tweet"]["rest_id"]
+    except (KeyError, TypeError):
+        # The schedule exists; trying again would schedule it twice
+        print("⚠️ CreateScheduledTweet succeeded but the response carried no id. Recording it without one.")
+        return None
+
+
+class XApi:
+    """
+    Sends X web API requests from inside an authenticated page.
+
+    The bearer token is copied from the web app's own API traffic, so the
+    instance must be created before the page loads /home.
+    """
+
+    def __init__(self, page: Page):
+        self.authorization = None
+        self.attach(page)
+
+    def attach(self, page: Page):
+        """Sends later requests from `page`, e.g. when the original page was replaced."""
+        self.page = page
+        page.on("request", self._capture_authorization)
+
+    def _capture_authorization(self, request):
+        if "/i/api/" in request.url and "authorization" in request.headers:
+            self.authorization = request.headers["authorization"]
+
+    @property
+    def ready(self) -> bool:
+        return self.authorization is not None
+
+    def graphql(self, operation: str, query_id: str, variables: dict, method: str = "POST") -> dict:
+        """Calls a GraphQL operation and returns its decoded `data`, raising XApiError otherwise."""
+        if not self.ready:
+            raise XApiRejected("No authorization header has been captured from the page yet.")
+        url = f"{API_BASE_URL}/{query_id}/{operation}"
+        body = json.dumps({"variables": variables, "features": FEATURES, "queryId": query_id})
+        if method == "GET":
+            url += "?" + urlencode({
+                "variables": json.dumps(variables, separators=(",", ":")),
+                "features": json.dumps(FEATURES, separators=(",", ":")),
+            })
+            body = None
+        try:
+            result = self.page.evaluate(_FETCH_SCRIPT, {
+                "url": url, "method": method, "headers": {"authorization": self.authorization}, "body": body,
+            })
+        except PlaywrightError as e:
+            # fetch() failed before any response (network error, closed page or navigation)
+            raise XApiRejected(f"{operation} could not be sent from the page: {e}")
+        try:
+            payload = json.loads(result["text"])
+        except json.JSONDecodeError:
+            error = XApiRejected if result["status"] >= 400 else XApiError
+            raise error(f"{operation} returned HTTP {result['status']} with a non-JSON body.")
+        return check_payload(operation, payload, result["status"])
+
+    def create_tweet(self, tweet_text: str):
+        """Posts `tweet_text` and returns the new post's id (None if the response did not carry it)."""
+        data = self.graphql("CreateTweet", CREATE_TWEET_QUERY_ID, {
+            "tweet_text": tweet_text,
+            "dark_request": False,
+            "media": {"media_entities": [], "possibly_sensitive": False},
+            "semantic_annotation_ids": [],
+        })
+        return created_tweet_id(data)
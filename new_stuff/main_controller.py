@@ -1,45 +1,205 @@
 import os
 import sys
+import time
+import argparse
 import subprocess
+import threading
 import json
-from supabase import create_client, Client
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from dotenv import load_dotenv
 from pathlib import Path
-from datetime import datetime
+from datetime import datetime, timedelta
+
+# Shared helpers live next to the bot script in common/
+sys.path.insert(0, str(Path(__file__).resolve().parent / "common"))
+from queue_backend import QUEUE_BACKEND, SUPABASE_TABLES, SqliteQueue, LeaseKeeper, open_queue, load_import_file
+from run_progress import RunProgress, BotSession, spawn_bot, consume_output, ITEM_STATUS_MAX_FINISHED
+from run_history import RunHistory
+from metrics import MetricsRegistry
+from profiling import SUMMARY_FILE
+from dedup import dedupe
+from compose import compose_batch
+from deadline import DeadlinePlanner, DEADLINE_RESERVE_S
+from accounts import Account, load_accounts, shard, load_assignments, save_assignments, ACCOUNTS_FILE
 
 load_dotenv()
 
 BOT_CATEGORIES = ["formula", "tech", "hollywood", "movies", "unews", "news"]
 SUPABASE_URL = os.getenv("SUPABASE_URL")
 SUPABASE_KEY = os.getenv("SUPABASE_KEY")
+PROCESS_SCRIPT_PATH = os.path.join("common", "process_bot.py")
+WATERMARK_FILE = Path("state") / "watermarks.json"
+
+# --- Pre-flight Configuration ---
+SESSION_HEALTH_FILE = Path("debug_logs") / "session_health.json"
+PREFLIGHT_CONCURRENCY = int(os.getenv("PREFLIGHT_CONCURRENCY", "3"))
+PREFLIGHT_TIMEOUT = int(os.getenv("PREFLIGHT_TIMEOUT", "600"))
+PREFLIGHT_MAX_AGE_MINUTES = int(os.getenv("PREFLIGHT_MAX_AGE_MINUTES", "120"))
+# Category label for phases the controller itself times
+CONTROLLER_CATEGORY = "_controller"
+PROFILE_ROOT = Path("debug_logs") / "profiles"
+PROFILE_SUMMARY_LINES = 25
+
+# --- Pipeline Configuration ---
+# Bot processes alive at once: the one posting, plus the next ones launching Chromium and
+# checking their session behind it (and behind the queue fetch at the start of a run)
+PIPELINE_SESSIONS = max(1, int(os.getenv("PIPELINE_SESSIONS", "2")))
+# A bot that gets no rows exits after its session check; one stuck (e.g. on an OTP) is killed after this
+PIPELINE_STOP_TIMEOUT = int(os.getenv("PIPELINE_STOP_TIMEOUT", "180"))
+
+def category_accounts():
+    """{category: [Account, ...]}, read only by the commands that use accounts, so a bad file cannot break the others."""
+    try:
+        return load_accounts(BOT_CATEGORIES)
+    except (OSError, ValueError, KeyError, TypeError, AttributeError) as e:
+        sys.exit(f"❌ Error: could not read accounts from {ACCOUNTS_FILE}: {e}")
+
+def all_accounts(accounts: dict):
+    return [account for category in BOT_CATEGORIES for account in accounts[category]]
+
+def build_child_env(account: Account):
+    """Returns the environment for an account's child process, or None if its secrets are missing."""
+    credentials = account.credentials()
+    if credentials is None:
+        return None
+    proc_env = os.environ.copy()
+    proc_env["TWITTER_EMAIL"], proc_env["TWITTER_USERNAME"], proc_env["TWITTER_PASSWORD"] = credentials
+    proc_env["BOT_CATEGORY"] = account.category
+    proc_env["BOT_ACCOUNT"] = account.name
+    return proc_env
+
+def load_session_health():
+    try:
+        return json.loads(SESSION_HEALTH_FILE.read_text(encoding="utf-8"))
+    except (OSError, json.JSONDecodeError):
+        return {}
 
-def fetch_data(supabase: Client):
-    # [This function remains unchanged]
-    source_table = None
-    data = []
-    print("Attempting to fetch data from 'processed_urls'...")
-    response_processed = supabase.table("processed_urls").select("*").execute()
-    if response_processed.data:
-        print("✅ Data found in 'processed_urls'.")
-        data = response_processed.data
-        source_table = "processed_urls"
+def save_session_health(health: dict):
+    SESSION_HEALTH_FILE.parent.mkdir(exist_ok=True)
+    tmp_path = SESSION_HEALTH_FILE.with_suffix(".json.tmp")
+    tmp_path.write_text(json.dumps(health, indent=4), encoding="utf-8")
+    os.replace(tmp_path, SESSION_HEALTH_FILE)
+
+def check_session(account: Account, history: RunHistory = None, run_id: int = None):
+    """Runs the account's bot in pre-flight mode and returns its health record."""
+    started = time.monotonic()
+    record = {"checked_at": datetime.now().isoformat()}
+    proc_env = build_child_env(account)
+    if proc_env is None:
+        record.update(status="missing_secrets", duration_s=0.0)
+        return account.name, record
+    session_events = []
+    progress = RunProgress()
+    progress.add_listener(lambda _category, event: session_events.append(event))
+    if history:
+        progress.add_listener(history.listener(run_id))
+    proc = spawn_bot(PROCESS_SCRIPT_PATH, ["--preflight"], proc_env)
+    watchdog = threading.Timer(PREFLIGHT_TIMEOUT, proc.kill)
+    watchdog.start()
+    try:
+        tail = consume_output(account.name, proc, progress)
+    finally:
+        timed_out = not watchdog.is_alive()
+        watchdog.cancel()
+    failures = [e for e in session_events if e["event"] == "session_failed"]
+    if proc.returncode == 0:
+        record["status"] = "ok"
+    elif timed_out:
+        record.update(status="failed", detail=f"timed out after {PREFLIGHT_TIMEOUT}s")
+    elif failures:
+        record.update(status="failed", detail=failures[-1].get("reason"))
     else:
-        print("ℹ️ 'processed_urls' is empty. Falling back to 'to_process'.")
-        response_to_process = supabase.table("to_process").select("*").execute()
-        if response_to_process.data:
-            print("✅ Data found in 'to_process'.")
-            data = response_to_process.data
-            source_table = "to_process"
-        else:
-            print("ℹ️ Both 'processed_urls' and 'to_process' are empty.")
-    return data, source_table
+        record.update(status="failed", detail=tail[-1] if tail else f"exit code {proc.returncode}")
+    record["duration_s"] = round(time.monotonic() - started, 1)
+    return account.name, record
 
-def main():
-    if not SUPABASE_URL or not SUPABASE_KEY:
-        sys.exit("❌ Error: Supabase environment variables not set.")
-    
-    supabase: Client = create_client(SUPABASE_URL, SUPABASE_KEY)
-    all_data, source_table = fetch_data(supabase)
+def preflight():
+    """Checks and refreshes every configured account's session concurrently."""
+    print(f"--- Pre-flight session check ({PREFLIGHT_CONCURRENCY} at a time) ---")
+    health = load_session_health()
+    history = RunHistory()
+    run_id = history.start_run("preflight")
+    accounts = all_accounts(category_accounts())
+    with ThreadPoolExecutor(max_workers=PREFLIGHT_CONCURRENCY) as pool:
+        checks = [pool.submit(check_session, account, history, run_id) for account in accounts]
+        # Reported and saved in the order they finish, so one slow login does not hold back the rest
+        for check in as_completed(checks):
+            name, record = check.result()
+            health[name] = record
+            save_session_health(health)
+            icon = "✅" if record["status"] == "ok" else "❌"
+            detail = f" ({record['detail']})" if record.get("detail") else ""
+            print(f"{icon} {name}: {record['status']} in {record['duration_s']}s{detail}")
+    history.finish_run(run_id)
+    healthy = [a for a in accounts if health[a.name]["status"] == "ok"]
+    failed = [a for a in accounts if health[a.name]["status"] == "failed"]
+    print(f"\n--- Pre-flight finished: {len(healthy)}/{len(accounts)} accounts healthy ---")
+    return 1 if failed else 0
+
+def is_known_bad(health: dict, name: str) -> bool:
+    """True if a recent pre-flight check found the account's session broken."""
+    record = health.get(name)
+    if not record or record.get("status") != "failed":
+        return False
+    checked_at = datetime.fromisoformat(record["checked_at"])
+    return datetime.now() - checked_at < timedelta(minutes=PREFLIGHT_MAX_AGE_MINUTES)
+
+def finish_metrics(metrics: MetricsRegistry, run_started: float):
+    metrics.set("twitterbot_run_duration_seconds", round(time.monotonic() - run_started, 3))
+    metrics.set("twitterbot_last_run_timestamp_seconds", int(time.time()))
+    metrics.write()
+
+def print_profile_summary(category: str, profile_dir: Path):
+    summary_file = profile_dir / SUMMARY_FILE
+    if not summary_file.exists():
+        print(f"⚠️ No profile summary was written for '{category}'.")
+        return
+    lines = summary_file.read_text(encoding="utf-8").splitlines()
+    print(f"🔬 Profile for '{category}' saved to {profile_dir}")
+    print("\n".join(lines[:PROFILE_SUMMARY_LINES]))
+
+def run(full_reconcile: bool = False, profile: bool = False, deadline_minutes: float = None):
+    run_started = time.monotonic()
+    deadline_ts = time.time() + deadline_minutes * 60 if deadline_minutes else None
+    accounts = category_accounts()
+    try:
+        queue = open_queue(SUPABASE_URL, SUPABASE_KEY, WATERMARK_FILE)
+    except ValueError as e:
+        sys.exit(f"❌ Error: {e}")
+
+    history = RunHistory()
+    run_id = history.start_run("run")
+    metrics = MetricsRegistry("twitterbot_controller.prom")
+    profile_root = PROFILE_ROOT / f"run_{run_id}_{datetime.now().strftime('%Y%m%d_%H%M%S')}" if profile else None
+    progress = RunProgress()
+    progress.add_listener(history.listener(run_id))
+    session_health = load_session_health()
+    planner = DeadlinePlanner(deadline_ts, history) if deadline_ts else None
+
+    def start_session(account: Account):
+        proc_env = build_child_env(account)
+        if profile_root:
+            proc_env["BOT_PROFILE_DIR"] = str(profile_root / account.name)
+        if planner:
+            proc_env["BOT_DEADLINE_TS"] = str(deadline_ts - DEADLINE_RESERVE_S)
+            proc_env["BOT_ITEM_ESTIMATE_S"] = str(planner.item_cost(account.name))
+        print(f"🔥 Starting bot for '{account.category}' on account '{account.name}'...")
+        return BotSession(account.name, PROCESS_SCRIPT_PATH, proc_env, progress)
+
+    # Browsers start while the queue is fetched. Which accounts have work is not known yet,
+    # so the guess is the ones that posted most recently; a wrong guess costs one idle launch.
+    used = history.recent_counts()
+    candidates = [account for account in all_accounts(accounts)
+                  if not is_known_bad(session_health, account.name) and account.credentials() is not None]
+    candidates.sort(key=lambda account: -used.get(account.name, 0))
+    sessions = {account.name: start_session(account) for account in candidates[:PIPELINE_SESSIONS]}
+
+    fetch_started = time.monotonic()
+    all_data = queue.fetch(full_reconcile)
+    history.record(run_id, CONTROLLER_CATEGORY, "fetch", round(time.monotonic() - fetch_started, 3))
+    metrics.observe("twitterbot_step_duration_seconds", time.monotonic() - fetch_started,
+                    category=CONTROLLER_CATEGORY, step="fetch")
+    metrics.set("twitterbot_fetched_rows", len(all_data))
 
     # [The debug file saving logic remains unchanged]
     debug_dir = Path("debug_logs")
@@ -48,55 +208,338 @@ def main():
         json.dump(all_data, f, indent=4)
 
     if not all_data:
+        stop_sessions(sessions.values())
+        queue.save()
+        history.finish_run(run_id)
+        finish_metrics(metrics, run_started)
         print("No data to process. Exiting gracefully.")
         sys.exit(0)
 
+    # Invalid rows are rejected here rather than after a full composer cycle, and before dedup,
+    # so a row that can never be posted does not win a duplicate group
+    rows_to_post, rejected = compose_batch(all_data)
+    for row, reason in rejected:
+        progress.handle(row.get("bot") or CONTROLLER_CATEGORY, {
+            "event": "item_skipped", "row_id": row.get("id"), "url": row.get("url"), "reason": f"invalid: {reason}",
+        })
+    if rejected:
+        print(f"🚫 Rejected {len(rejected)} row(s) that cannot be posted.")
+
+    # Dropped duplicates are settled after the loop: handled if the kept row was posted, requeued otherwise
+    dedup_started = time.monotonic()
+    rows_to_post, duplicates = dedupe(rows_to_post)
+    history.record(run_id, CONTROLLER_CATEGORY, "dedup", round(time.monotonic() - dedup_started, 3))
+    if duplicates:
+        print(f"🔁 Dropped {len(duplicates)} duplicate row(s) before posting.")
+
+    # Rows that were not posted or skipped are not acked, so a later run (or another runner) retries them
+    unhandled_rows = []
+    failed_rows = []
+
     categorized_data = {bot: [] for bot in BOT_CATEGORIES}
-    for row in all_data:
+    unknown_tags = set()
+    for row in rows_to_post:
         bot_tag = row.get("bot")
         if bot_tag in categorized_data:
             categorized_data[bot_tag].append(row)
+        else:
+            # Possibly a category of another deployment sharing the table, so the row is not acked
+            unknown_tags.add(str(bot_tag))
+            unhandled_rows.append(row)
+    if unknown_tags:
+        print(f"⚠️ Leaving rows with unknown bot tag(s) {', '.join(sorted(unknown_tags))} queued.")
 
-    print("\n--- Starting Bot Processing Loop ---")
+    # Each category's rows are split across its usable accounts by their remaining daily headroom.
+    # Rows keep the account they were first given, unless it is no longer configured.
+    configured = {account.name for account in all_accounts(accounts)}
+    assignments = {row_id: name for row_id, name in load_assignments().items() if name in configured}
+    work = {}
+    accounts_by_name = {}
     for category in BOT_CATEGORIES:
         if not categorized_data[category]:
             print(f"\nSkipping category '{category}': No data found.")
             continue
+        usable = []
+        for account in accounts[category]:
+            if is_known_bad(session_health, account.name):
+                print(f"Skipping account '{account.name}': pre-flight marked its session as failed.")
+            elif account.credentials() is None:
+                print(f"⚠️ Warning: Missing secrets for {account.env_prefix}. Skipping account '{account.name}'.")
+            else:
+                usable.append(account)
+        if not usable:
+            print(f"\nSkipping category '{category}': no usable account.")
+            unhandled_rows.extend(categorized_data[category])
+            continue
+        shards, overflow = shard(categorized_data[category], usable, used, assignments)
+        if overflow:
+            print(f"⚠️ {len(overflow)} '{category}' row(s) have no room on a usable account. Leaving them queued.")
+            unhandled_rows.extend(overflow)
+        for account in usable:
+            if shards[account.name]:
+                work[account.name] = shards[account.name]
+                accounts_by_name[account.name] = account
+
+    leases = LeaseKeeper(queue)
+    account_order = list(work)
+    if planner:
+        planned = planner.order(work)
+        account_order = [name for name, _ in planned]
+        work.update(planned)
+    # Guessed sessions for accounts without work are let go now
+    idle_sessions = [sessions.pop(name) for name in list(sessions) if name not in work]
+    stop_sessions(idle_sessions, wait=False)
+
+    def let_go(name: str):
+        # A skipped account's warm session would hold a browser, and a PIPELINE_SESSIONS slot, until the end
+        if name in sessions:
+            idle_sessions.append(sessions.pop(name))
+            stop_sessions(idle_sessions[-1:], wait=False)
+
+    print("\n--- Starting Bot Processing Loop ---")
+    for position, name in enumerate(account_order):
+        account = accounts_by_name[name]
+        if planner and not planner.can_start(name):
+            print(f"\n⏳ Skipping account '{name}': not enough time left before the deadline.")
+            unhandled_rows.extend(work[name])
+            let_go(name)
+            continue
 
-        print(f"\n--- Processing category: {category} ---")
-        
-        # --- SIMPLIFIED: Define path to the single, all-in-one script ---
-        process_script_path = os.path.join("common", "process_bot.py")
+        # Claimed just before use, so other runners can take the work this one has not reached
+        claimed = queue.claim(work[name])
+        claimed_ids = {row.get("id") for row in claimed}
+        unhandled_rows.extend(row for row in work[name] if row.get("id") not in claimed_ids)
+        work[name] = claimed
+        if not claimed:
+            print(f"\nSkipping account '{name}': every row is leased by another runner.")
+            let_go(name)
+            continue
+        leases.add(claimed)
 
+        print(f"\n--- Processing category: {account.category} (account '{name}') ---")
+        bot = sessions.pop(name, None) or start_session(account)
+        # The next accounts launch and log in while this one posts
+        for next_name in account_order[position + 1:]:
+            if len(sessions) >= PIPELINE_SESSIONS - 1:
+                break
+            if next_name not in sessions:
+                sessions[next_name] = start_session(accounts_by_name[next_name])
+
+        print(f"Executing bot process for '{name}'...")
+        account_started = time.monotonic()
+        bot.send_batch(work[name])
+        # Backstop for a bot stuck past the deadline (e.g. waiting for an OTP): the job must survive to save state
+        watchdog = threading.Timer(max(0.0, deadline_ts - DEADLINE_RESERVE_S / 2 - time.time()), bot.proc.kill) \
+            if deadline_ts else None
+        if watchdog:
+            watchdog.start()
         try:
-            proc_env = os.environ.copy()
-            proc_env["TWITTER_EMAIL"] = os.getenv(f"{category.upper()}_EMAIL")
-            proc_env["TWITTER_USERNAME"] = os.getenv(f"{category.upper()}_USERNAME")
-            proc_env["TWITTER_PASSWORD"] = os.getenv(f"{category.upper()}_PASSWORD")
-            proc_env["BOT_CATEGORY"] = category
-
-            if not all([proc_env["TWITTER_EMAIL"], proc_env["TWITTER_USERNAME"], proc_env["TWITTER_PASSWORD"]]):
-                print(f"⚠️ Warning: Missing secrets for {category.upper()}. Skipping.")
-                continue
-
-            data_to_pass = json.dumps(categorized_data[category])
-            
-            # --- SIMPLIFIED: Run only the single process script ---
-            print(f"Executing bot process for '{category}'...")
-            subprocess.run(
-                [sys.executable, process_script_path, data_to_pass], 
-                check=True, env=proc_env, capture_output=True, text=True
-            )
-            print(f"✅ Bot process completed for '{category}'.")
-
-        except subprocess.CalledProcessError as e:
-            print(f"❌ An error occurred while processing category '{category}'. The script failed.", file=sys.stderr)
-            print(f"Stdout of failed script:\n{e.stdout}", file=sys.stderr)
-            print(f"Stderr of failed script:\n{e.stderr}", file=sys.stderr)
-            print("Skipping to the next category.")
+            returncode = bot.wait()
+        finally:
+            if watchdog:
+                if not watchdog.is_alive():
+                    print(f"⏳ Bot for '{name}' was stopped at the deadline.", file=sys.stderr)
+                watchdog.cancel()
+        tail = bot.tail
+        history.record(run_id, name, "bot_process", round(time.monotonic() - account_started, 3),
+                       "ok" if returncode == 0 else "failed")
+        metrics.inc("twitterbot_category_runs_total", category=account.category, account=name,
+                    result="ok" if returncode == 0 else "failed")
+
+        if profile_root:
+            print_profile_summary(name, profile_root / name)
+
+        finished = progress.finished_rows(name)
+        deferred = progress.finished_rows(name, ("deferred",))
+        unhandled_rows.extend(row for row in work[name] if str(row.get("id")) in deferred)
+        failed_rows.extend(row for row in work[name] if str(row.get("id")) not in finished | deferred)
+        if returncode == 0:
+            print(f"✅ Bot process completed for '{name}'.")
+        else:
+            print(f"❌ An error occurred while processing account '{name}'. The script failed.", file=sys.stderr)
+            print(f"Last {len(tail)} log lines of failed script:\n" + "\n".join(tail), file=sys.stderr)
+            print("Skipping to the next account.")
+
+    # Sessions warmed for accounts the loop then skipped
+    stop_sessions(list(sessions.values()) + idle_sessions)
+
+    posted_ids = set().union(*(progress.finished_rows(name, ("posted",)) for name in work))
+    for row, kept_row in duplicates:
+        if str(kept_row.get("id")) not in posted_ids:
+            unhandled_rows.append(row)
             continue
+        progress.handle(row.get("bot") or CONTROLLER_CATEGORY, {
+            "event": "item_skipped", "row_id": row.get("id"), "url": row.get("url"),
+            "reason": f"duplicate of row {kept_row.get('id')} ({kept_row.get('bot')})",
+        })
 
+    # Ack only once every category has had its turn
+    leases.stop()
+    unhandled_ids = {row.get("id") for row in unhandled_rows + failed_rows}
+    queue.release(unhandled_rows)
+    queue.fail(failed_rows, progress.failure_reasons())
+    queue.ack([row for row in all_data if row.get("id") not in unhandled_ids], progress.created_ids())
+    progress.forget(row.get("id") for row in all_data)
+    for row in all_data:
+        if row.get("id") not in unhandled_ids:
+            assignments.pop(str(row.get("id")), None)
+    save_assignments(assignments)
+    queue.save()
+    history.finish_run(run_id)
+    finish_metrics(metrics, run_started)
     print("\n--- Workflow finished ---")
 
+def stop_sessions(sessions, wait: bool = True):
+    """Closes the stdin of bots that will get no rows, so they exit, and optionally waits for them."""
+    sessions = list(sessions)
+    for session in sessions:
+        session.close()
+    if wait:
+        for session in sessions:
+            session.wait(PIPELINE_STOP_TIMEOUT)
+
+def start_warm_session(account: Account, progress: RunProgress):
+    """Launches the account's bot in --stdin mode so it logs in once and waits for items."""
+    proc_env = build_child_env(account)
+    if proc_env is None:
+        return None
+    print(f"🔥 Starting warm session for '{account.category}' on account '{account.name}'...")
+    proc = spawn_bot(PROCESS_SCRIPT_PATH, ["--stdin"], proc_env, stdin=subprocess.PIPE)
+    threading.Thread(target=consume_output, args=(account.name, proc, progress), daemon=True).start()
+    return proc
+
+def subscribe():
+    """Streams newly inserted queue rows straight to each category's warm session."""
+    if QUEUE_BACKEND != "supabase":
+        sys.exit("❌ Error: 'subscribe' needs the Supabase queue backend (QUEUE_BACKEND=supabase).")
+
+    # Only this command needs websockets, so the others run without it installed
+    from realtime_queue import RealtimeSubscriber, realtime_url
+    from stream_dispatch import StreamDispatcher
+
+    try:
+        queue = open_queue(SUPABASE_URL, SUPABASE_KEY, WATERMARK_FILE)
+    except ValueError as e:
+        sys.exit(f"❌ Error: {e}")
+    session_health = load_session_health()
+    history = RunHistory()
+    run_id = history.start_run("subscribe")
+    # The dispatcher settles streamed rows itself, so only the latest finished ones are kept here
+    progress = RunProgress(max_finished=ITEM_STATUS_MAX_FINISHED)
+    progress.add_listener(history.listener(run_id))
+    # Streamed rows arrive one at a time, so each category keeps one warm session on its first healthy account
+    accounts = category_accounts()
+    sessions = {}
+    session_accounts = {}
+    dispatcher = StreamDispatcher(
+        {table: queue.for_table(table) for table in SUPABASE_TABLES}, sessions,
+        lambda category: start_warm_session(session_accounts[category], progress),
+    )
+    progress.add_listener(dispatcher.listener)
+    for category in BOT_CATEGORIES:
+        healthy = [account for account in accounts[category] if not is_known_bad(session_health, account.name)]
+        if not healthy:
+            print(f"Skipping warm session for '{category}': pre-flight marked its sessions as failed.")
+            continue
+        session_accounts[category] = healthy[0]
+        sessions[category] = start_warm_session(healthy[0], progress)
+
+    subscriber = RealtimeSubscriber(
+        realtime_url(SUPABASE_URL or "", SUPABASE_KEY or ""), SUPABASE_KEY, SUPABASE_TABLES
+    )
+    try:
+        for table, row in subscriber.listen():
+            dispatcher.dispatch(table, row)
+    except KeyboardInterrupt:
+        print("\n🛑 Subscription stopped.")
+    finally:
+        for session in sessions.values():
+            if session and session.poll() is None:
+                session.stdin.close()
+                session.wait()
+        dispatcher.close()
+        history.finish_run(run_id)
+
+def stats(days: int):
+    """Prints per-step percentiles, daily trends and regressions from the run history."""
+    history = RunHistory()
+    print(f"--- Step timings over the last {days} day(s) ---")
+    print(f"{'category':<12} {'step':<12} {'count':>6} {'p50 (s)':>9} {'p95 (s)':>9}")
+    for category, step, count, p50, p95 in history.step_stats(days):
+        print(f"{category:<12} {step:<12} {count:>6} {p50:>9.2f} {p95:>9.2f}")
+
+    for step in ("session", "posted", "scheduled"):
+        daily = list(history.daily_stats(step, days))
+        if not daily:
+            continue
+        print(f"\n--- Daily '{step}' timings ---")
+        for day, count, p50, p95 in daily:
+            print(f"{day}  n={count:<4} p50={p50:.2f}s  p95={p95:.2f}s")
+
+    print("\n--- Recent runs ---")
+    for run_id, command, started_at, finished_at, posted, skipped, failed in history.recent_runs():
+        status = "finished" if finished_at else "unfinished"
+        print(f"#{run_id:<5} {command:<10} {started_at[:19]}  {status:<10} "
+              f"posted={posted} skipped={skipped} failed={failed}")
+
+    regressions = list(history.regressions())
+    print("\n--- Regressions ---")
+    if not regressions:
+        print("✅ No step is slower than its rolling baseline.")
+    for run_id, category, step, p50, baseline in regressions:
+        print(f"⚠️ Run #{run_id} {category}/{step}: p50 {p50:.2f}s vs baseline {baseline:.2f}s "
+              f"({p50 / baseline:.1f}x)")
+    return 1 if regressions else 0
+
+def import_queue(path: str):
+    """Bulk-loads a JSON array or JSON Lines file of rows into the local SQLite queue."""
+    if not path:
+        sys.exit("❌ Error: 'import' needs the path of a JSON or JSON Lines file.")
+    try:
+        rows = load_import_file(Path(path))
+    except (OSError, ValueError) as e:
+        sys.exit(f"❌ Error: could not read {path}: {e}")
+    queue = SqliteQueue()
+    added = queue.import_rows(rows)
+    print(f"✅ Imported {added} row(s) into {queue.path}.")
+
+def main():
+    parser = argparse.ArgumentParser(description="Fetch queued items and run each category's bot.")
+    parser.add_argument(
+        "command", nargs="?", default="run", choices=["run", "preflight", "subscribe", "stats", "import"],
+        help="'run' posts queued items (default); 'preflight' checks every account's session; "
+             "'subscribe' streams new rows to warm sessions as they are inserted; "
+             "'stats' reports timings and regressions from the run history; "
+             "'import' bulk-loads rows into the local SQLite queue."
+    )
+    parser.add_argument("path", nargs="?", help="JSON or JSON Lines file for 'import'.")
+    parser.add_argument(
+        "--full-reconcile", action="store_true",
+        help="Compare the whole source table against the watermark to catch late writes."
+    )
+    parser.add_argument("--days", type=int, default=30, help="History window for 'stats'.")
+    parser.add_argument(
+        "--profile", action="store_true",
+        help="Run each category under cProfile, Playwright tracing and tracemalloc; "
+             "results go to debug_logs/profiles/."
+    )
+    parser.add_argument(
+        "--deadline", type=float, default=float(os.getenv("RUN_DEADLINE_MINUTES") or 0) or None, metavar="MINUTES",
+        help="Finish 'run' within this many minutes: order work by estimated cost, start no item that "
+             "cannot finish in time and hand the rest back to the queue."
+    )
+    args = parser.parse_args()
+    if args.command == "stats":
+        sys.exit(stats(args.days))
+    if args.command == "preflight":
+        sys.exit(preflight())
+    if args.command == "subscribe":
+        subscribe()
+        return
+    if args.command == "import":
+        import_queue(args.path)
+        return
+    run(full_reconcile=args.full_reconcile, profile=args.profile, deadline_minutes=args.deadline)
+
 if __name__ == "__main__":
     main()
@@ -0,0 +1,9 @@
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+# The common modules import each other by bare name, as they do when process_bot.py runs;
+# main_controller.py sits next to common/
+sys.path.insert(0, str(ROOT / "common"))
+sys.path.insert(1, str(ROOT))
@@ -0,0 +1,69 @@
+import pytest
+
+from accounts import Account, load_accounts, load_assignments, save_assignments, shard
+
+
+def rows(*ids):
+    return [{"id": i} for i in ids]
+
+
+def ids(shard_rows):
+    return [row["id"] for row in shard_rows]
+
+
+def test_load_accounts_falls_back_to_one_account_per_category(tmp_path):
+    accounts = load_accounts(["news"], tmp_path / "missing.json")
+    assert [(a.name, a.env_prefix) for a in accounts["news"]] == [("news", "NEWS")]
+
+
+def test_load_accounts_reads_the_file(tmp_path):
+    path = tmp_path / "accounts.json"
+    path.write_text('{"news": [{"name": "news"}, {"name": "news_2", "daily_limit": 5}]}', encoding="utf-8")
+    accounts = load_accounts(["news", "tech"], path)
+    assert [(a.name, a.env_prefix, a.daily_limit) for a in accounts["news"]][1] == ("news_2", "NEWS_2", 5)
+    assert [a.name for a in accounts["tech"]] == ["tech"]
+
+
+def test_malformed_file_raises(tmp_path):
+    path = tmp_path / "accounts.json"
+    path.write_text("{not json", encoding="utf-8")
+    with pytest.raises(ValueError):
+        load_accounts(["news"], path)
+
+
+def test_shard_spreads_by_headroom_and_keeps_order():
+    accounts = [Account("news", "a", "A", 10), Account("news", "b", "B", 10)]
+    shards, overflow = shard(rows(1, 2, 3, 4, 5), accounts, {"a": 7, "b": 6})
+    assert ids(shards["a"]) == [2, 4]
+    assert ids(shards["b"]) == [1, 3, 5]
+    assert overflow == []
+
+
+def test_shard_overflows_past_every_daily_limit():
+    shards, overflow = shard(rows(1, 2, 3), [Account("news", "a", "A", 2)], {"a": 1})
+    assert ids(shards["a"]) == [1]
+    assert ids(overflow) == [2, 3]
+
+
+def test_assigned_rows_stay_on_their_account():
+    accounts = [Account("news", "a", "A", 10), Account("news", "b", "B", 10)]
+    assignments = {"1": "b", "2": "b"}
+    shards, _ = shard(rows(1, 2, 3), accounts, {"b": 5}, assignments)
+    assert ids(shards["b"]) == [1, 2]
+    assert ids(shards["a"]) == [3]
+    assert assignments == {"1": "b", "2": "b", "3": "a"}
+
+
+def test_assigned_rows_wait_for_an_unusable_account():
+    assignments = {"1": "b"}
+    shards, overflow = shard(rows(1, 2), [Account("news", "a", "A", 10)], {}, assignments)
+    assert ids(shards["a"]) == [2]
+    assert ids(overflow) == [1]
+    assert assignments["1"] == "b"
+
+
+def test_assignments_round_trip(tmp_path):
+    path = tmp_path / "state" / "shard_assignments.json"
+    assert load_assignments(path) == {}
+    save_assignments({"1": "a"}, path)
+    assert load_assignments(path) == {"1": "a"}
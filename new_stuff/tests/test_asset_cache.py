@@ -0,0 +1,105 @@
+import os
+from types import SimpleNamespace
+
+import asset_cache
+from asset_cache import IMMUTABLE_ASSET_PATTERN, AssetCache
+
+BUNDLE = "https://abs.twimg.com/responsive-web/client-web/main.3f2a9c1e.js"
+
+
+class FakeResponse:
+    def __init__(self, status=200, body=b"console.log(1)"):
+        self.status = status
+        self._body = body
+        self.headers = {"content-type": "application/javascript", "set-cookie": "guest_id=1", "date": "today"}
+
+    def body(self):
+        return self._body
+
+
+class FakeRoute:
+    """Records how the cache answered one intercepted request."""
+
+    def __init__(self, url, response=None, error=None):
+        self.request = SimpleNamespace(url=url)
+        self.response = response or FakeResponse()
+        self.error = error
+        self.fetched = False
+        self.outcome = None
+
+    def fetch(self):
+        self.fetched = True
+        if self.error:
+            raise self.error
+        return self.response
+
+    def fulfill(self, **kwargs):
+        self.outcome = ("fulfill", kwargs)
+
+    def continue_(self):
+        self.outcome = ("continue", {})
+
+
+def test_only_content_hashed_bundles_are_cached():
+    assert IMMUTABLE_ASSET_PATTERN.match(BUNDLE)
+    assert IMMUTABLE_ASSET_PATTERN.match("https://abs.twimg.com/responsive-web/client-web/vendor-9a8b7c6d5e.css?v=1")
+    assert not IMMUTABLE_ASSET_PATTERN.match("https://abs.twimg.com/responsive-web/client-web/main.js")
+    assert not IMMUTABLE_ASSET_PATTERN.match("https://x.com/i/api/graphql/3f2a9c1e/HomeTimeline")
+
+
+def test_miss_fetches_and_stores_then_hit_serves_from_disk(tmp_path):
+    cache = AssetCache(tmp_path)
+    miss = FakeRoute(BUNDLE)
+    cache._handle(miss)
+    assert miss.fetched and miss.outcome == ("fulfill", {"response": miss.response})
+
+    hit = FakeRoute(BUNDLE)
+    cache._handle(hit)
+    assert not hit.fetched
+    assert hit.outcome == ("fulfill", {"status": 200, "headers": {"content-type": "application/javascript"},
+                                       "body": b"console.log(1)"})
+    assert (cache.hits, cache.misses, cache.hit_bytes) == (1, 1, len(b"console.log(1)"))
+
+
+def test_failed_responses_are_not_cached(tmp_path):
+    cache = AssetCache(tmp_path)
+    cache._handle(FakeRoute(BUNDLE, FakeResponse(status=404)))
+    route = FakeRoute(BUNDLE)
+    cache._handle(route)
+    assert route.fetched and cache.misses == 2
+
+
+def test_fetch_errors_let_the_browser_make_the_request(tmp_path):
+    route = FakeRoute(BUNDLE, error=RuntimeError("net::ERR_INTERNET_DISCONNECTED"))
+    AssetCache(tmp_path)._handle(route)
+    assert route.outcome == ("continue", {})
+    assert not list(tmp_path.iterdir())
+
+
+def test_prune_evicts_least_recently_used_first(tmp_path):
+    cache = AssetCache(tmp_path, max_bytes=10)
+    for age, name in ((300, "a"), (200, "b"), (100, "c")):
+        url = f"https://abs.twimg.com/{name}.1234abcd.js"
+        cache._handle(FakeRoute(url, FakeResponse(body=b"12345")))
+        body_path, _ = cache._paths(url)
+        stamp = body_path.stat().st_mtime - age
+        os.utime(body_path, (stamp, stamp))
+    # A hit makes the oldest entry the most recently used
+    cache._handle(FakeRoute("https://abs.twimg.com/a.1234abcd.js"))
+
+    cache.prune()
+
+    kept = {name for name in "abc" if cache._paths(f"https://abs.twimg.com/{name}.1234abcd.js")[0].exists()}
+    assert kept == {"a", "c"}
+    assert not cache._paths("https://abs.twimg.com/b.1234abcd.js")[1].exists()
+
+
+def test_disabled_cache_does_not_route(monkeypatch, tmp_path):
+    routes = []
+    context = SimpleNamespace(route=lambda pattern, handler: routes.append(pattern))
+    monkeypatch.setattr(asset_cache, "ASSET_CACHE", False)
+    AssetCache(tmp_path).attach(context)
+    assert routes == []
+    monkeypatch.setattr(asset_cache, "ASSET_CACHE", True)
+    AssetCache(tmp_path).attach(context)
+    assert routes == [IMMUTABLE_ASSET_PATTERN]
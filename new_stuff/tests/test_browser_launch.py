@@ -0,0 +1,67 @@
+import subprocess
+import sys
+from pathlib import Path
+from types import SimpleNamespace
+
+import pytest
+
+import browser_launch
+from browser_launch import LITE_ARGS, LITE_VIEWPORT, NO_ANIMATIONS_SCRIPT, launch_context, report_memory
+from metrics import MetricsRegistry
+
+
+class FakeContext:
+    def __init__(self, **options):
+        self.options = options
+        self.init_scripts = []
+
+    def add_init_script(self, script):
+        self.init_scripts.append(script)
+
+
+def fake_playwright():
+    return SimpleNamespace(chromium=SimpleNamespace(launch_persistent_context=FakeContext))
+
+
+def test_full_profile_keeps_chromium_defaults(monkeypatch, tmp_path):
+    monkeypatch.setattr(browser_launch, "BROWSER_PROFILE", "full")
+    context, launch_s = launch_context(fake_playwright(), tmp_path, {"width": 1280, "height": 800},
+                                       service_workers="block")
+    assert context.options == {"user_data_dir": str(tmp_path), "headless": True,
+                               "viewport": {"width": 1280, "height": 800}, "service_workers": "block"}
+    assert context.init_scripts == [] and launch_s >= 0
+
+
+def test_lite_profile_trims_the_browser(monkeypatch, tmp_path):
+    monkeypatch.setattr(browser_launch, "BROWSER_PROFILE", "lite")
+    context, _ = launch_context(fake_playwright(), tmp_path, {"width": 1280, "height": 800})
+    assert context.options["args"] == LITE_ARGS
+    assert context.options["viewport"] == LITE_VIEWPORT
+    assert context.options["reduced_motion"] == "reduce" and context.options["device_scale_factor"] == 1
+    assert context.init_scripts == [NO_ANIMATIONS_SCRIPT]
+
+
+def test_lite_profile_keeps_explicit_options(monkeypatch, tmp_path):
+    monkeypatch.setattr(browser_launch, "BROWSER_PROFILE", "lite")
+    context, _ = launch_context(fake_playwright(), tmp_path, {"width": 1280, "height": 800},
+                                args=["--proxy-server=local"], reduced_motion="no-preference")
+    assert context.options["args"] == ["--proxy-server=local"]
+    assert context.options["reduced_motion"] == "no-preference"
+
+
+def test_animations_are_shortened_not_removed():
+    # A 0s transition never fires transitionend, which X's dialogs wait for
+    assert "0.001s" in NO_ANIMATIONS_SCRIPT and "animation: none" not in NO_ANIMATIONS_SCRIPT
+
+
+@pytest.mark.skipif(not Path("/proc").is_dir(), reason="reads /proc")
+def test_memory_of_child_processes_is_reported():
+    child = subprocess.Popen([sys.executable, "-c", "import time; time.sleep(30)"])
+    try:
+        metrics = MetricsRegistry("memory.prom")
+        memory_mb = report_memory("launch", metrics, category="news")
+    finally:
+        child.kill()
+        child.wait()
+    assert memory_mb > 1
+    assert metrics.values[("twitterbot_browser_memory_bytes", (("at", "launch"), ("category", "news")))] > 0
@@ -0,0 +1,86 @@
+import pytest
+
+from compose import (
+    MAX_WEIGHTED_LENGTH, URL_WEIGHT, ComposeError, compose, compose_batch, truncate_title, weighted_length,
+)
+
+URL = "https://example.com/a/very/long/path/that/is/much/longer/than/twenty/three/characters"
+
+
+def item(title, url=URL, bot="news"):
+    return {"id": 1, "bot": bot, "title": title, "url": url, "time": "2024-01-01T10:00:00"}
+
+
+def test_urls_weigh_23_whatever_their_length():
+    assert weighted_length(URL) == URL_WEIGHT
+    assert weighted_length(f"see {URL} now") == 4 + URL_WEIGHT + 4
+
+
+def test_wide_characters_weigh_two():
+    assert weighted_length("abc") == 3
+    assert weighted_length("日本") == 4
+    assert weighted_length("🚀") == 2
+
+
+def test_short_titles_are_untouched():
+    assert truncate_title("Short title", 50) == "Short title"
+
+
+def test_truncation_cuts_at_a_word_and_fits():
+    title = "word " * 100
+    shortened = truncate_title(title.strip(), 40)
+    assert shortened.endswith("…")
+    assert weighted_length(shortened) <= 40
+    assert not shortened[:-1].endswith(" ")
+
+
+def test_composed_tweets_fit_for_wide_titles():
+    text = compose(item("日本語のタイトル" * 40))
+    assert weighted_length(text) <= MAX_WEIGHTED_LENGTH
+    assert text.endswith(URL)
+
+
+def test_template_override(monkeypatch):
+    monkeypatch.setenv("TECH_TWEET_TEMPLATE", "{title} → {url}")
+    assert compose(item("Hello", bot="tech")) == f"Hello → {URL}"
+
+
+@pytest.mark.parametrize("row", [
+    item("No Title"),
+    item("Could not fetch preview"),
+    item("Fine title", url=""),
+    dict(item("Fine title"), time=None),
+])
+def test_unpostable_rows_are_rejected(row):
+    with pytest.raises(ComposeError):
+        compose(row)
+
+
+def test_compose_batch_splits_ready_and_rejected():
+    ready, rejected = compose_batch([item("A real headline"), item("No Title")])
+    assert [row["tweet_text"] for row in ready] == [f'"A real headline"\n\n{URL}']
+    assert len(rejected) == 1 and "placeholder" in rejected[0][1]
+
+
+# The default template adds two quotes, a blank line and the URL: 253 weighted characters are left for the title
+TITLE_BUDGET = MAX_WEIGHTED_LENGTH - 4 - URL_WEIGHT
+
+
+@pytest.mark.parametrize("title", ["a" * TITLE_BUDGET, "日" * 126 + "a", "🚀" * 126 + "a"])
+def test_a_title_exactly_at_the_limit_is_kept(title):
+    text = compose(item(title))
+    assert text == f'"{title}"\n\n{URL}'
+    assert weighted_length(text) == MAX_WEIGHTED_LENGTH
+
+
+@pytest.mark.parametrize("title", ["a" * (TITLE_BUDGET + 1), "日" * 127, "🚀" * 126 + "ab"])
+def test_one_over_the_limit_is_truncated(title):
+    text = compose(item(title))
+    assert text.startswith('"') and text.endswith(f'…"\n\n{URL}')
+    assert MAX_WEIGHTED_LENGTH - 2 <= weighted_length(text) <= MAX_WEIGHTED_LENGTH
+
+
+def test_template_without_room_for_a_title_is_rejected(monkeypatch):
+    monkeypatch.setenv("NEWS_TWEET_TEMPLATE", "x" * 250 + " {title} {url}")
+    with pytest.raises(ComposeError, match="characters for the title"):
+        compose(item("Hello"))
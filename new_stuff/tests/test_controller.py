@@ -0,0 +1,106 @@
+import json
+import sys
+import textwrap
+from pathlib import Path
+
+import pytest
+
+import main_controller
+import queue_backend
+from queue_backend import SqliteQueue
+
+COMMON = Path(main_controller.__file__).resolve().parent / "common"
+
+# Stands in for process_bot.py: accounts listed in FAKE_BOT_BROKEN report a failed session,
+# the others report success and "post" every row handed to them on stdin.
+FAKE_BOT = textwrap.dedent(f"""
+    import json, os, sys
+    sys.path.insert(0, {str(COMMON)!r})
+    from events import emit
+
+    account = os.environ["BOT_ACCOUNT"]
+    if account in os.getenv("FAKE_BOT_BROKEN", "").split(","):
+        emit("session_failed", category=account, reason="Login wall: suspicious activity", duration_s=0.1)
+        print("Traceback: the login gave up")
+        sys.exit(1)
+    emit("session_ok", category=account, duration_s=0.1, logged_in=False)
+    line = sys.stdin.readline() if "--stdin" in sys.argv else ""
+    for row in json.loads(line) if line.strip() else []:
+        emit("item_posted", row_id=row["id"], url=row["url"], action="posted", created_id=f"x{{row['id']}}",
+             duration_s=0.1)
+""")
+
+
+@pytest.fixture
+def workdir(tmp_path, monkeypatch):
+    """Runs the controller in an empty directory with a fake bot, a local queue and 'news' and 'tech' secrets."""
+    script = tmp_path / "fake_bot.py"
+    script.write_text(FAKE_BOT, encoding="utf-8")
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(main_controller, "PROCESS_SCRIPT_PATH", str(script))
+    monkeypatch.setattr(queue_backend, "QUEUE_BACKEND", "sqlite")
+    for category in ("NEWS", "TECH"):
+        for field in ("EMAIL", "USERNAME", "PASSWORD"):
+            monkeypatch.setenv(f"{category}_{field}", f"{category.lower()}-{field.lower()}")
+    monkeypatch.setenv("FAKE_BOT_BROKEN", "tech")
+    return tmp_path
+
+
+def test_preflight_records_the_session_failure_the_bot_reports(workdir):
+    assert main_controller.preflight() == 1
+
+    health = json.loads(main_controller.SESSION_HEALTH_FILE.read_text(encoding="utf-8"))
+    assert health["news"]["status"] == "ok"
+    assert health["tech"] == dict(health["tech"], status="failed", detail="Login wall: suspicious activity")
+    assert health["formula"]["status"] == "missing_secrets"
+    assert main_controller.is_known_bad(health, "tech")
+    assert not main_controller.is_known_bad(health, "news")
+
+
+def test_run_leaves_rows_of_bad_sessions_and_unknown_bots_queued(workdir, capsys):
+    main_controller.preflight()
+    SqliteQueue().import_rows([
+        {"url": "https://a.com/story", "bot": "news", "time": "2024-01-01 10:00:00", "title": "Story"},
+        {"url": "https://b.com/gadget", "bot": "tech", "time": "2024-01-01 10:00:00", "title": "Gadget"},
+        {"url": "https://c.com/match", "bot": "sports", "time": "2024-01-01 10:00:00", "title": "Match"},
+    ])
+
+    main_controller.run()
+
+    statuses = {record["url"]: (record["status"], record["created_id"], record["lease_owner"])
+                for record in SqliteQueue().conn.execute("SELECT * FROM queue")}
+    assert statuses == {
+        "https://a.com/story": ("done", "x1", None),
+        "https://b.com/gadget": ("pending", None, None),
+        "https://c.com/match": ("pending", None, None),
+    }
+    assert "unknown bot tag(s) sports" in capsys.readouterr().out
+
+
+def test_sessions_start_before_the_fetch_and_idle_ones_are_let_go(workdir, monkeypatch):
+    monkeypatch.setenv("FAKE_BOT_BROKEN", "")
+    SqliteQueue().import_rows([
+        {"url": "https://a.com/story", "bot": "news", "time": "2024-01-01 10:00:00", "title": "Story"},
+    ])
+    log = []
+
+    class RecordingSession(main_controller.BotSession):
+        def __init__(self, name, *args):
+            log.append(("start", name))
+            super().__init__(name, *args)
+
+        def close(self):
+            log.append(("close", self.name))
+            super().close()
+
+    fetch = SqliteQueue.fetch
+    monkeypatch.setattr(main_controller, "BotSession", RecordingSession)
+    monkeypatch.setattr(SqliteQueue, "fetch", lambda self, *args: log.append(("fetch",)) or fetch(self, *args))
+
+    main_controller.run()
+
+    assert log.index(("fetch",)) == 2
+    assert sorted(log[:2]) == [("start", "news"), ("start", "tech")]
+    # 'tech' got no rows, so its warm session is closed as soon as the rows are sorted
+    assert log.index(("close", "tech")) < log.index(("close", "news"))
+    assert SqliteQueue().conn.execute("SELECT status FROM queue").fetchone()["status"] == "done"
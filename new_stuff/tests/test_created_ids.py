@@ -0,0 +1,84 @@
+import json
+from contextlib import contextmanager
+from types import SimpleNamespace
+
+import pytest
+
+pytest.importorskip("playwright")
+from playwright.sync_api import TimeoutError as PlaywrightTimeoutError
+
+from tweeting_logic import _click_and_capture
+from x_api import XApiRejected, created_scheduled_id, created_tweet_id
+
+
+class FakeResponse:
+    def __init__(self, body, status=200, operation="CreateTweet"):
+        self.url = f"https://x.com/i/api/graphql/abc/{operation}"
+        self.request = SimpleNamespace(method="POST")
+        self.status = status
+        self.body = body
+
+    def json(self):
+        return json.loads(self.body)
+
+
+class FakePage:
+    """Delivers `response` to expect_response once the click inside it has happened."""
+
+    def __init__(self, response=None):
+        self.response = response
+
+    @contextmanager
+    def expect_response(self, predicate, timeout):
+        info = SimpleNamespace()
+        yield info
+        if self.response is None or not predicate(self.response):
+            raise PlaywrightTimeoutError(f"Timeout {timeout}ms exceeded")
+        info.value = self.response
+
+
+class FakeButton:
+    def __init__(self, error=None):
+        self.error = error
+        self.clicks = 0
+
+    def click(self, **_kwargs):
+        if self.error:
+            raise self.error
+        self.clicks += 1
+
+
+def created(rest_id):
+    return json.dumps({"data": {"create_tweet": {"tweet_results": {"result": {"rest_id": rest_id}}}}})
+
+
+def test_create_response_yields_the_post_id():
+    data = _click_and_capture(FakePage(FakeResponse(created("1790"))), FakeButton(), "CreateTweet")
+    assert created_tweet_id(data) == "1790"
+
+
+def test_rejected_create_raises():
+    page = FakePage(FakeResponse(json.dumps({"errors": [{"message": "Status is a duplicate."}]})))
+    with pytest.raises(XApiRejected, match="duplicate"):
+        _click_and_capture(page, FakeButton(), "CreateTweet")
+    with pytest.raises(XApiRejected, match="HTTP 403"):
+        _click_and_capture(FakePage(FakeResponse("<html>", status=403)), FakeButton(), "CreateTweet")
+
+
+@pytest.mark.parametrize("response", [None, FakeResponse("<html>"), FakeResponse(created("1"), operation="Other")])
+def test_clicked_post_without_a_readable_response_is_kept(response):
+    button = FakeButton()
+    assert _click_and_capture(FakePage(response), button, "CreateTweet") is None
+    assert button.clicks == 1
+
+
+def test_failed_click_is_an_error():
+    with pytest.raises(PlaywrightTimeoutError):
+        _click_and_capture(FakePage(), FakeButton(PlaywrightTimeoutError("not clickable")), "CreateTweet")
+
+
+def test_unexpected_response_shapes_give_no_id():
+    assert created_tweet_id({"create_tweet": {"tweet_results": {}}}) is None
+    assert created_tweet_id({"create_tweet": None}) is None
+    assert created_scheduled_id({"tweet": {"rest_id": "55"}}) == "55"
+    assert created_scheduled_id({}) is None
@@ -0,0 +1,45 @@
+import time
+from datetime import datetime, timedelta
+
+from deadline import DEADLINE_RESERVE_S, DEFAULT_COSTS, TIMEZONE, DeadlinePlanner, item_step
+
+
+class FakeHistory:
+    def __init__(self, stats):
+        self.stats = stats
+
+    def step_stats(self, _days):
+        return self.stats
+
+
+def at(offset: timedelta) -> dict:
+    return {"time": (datetime.now(TIMEZONE) + offset).replace(tzinfo=None).isoformat()}
+
+
+def test_item_step_matches_the_post_now_window():
+    assert item_step(at(timedelta(minutes=-30))) == "posted"
+    assert item_step(at(timedelta(minutes=3))) == "posted"
+    assert item_step(at(timedelta(hours=2))) == "scheduled"
+    assert item_step({"time": "not a time"}) == "posted"
+
+
+def test_costs_come_from_history_p95_with_defaults():
+    planner = DeadlinePlanner(time.time() + 3600, FakeHistory([("news", "posted", 10, 5.0, 12.0)]))
+    assert planner.cost("news", "posted") == 12.0
+    assert planner.cost("news", "session") == DEFAULT_COSTS["session"]
+    assert planner.item_cost("news") == max(12.0, DEFAULT_COSTS["scheduled"])
+
+
+def test_can_start_needs_a_session_and_one_item():
+    needed = DEFAULT_COSTS["session"] + max(DEFAULT_COSTS["posted"], DEFAULT_COSTS["scheduled"])
+    assert DeadlinePlanner(time.time() + DEADLINE_RESERVE_S + needed + 30).can_start("news")
+    assert not DeadlinePlanner(time.time() + DEADLINE_RESERVE_S + needed - 30).can_start("news")
+
+
+def test_order_puts_best_throughput_first_and_post_now_items_first():
+    history = FakeHistory([("slow", "session", 5, 300.0, 300.0), ("fast", "session", 5, 5.0, 5.0)])
+    planner = DeadlinePlanner(time.time() + 3600, history)
+    later, now = at(timedelta(hours=3)), at(timedelta(minutes=-10))
+    plan = planner.order({"slow": [dict(now)], "fast": [later, now], "empty": []})
+    assert [category for category, _ in plan] == ["fast", "slow"]
+    assert plan[0][1] == [now, later]
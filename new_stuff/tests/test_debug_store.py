@@ -0,0 +1,83 @@
+import os
+import json
+import time
+from datetime import datetime, timedelta
+
+from debug_store import DebugStore
+
+
+class FakePage:
+    def __init__(self, html):
+        self.html = html
+
+    def screenshot(self, **_kwargs):
+        return f"jpeg of {self.html}".encode()
+
+    def content(self):
+        return self.html
+
+
+def old_run(root, category, days_ago, html):
+    started = datetime.now() - timedelta(days=days_ago)
+    store = DebugStore(root, category, run_id=started.strftime("%Y%m%dT%H%M%S"))
+    store.manifest["started_at"] = started.isoformat()
+    store.record(FakePage(html), "01_home")
+    return store
+
+
+def touch_everything(root):
+    """What a fresh checkout does: every file gets the same, current mtime."""
+    for path in root.rglob("*"):
+        os.utime(path)
+
+
+def blobs(root):
+    return {path.relative_to(root).as_posix() for path in (root / "blobs").glob("*/*")}
+
+
+def test_prune_uses_recorded_ages_not_mtimes(tmp_path):
+    old_run(tmp_path, "news", 30, "<p>ancient</p>")
+    kept = old_run(tmp_path, "news", 1, "<p>recent</p>")
+    touch_everything(tmp_path)
+    time.sleep(0.01)
+
+    store = DebugStore(tmp_path, "news")
+    store.prune(keep_runs=10, keep_days=14)
+
+    assert [path.stem for path in (tmp_path / "runs" / "news").glob("*.json")] == [kept.run_id]
+    assert blobs(tmp_path) == {kept.manifest["steps"]["01_home"][kind] for kind in ("html", "screenshot")}
+
+
+def test_prune_keeps_at_most_keep_runs(tmp_path):
+    runs = [old_run(tmp_path, "news", days, f"<p>{days}</p>") for days in (3, 2, 1)]
+    touch_everything(tmp_path)
+    time.sleep(0.01)
+
+    DebugStore(tmp_path, "news").prune(keep_runs=1, keep_days=14)
+
+    assert [path.stem for path in (tmp_path / "runs" / "news").glob("*.json")] == [runs[-1].run_id]
+    assert len(blobs(tmp_path)) == 2
+
+
+def test_prune_keeps_what_this_process_and_newer_ones_wrote(tmp_path):
+    store = DebugStore(tmp_path, "news")
+    mine = store._put_blob(b"not in a manifest yet", ".jpg")
+    other = DebugStore(tmp_path, "tech")._put_blob(b"another bot's screenshot", ".jpg")
+    orphan = DebugStore(tmp_path, "tech")._put_blob(b"left behind", ".jpg")
+    past = time.time() - 60
+    for rel_path in (mine, orphan):
+        os.utime(tmp_path / rel_path, (past, past))
+
+    store.prune()
+
+    assert blobs(tmp_path) == {mine, other}
+
+
+def test_identical_pages_share_blobs(tmp_path):
+    store = DebugStore(tmp_path, "news")
+    first = store.record(FakePage("<p>same</p>"), "01")
+    second = store.record(FakePage("<p>same</p>"), "02")
+    assert first["html"] == second["html"]
+    assert store.read_html(first["html"]) == "<p>same</p>"
+    assert len(blobs(tmp_path)) == 2
+    assert set(json.loads(store.manifest_path.read_text(encoding="utf-8"))["steps"]) == {"01", "02"}
@@ -0,0 +1,57 @@
+from dedup import dedupe, find_duplicate_groups, normalize_url
+
+
+def row(row_id, bot, url, title, time="2024-01-01T10:00:00"):
+    return {"id": row_id, "bot": bot, "url": url, "title": title, "time": time}
+
+
+def test_normalize_url_drops_tracking_and_mobile_variants():
+    assert normalize_url("https://m.example.com/story/amp/?utm_source=x&b=2&a=1#top") == \
+        normalize_url("http://www.example.com/story?a=1&b=2")
+
+
+def test_normalize_url_unwraps_amp_cache():
+    assert normalize_url("https://example-com.cdn.ampproject.org/c/s/example.com/story") == \
+        normalize_url("https://example.com/story")
+
+
+def test_normalize_url_keeps_real_parameters():
+    assert normalize_url("https://example.com/watch?v=1") != normalize_url("https://example.com/watch?v=2")
+
+
+def test_groups_same_url_and_similar_titles():
+    rows = [
+        row(1, "news", "https://a.com/x?utm_medium=rss", "Ferrari confirm new driver for next season"),
+        row(2, "formula", "https://a.com/x", "Something else entirely"),
+        row(3, "formula", "https://b.com/y", "Ferrari confirm new driver for next season!"),
+        row(4, "tech", "https://c.com/z", "A new phone launches today"),
+    ]
+    assert sorted(sorted(group) for group in find_duplicate_groups(rows)) == [[0, 1, 2]]
+
+
+def test_placeholder_titles_never_match():
+    rows = [row(1, "news", "https://a.com/1", "No Title"), row(2, "tech", "https://b.com/2", "No Title")]
+    assert find_duplicate_groups(rows) == []
+
+
+def test_route_keeps_the_highest_ranked_category():
+    rows = [row(1, "tech", "https://a.com/x", "t"), row(2, "news", "https://a.com/x", "t")]
+    kept, dropped = dedupe(rows, policy="route")
+    assert [r["id"] for r in kept] == [2]
+    assert [(lost["id"], winner["id"]) for lost, winner in dropped] == [(1, 2)]
+
+
+def test_drop_keeps_the_earliest_row():
+    rows = [
+        row(1, "news", "https://a.com/x", "t", time="2024-01-01T12:00:00"),
+        row(2, "tech", "https://a.com/x", "t", time="2024-01-01T09:00:00"),
+    ]
+    kept, dropped = dedupe(rows, policy="drop")
+    assert [r["id"] for r in kept] == [2]
+    assert dropped[0][0]["id"] == 1
+
+
+def test_keep_only_reports():
+    rows = [row(1, "news", "https://a.com/x", "t"), row(2, "tech", "https://a.com/x", "t")]
+    kept, dropped = dedupe(rows, policy="keep")
+    assert kept == rows and dropped == []
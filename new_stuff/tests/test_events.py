@@ -0,0 +1,73 @@
+import json
+import subprocess
+import sys
+
+from events import emit, error_reason, parse_event
+from run_progress import RunProgress, consume_output
+
+
+def test_emit_writes_one_parsable_line(capsys):
+    emit("item_posted", row_id=7, url="https://a.com", created_id=None)
+    line = capsys.readouterr().out
+    assert line.endswith("\n") and line.count("\n") == 1
+    event = parse_event(line)
+    assert event["event"] == "item_posted" and event["row_id"] == 7 and "ts" in event
+
+
+def test_log_lines_are_not_events():
+    assert parse_event("✅ Tweet posted successfully!") is None
+    assert parse_event("{not json") is None
+    assert parse_event('{"row_id": 1}') is None
+    assert parse_event("[1, 2]") is None
+    assert parse_event('  {"event": "session_ok", "duration_s": 1.5}  \n') == {"event": "session_ok", "duration_s": 1.5}
+
+
+def test_error_reason_is_one_line():
+    assert error_reason(ValueError("first line\nsecond line")) == "first line"
+    assert error_reason(TimeoutError()) == "TimeoutError"
+
+
+def test_progress_tracks_items_and_calls_listeners(tmp_path):
+    progress = RunProgress(tmp_path / "status.json")
+    seen = []
+    progress.add_listener(lambda category, event: seen.append((category, event["event"])))
+    progress.handle("news", {"event": "item_started", "row_id": 1, "url": "https://a.com"})
+    progress.handle("news", {"event": "item_posted", "row_id": 1, "action": "posted", "created_id": "99"})
+    progress.handle("news", {"event": "item_failed", "row_id": 2, "reason": "Timeout"})
+    progress.handle("tech", {"event": "item_skipped", "row_id": 3, "reason": "already scheduled"})
+
+    assert seen[0] == ("news", "item_started") and len(seen) == 4
+    assert progress.finished_rows("news") == {"1"}
+    assert progress.finished_rows("tech") == {"3"}
+    assert progress.created_ids() == {"1": "99"}
+    assert progress.failure_reasons() == {"2": "Timeout"}
+    status = json.loads((tmp_path / "status.json").read_text(encoding="utf-8"))
+    assert status["1"]["status"] == "posted" and status["1"]["url"] == "https://a.com"
+
+
+def test_finished_entries_are_bounded(tmp_path):
+    progress = RunProgress(tmp_path / "status.json", max_finished=2)
+    for row_id in range(4):
+        progress.handle("news", {"event": "item_posted", "row_id": row_id})
+    progress.handle("news", {"event": "item_started", "row_id": 9})
+    assert list(progress.items) == ["2", "3", "9"]
+
+
+def test_consume_output_splits_events_from_log_lines(tmp_path):
+    script = (
+        "import json\n"
+        "print('launching browser')\n"
+        "print(json.dumps({'event': 'session_ok', 'duration_s': 1}))\n"
+        "print(json.dumps({'event': 'item_posted', 'row_id': 5}))\n"
+        "print('done')\n"
+    )
+    proc = subprocess.Popen([sys.executable, "-c", script], stdout=subprocess.PIPE, text=True)
+    progress = RunProgress(tmp_path / "status.json")
+    events = []
+    progress.add_listener(lambda _category, event: events.append(event["event"]))
+
+    tail = consume_output("news", proc, progress)
+
+    assert events == ["session_ok", "item_posted"]
+    assert tail == ["launching browser", "done"]
+    assert proc.returncode == 0
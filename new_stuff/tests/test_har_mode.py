@@ -0,0 +1,70 @@
+import json
+from datetime import timedelta
+
+from har_mode import REDACTED, REPLAY_EMAIL, REPLAY_PASSWORD, REPLAY_USERNAME, HarSession, redact_har
+
+
+def write_har(path, entries):
+    path.write_text(json.dumps({"log": {"entries": entries}}), encoding="utf-8")
+
+
+def entry(url, post_text=None, response_text="", mime="application/json"):
+    request = {"url": url, "headers": [{"name": "Cookie", "value": "auth_token=abc"}],
+               "cookies": [{"name": "ct0", "value": "secret"}], "queryString": []}
+    if post_text is not None:
+        request["postData"] = {"text": post_text}
+    return {
+        "request": request,
+        "response": {"headers": [{"name": "set-cookie", "value": "kdt=xyz"}, {"name": "x-rate", "value": "1"}],
+                     "cookies": [], "content": {"mimeType": mime, "text": response_text}},
+    }
+
+
+def test_redact_har_removes_secrets_and_credentials(tmp_path):
+    path = tmp_path / "acct.har"
+    write_har(path, [
+        entry("https://x.com/i/api/onboarding?user=bot_user",
+              post_text=json.dumps({"email": "me@mail.com", "password": "p\"ss"}),
+              response_text='{"screen_name": "bot_user"}'),
+        entry("https://abs.twimg.com/main.js", response_text="var bot_user_handler = 1;", mime="text/javascript"),
+    ])
+    redact_har(path, email="me@mail.com", username="bot_user", password='p"ss')
+    har = json.loads(path.read_text(encoding="utf-8"))
+    login, script = har["log"]["entries"]
+
+    text = json.dumps(login)
+    assert "me@mail.com" not in text and "abc" not in text and "secret" not in text and "xyz" not in text
+    assert login["request"]["url"].endswith(f"user={REPLAY_USERNAME}")
+    assert json.loads(login["request"]["postData"]["text"]) == {"email": REPLAY_EMAIL, "password": REPLAY_PASSWORD}
+    assert REPLAY_USERNAME in login["response"]["content"]["text"]
+    assert {h["name"]: h["value"] for h in login["response"]["headers"]} == {"set-cookie": REDACTED, "x-rate": "1"}
+    # The username is only replaced in data, never inside scripts
+    assert script["response"]["content"]["text"] == "var bot_user_handler = 1;"
+
+
+def test_username_is_replaced_as_a_whole_word(tmp_path):
+    path = tmp_path / "acct.har"
+    write_har(path, [entry("https://x.com/bot", response_text='{"a": "bot", "b": "robot", "c": "bot_2", "d": "@bot"}')])
+    redact_har(path, username="bot")
+    content = json.loads(json.loads(path.read_text(encoding="utf-8"))["log"]["entries"][0]["response"]["content"]["text"])
+    assert content == {"a": REPLAY_USERNAME, "b": "robot", "c": "bot_2", "d": "@bot"}
+
+
+def test_off_mode_changes_nothing(tmp_path):
+    session = HarSession("acct", mode="off", har_dir=tmp_path)
+    assert not session.enabled
+    assert session.launch_options() == {}
+    assert session.profile_dir(tmp_path / "profile") == tmp_path / "profile"
+    assert session.clock_offset() == timedelta(0)
+
+
+def test_replay_moves_the_clock_back_to_the_recording(tmp_path):
+    (tmp_path / "acct.meta.json").write_text(json.dumps({"started_at": 1000.0, "items": [{"id": 7}]}), encoding="utf-8")
+    session = HarSession("acct", mode="replay", har_dir=tmp_path)
+    session.started_at = 4600.0
+    assert session.clock_offset() == timedelta(hours=1)
+    assert session.recorded_items() == [{"id": 7}]
+    profile = session.profile_dir(tmp_path / "profile")
+    assert profile != tmp_path / "profile" and profile.exists()
+    session.finish()
+    assert not profile.exists()
@@ -0,0 +1,104 @@
+import pytest
+
+pytest.importorskip("playwright")
+from playwright.sync_api import TimeoutError as PlaywrightTimeoutError
+
+import login_flow
+from login_flow import detect_screen, run_login
+
+# Screen name -> (selector that renders, body text)
+SCREENS = {
+    "email": (login_flow.EMAIL_SELECTOR, "Sign in to X"),
+    "username": (login_flow.CHALLENGE_SELECTOR, "Enter your phone number or username"),
+    "password": (login_flow.PASSWORD_SELECTOR, "Enter your password"),
+    "otp": (login_flow.CHALLENGE_SELECTOR, "Check your email for your confirmation code"),
+    "home": ('[data-testid="SideNav_NewTweet_Button"]', "Home"),
+}
+
+
+class FakeField:
+    def __init__(self, page, selector):
+        self.page = page
+        self.selector = selector
+
+    @property
+    def first(self):
+        return self
+
+    def is_visible(self):
+        screen = self.page.screen
+        return screen is not None and SCREENS[screen][0] in self.selector.split(", ")
+
+    def fill(self, value):
+        self.page.filled.append((self.page.screen, value))
+
+    def press(self, key):
+        assert key == "Enter"
+        # Submitting moves to the next scripted screen; a stuck page stays put
+        if self.page.script:
+            self.page.screen = self.page.script.pop(0)
+
+    def wait_for(self, **_kwargs):
+        pass
+
+
+class FakeLoginPage:
+    """Shows `script[0]` first and moves to the next screen of the script on every submit."""
+
+    def __init__(self, *script):
+        self.script = list(script)
+        self.screen = self.script.pop(0)
+        self.filled = []
+
+    def goto(self, url, **_kwargs):
+        assert url == login_flow.LOGIN_URL
+
+    def wait_for_selector(self, selector, **_kwargs):
+        if self.screen is None or SCREENS[self.screen][0] not in selector:
+            raise PlaywrightTimeoutError("timeout")
+
+    def locator(self, selector):
+        return FakeField(self, selector)
+
+    def inner_text(self, _selector):
+        return SCREENS[self.screen][1]
+
+
+@pytest.mark.parametrize("screen", ["email", "username", "password", "otp", "home"])
+def test_detect_screen_names_every_screen(screen):
+    assert detect_screen(FakeLoginPage(screen)) == screen
+
+
+def test_detect_screen_times_out_on_an_unknown_page():
+    assert detect_screen(FakeLoginPage(None), timeout_ms=1) is None
+
+
+def test_full_login_fills_each_screen_once():
+    page = FakeLoginPage("email", "username", "password", "otp", "home")
+    logged = []
+    assert run_login(page, "me@mail.com", "me", "secret", log_func=lambda _page, name: logged.append(name),
+                     otp_provider=lambda: "123456")
+    assert page.filled == [("email", "me@mail.com"), ("username", "me"), ("password", "secret"), ("otp", "123456")]
+    assert logged == ["08a_otp_screen_detected"]
+
+
+def test_existing_session_goes_straight_home():
+    page = FakeLoginPage("home")
+    assert run_login(page, "me@mail.com", "me", "secret")
+    assert page.filled == []
+
+
+def test_otp_without_a_code_fails():
+    logged = []
+    page = FakeLoginPage("email", "otp")
+    assert not run_login(page, "me@mail.com", "me", "secret", log_func=lambda _page, name: logged.append(name),
+                         otp_provider=lambda: None)
+    assert logged == ["08a_otp_screen_detected", "98_otp_failure"]
+
+
+def test_a_screen_that_does_not_go_away_fails():
+    logged = []
+    page = FakeLoginPage("password")
+    assert not run_login(page, "me@mail.com", "me", "wrong", log_func=lambda _page, name: logged.append(name))
+    assert page.filled == [("password", "wrong")]
+    assert logged == ["98_login_stuck_password"]
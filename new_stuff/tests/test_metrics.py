@@ -0,0 +1,68 @@
+import re
+from pathlib import Path
+
+import metrics
+from metrics import MetricsRegistry
+
+
+def registry(tmp_path, monkeypatch, **default_labels):
+    monkeypatch.setattr(metrics, "METRICS_TEXTFILE_DIR", str(tmp_path))
+    return MetricsRegistry("bot.prom", **default_labels)
+
+
+def test_counters_and_histograms_carry_over_and_gauges_reset(tmp_path, monkeypatch):
+    first = registry(tmp_path, monkeypatch)
+    first.inc("twitterbot_posts_total", category="news")
+    first.observe("twitterbot_step_duration_seconds", 3, buckets=(1, 5), step="post")
+    first.set("twitterbot_fetched_rows", 12)
+    first.write()
+
+    second = registry(tmp_path, monkeypatch)
+    second.inc("twitterbot_posts_total", 2, category="news")
+    second.observe("twitterbot_step_duration_seconds", 0.5, buckets=(1, 5), step="post")
+    second.write()
+    text = (tmp_path / "bot.prom").read_text(encoding="utf-8")
+
+    assert 'twitterbot_posts_total{category="news"} 3' in text
+    assert 'twitterbot_step_duration_seconds_bucket{le="1",step="post"} 1' in text
+    assert 'twitterbot_step_duration_seconds_bucket{le="5",step="post"} 2' in text
+    assert 'twitterbot_step_duration_seconds_bucket{le="+Inf",step="post"} 2' in text
+    assert 'twitterbot_step_duration_seconds_sum{step="post"} 3.5' in text
+    assert 'twitterbot_step_duration_seconds_count{step="post"} 2' in text
+    assert "twitterbot_fetched_rows" not in text
+    assert list(tmp_path.iterdir()) == [tmp_path / "bot.prom"]
+
+
+def test_reloaded_series_get_the_default_labels(tmp_path, monkeypatch):
+    old = registry(tmp_path, monkeypatch)
+    old.inc("twitterbot_posts_total", category="news")
+    old.write()
+
+    labelled = registry(tmp_path, monkeypatch, account="acct1")
+    labelled.inc("twitterbot_posts_total", category="news")
+    assert 'twitterbot_posts_total{account="acct1",category="news"} 2' in labelled.render()
+
+
+def test_label_values_are_escaped_and_read_back(tmp_path, monkeypatch):
+    first = registry(tmp_path, monkeypatch)
+    first.inc("twitterbot_failures_total", reason='bad "quote"\\path')
+    first.write()
+    assert registry(tmp_path, monkeypatch).values == first.values
+
+
+def test_every_recorded_metric_has_help():
+    root = Path(metrics.__file__).resolve().parent.parent
+    sources = list((root / "common").glob("*.py")) + [root / "main_controller.py"]
+    recorded = set()
+    for source in sources:
+        recorded |= set(re.findall(r'\.(?:inc|set|observe)\(\s*"(twitterbot_\w+)"', source.read_text(encoding="utf-8")))
+    assert "twitterbot_recycles_total" in recorded
+    assert recorded - metrics.METRIC_HELP.keys() == set()
+
+
+def test_no_textfile_dir_writes_nothing(tmp_path, monkeypatch):
+    monkeypatch.setattr(metrics, "METRICS_TEXTFILE_DIR", None)
+    unwritten = MetricsRegistry("bot.prom")
+    unwritten.inc("twitterbot_posts_total")
+    unwritten.write()
+    assert unwritten.path is None
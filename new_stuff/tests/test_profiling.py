@@ -0,0 +1,61 @@
+import pstats
+
+from profiling import SUMMARY_FILE, BotProfiler
+
+
+class FakeTracing:
+    def __init__(self, error=None):
+        self.error = error
+        self.calls = []
+
+    def start(self, **options):
+        self.calls.append(("start", options))
+
+    def stop(self, path):
+        self.calls.append(("stop", path))
+        if self.error:
+            raise self.error
+
+
+class FakeContext:
+    def __init__(self, error=None):
+        self.tracing = FakeTracing(error)
+
+
+def busy_work():
+    return sorted(str(i) for i in range(20000))
+
+
+def test_disabled_profiler_does_nothing():
+    profiler = BotProfiler(None)
+    context = FakeContext()
+    profiler.start()
+    profiler.trace(context)
+    profiler.stop()
+    assert not profiler.enabled and context.tracing.calls == []
+
+
+def test_profile_trace_and_summary_are_written(tmp_path):
+    directory = tmp_path / "profiles" / "news"
+    profiler = BotProfiler(directory)
+    context = FakeContext()
+    profiler.start()
+    profiler.trace(context)
+    busy_work()
+    profiler.stop()
+    profiler.stop()
+
+    assert context.tracing.calls == [("start", {"screenshots": True, "snapshots": True, "sources": False}),
+                                     ("stop", str(directory / "trace.zip"))]
+    assert pstats.Stats(str(directory / "cprofile.pstats")).total_calls > 0
+    summary = (directory / SUMMARY_FILE).read_text(encoding="utf-8")
+    assert summary.startswith("tracemalloc: current")
+    assert "by cumulative time" in summary and "busy_work" in summary
+
+
+def test_a_failed_trace_still_saves_the_profile(tmp_path):
+    profiler = BotProfiler(tmp_path)
+    profiler.start()
+    profiler.trace(FakeContext(RuntimeError("context closed")))
+    profiler.stop()
+    assert (tmp_path / SUMMARY_FILE).exists() and (tmp_path / "cprofile.pstats").exists()
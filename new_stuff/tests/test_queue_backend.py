@@ -0,0 +1,92 @@
+import sqlite3
+
+import pytest
+
+import queue_backend
+from queue_backend import QueueBackend, SqliteQueue
+
+
+@pytest.fixture
+def queue(tmp_path, monkeypatch):
+    monkeypatch.setattr(queue_backend, "RUNNER_ID", "runner-a")
+    db = SqliteQueue(tmp_path / "queue.sqlite3")
+    db.import_rows([{"url": f"https://example.com/{i}", "bot": "news", "time": "2024-01-01T10:00:00",
+                     "title": f"Story {i}"} for i in range(3)])
+    return db
+
+
+def as_runner(monkeypatch, runner_id):
+    monkeypatch.setattr(queue_backend, "RUNNER_ID", runner_id)
+
+
+def statuses(queue):
+    return {record["id"]: (record["status"], record["lease_owner"])
+            for record in queue.conn.execute("SELECT id, status, lease_owner FROM queue")}
+
+
+def test_backend_must_implement_fetch_and_ack():
+    with pytest.raises(TypeError):
+        QueueBackend()
+
+
+def test_leased_rows_are_hidden_from_other_runners(queue, monkeypatch):
+    rows = queue.fetch()
+    assert [row["id"] for row in queue.claim(rows[:2])] == [1, 2]
+
+    as_runner(monkeypatch, "runner-b")
+    assert [row["id"] for row in queue.fetch()] == [3]
+    assert queue.claim(rows) == [rows[2]]
+
+
+def test_expired_leases_can_be_taken_over(queue, monkeypatch):
+    monkeypatch.setattr(queue_backend, "QUEUE_LEASE_SECONDS", -60)
+    rows = queue.claim(queue.fetch())
+
+    as_runner(monkeypatch, "runner-b")
+    assert queue.claim(rows) == rows
+    assert {owner for _, owner in statuses(queue).values()} == {"runner-b"}
+
+
+def test_ack_needs_the_lease(queue, monkeypatch):
+    rows = queue.claim(queue.fetch())
+
+    as_runner(monkeypatch, "runner-b")
+    queue.ack(rows)
+    assert {status for status, _ in statuses(queue).values()} == {"claimed"}
+
+    as_runner(monkeypatch, "runner-a")
+    queue.ack(rows[:1], {"1": "1790000000000000000"})
+    assert statuses(queue)[1] == ("done", None)
+    created = queue.conn.execute("SELECT created_id FROM queue WHERE id = 1").fetchone()["created_id"]
+    assert created == "1790000000000000000"
+
+
+def test_released_rows_are_claimable_again(queue, monkeypatch):
+    rows = queue.claim(queue.fetch())
+    queue.release(rows)
+
+    as_runner(monkeypatch, "runner-b")
+    assert queue.claim(queue.fetch()) == rows
+
+
+def test_failed_rows_retry_until_max_attempts(queue, monkeypatch):
+    monkeypatch.setattr(queue_backend, "QUEUE_MAX_ATTEMPTS", 2)
+    for attempt in range(2):
+        row = [row for row in queue.fetch() if row["id"] == 1]
+        assert row, f"row 1 should be retried on attempt {attempt + 1}"
+        queue.fail(queue.claim(row), {"1": "TimeoutError"})
+    assert 1 not in {row["id"] for row in queue.fetch()}
+    record = queue.conn.execute("SELECT attempts, last_error FROM queue WHERE id = 1").fetchone()
+    assert (record["attempts"], record["last_error"]) == (2, "TimeoutError")
+
+
+def test_older_queue_files_gain_the_new_columns(tmp_path):
+    path = tmp_path / "old.sqlite3"
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE queue (id INTEGER PRIMARY KEY AUTOINCREMENT, url TEXT, bot TEXT, time TEXT, "
+                 "title TEXT, status TEXT NOT NULL DEFAULT 'pending', attempts INTEGER NOT NULL DEFAULT 0, "
+                 "last_error TEXT, updated_at TEXT)")
+    conn.commit()
+    conn.close()
+    columns = {record["name"] for record in SqliteQueue(path).conn.execute("PRAGMA table_info(queue)")}
+    assert set(queue_backend.ADDED_COLUMNS) <= columns
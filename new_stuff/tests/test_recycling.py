@@ -0,0 +1,92 @@
+import pytest
+
+import recycling
+from recycling import SessionRecycler
+
+
+class FakePage:
+    def __init__(self, heap_mb=0):
+        self.heap_mb = heap_mb
+        self.url = "https://x.com/home"
+        self.closed = False
+
+    def evaluate(self, _script):
+        return self.heap_mb * 1024 * 1024
+
+    def goto(self, url, **_kwargs):
+        self.url = url
+
+    def close(self):
+        self.closed = True
+
+    def is_closed(self):
+        return self.closed
+
+
+class FakeContext:
+    def __init__(self):
+        self.closed = False
+
+    def new_page(self):
+        return FakePage()
+
+    def close(self):
+        self.closed = True
+
+
+@pytest.mark.parametrize("items, max_items, memory_mb, max_mb, expected", [
+    (5, 10, 100, 400, ""),
+    (10, 10, 100, 400, "10 items"),
+    (5, 10, 450, 400, "450 MB"),
+    (500, 0, 100, 0, ""),
+])
+def test_over_limit(items, max_items, memory_mb, max_mb, expected):
+    assert SessionRecycler._over_limit(items, max_items, memory_mb, max_mb) == expected
+
+
+@pytest.fixture
+def recycler(monkeypatch):
+    monkeypatch.setattr(recycling, "browser_memory_mb", lambda: 100)
+    monkeypatch.setattr(recycling, "RECYCLE_PAGE_ITEMS", 2)
+    monkeypatch.setattr(recycling, "RECYCLE_CONTEXT_ITEMS", 3)
+    contexts = []
+
+    def launch():
+        contexts.append(FakeContext())
+        return contexts[-1]
+    return SessionRecycler(launch), contexts
+
+
+def test_page_is_replaced_after_its_item_limit(recycler):
+    session, contexts = recycler
+    page = session.new_page()
+    assert session.item_done(page) is page
+    new_page = session.item_done(page)
+    assert new_page is not page and page.closed
+    assert len(contexts) == 1
+
+
+def test_context_is_restarted_after_its_item_limit(recycler, monkeypatch):
+    monkeypatch.setattr(recycling, "RECYCLE_PAGE_ITEMS", 0)
+    session, contexts = recycler
+    page = session.new_page()
+    for _ in range(3):
+        page = session.item_done(page)
+    assert len(contexts) == 2 and contexts[0].closed
+    assert session.context_items == 0
+
+
+def test_context_is_kept_while_other_tabs_are_open(recycler, monkeypatch):
+    monkeypatch.setattr(recycling, "RECYCLE_PAGE_ITEMS", 0)
+    session, contexts = recycler
+    page, _other = session.new_page(), session.new_page()
+    for _ in range(5):
+        page = session.item_done(page)
+    assert len(contexts) == 1
+
+
+def test_heavy_page_is_replaced(recycler):
+    session, _ = recycler
+    page = session.new_page()
+    page.heap_mb = recycling.RECYCLE_PAGE_MB + 1
+    assert session.item_done(page) is not page
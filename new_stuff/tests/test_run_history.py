@@ -0,0 +1,73 @@
+from datetime import datetime, timedelta
+
+from run_history import RunHistory, percentile
+
+
+def seed(history, days_ago, durations, step="session", category="news"):
+    """Inserts a finished run started `days_ago` days back with one timing per duration."""
+    started = (datetime.now() - timedelta(days=days_ago)).isoformat()
+    with history.conn:
+        run_id = history.conn.execute(
+            "INSERT INTO runs (command, started_at, finished_at) VALUES ('run', ?, ?)", (started, started)
+        ).lastrowid
+        history.conn.executemany(
+            "INSERT INTO timings VALUES (?, ?, ?, NULL, ?, 'ok', ?)",
+            [(run_id, category, step, duration, started) for duration in durations],
+        )
+    return run_id
+
+
+def test_percentile_is_nearest_rank():
+    values = list(range(10, 0, -1))
+    assert percentile(values, 50) == 5
+    assert percentile(values, 95) == 10
+    assert percentile([7.5], 95) == 7.5
+
+
+def test_regression_against_the_median_of_earlier_runs(tmp_path):
+    history = RunHistory(tmp_path / "history.sqlite3")
+    for durations in ([1.0, 1.2], [0.9], [1.1, 1.0, 5.0]):
+        seed(history, 1, durations)
+    slow = seed(history, 0, [2.0, 2.4, 2.2])
+    seed(history, 0, [1.0], step="posted")
+
+    assert list(history.regressions(threshold=1.5)) == [(slow, "news", "session", 2.2, 1.0)]
+    assert list(history.regressions(threshold=2.5)) == []
+
+
+def test_no_regression_without_enough_baseline_runs(tmp_path):
+    history = RunHistory(tmp_path / "history.sqlite3")
+    seed(history, 1, [1.0])
+    seed(history, 1, [1.0])
+    seed(history, 0, [10.0])
+    assert list(history.regressions()) == []
+
+
+def test_baseline_only_covers_the_last_runs(tmp_path):
+    history = RunHistory(tmp_path / "history.sqlite3")
+    for _ in range(5):
+        seed(history, 2, [1.0])
+    for _ in range(3):
+        seed(history, 1, [3.0])
+    seed(history, 0, [4.0])
+    assert list(history.regressions(baseline_runs=3)) == []
+    assert len(list(history.regressions(baseline_runs=8))) == 1
+
+
+def test_step_stats_skip_old_timings(tmp_path):
+    history = RunHistory(tmp_path / "history.sqlite3")
+    seed(history, 40, [100.0])
+    seed(history, 1, [1.0, 2.0, 3.0, 4.0])
+    assert list(history.step_stats(days=30)) == [("news", "session", 4, 2.0, 4.0)]
+
+
+def test_old_runs_are_pruned_when_a_run_starts(tmp_path):
+    history = RunHistory(tmp_path / "history.sqlite3")
+    old = seed(history, 120, [1.0, 2.0])
+    kept = seed(history, 10, [1.0])
+
+    run_id = history.start_run("run")
+
+    assert [row[0] for row in history.recent_runs()] == [run_id, kept]
+    assert history.conn.execute("SELECT COUNT(*) FROM timings WHERE run_id = ?", (old,)).fetchone() == (0,)
+    assert history.prune() == 0
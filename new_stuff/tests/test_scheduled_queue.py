@@ -0,0 +1,100 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+pytest.importorskip("playwright")
+from scheduled_queue import ScheduledQueue
+from x_api import XApiRejected
+
+NOON = datetime(2030, 5, 1, 12, 0, tzinfo=timezone.utc)
+
+
+class FakeApi:
+    """Answers FetchScheduledTweets with `entries` and records every other operation."""
+
+    ready = True
+
+    def __init__(self, entries=None, error=None):
+        self.entries = entries or []
+        self.error = error
+        self.calls = []
+
+    def graphql(self, operation, _query_id, variables, method="POST"):
+        self.calls.append((operation, variables))
+        if self.error:
+            raise self.error
+        if operation == "FetchScheduledTweets":
+            return {"viewer": {"scheduled_tweet_list": self.entries}}
+        if operation == "CreateScheduledTweet":
+            return {"tweet": {"rest_id": "new"}}
+        return {}
+
+
+def entry(rest_id, text, when):
+    execute_at = int(when.timestamp() * 1000) if when else None
+    return {"rest_id": rest_id, "tweet_create_request": {"status": text}, "scheduling_info": {"execute_at": execute_at}}
+
+
+def loaded(*entries):
+    queue = ScheduledQueue(FakeApi(list(entries)))
+    assert queue.load()
+    return queue
+
+
+def test_load_indexes_posts_by_url_in_seconds():
+    queue = loaded(entry("1", '"Title"\n\nhttps://a.com/story/ and https://b.com/x', NOON))
+    assert queue.by_url == {
+        "https://a.com/story": [{"id": "1", "execute_at": int(NOON.timestamp())}],
+        "https://b.com/x": [{"id": "1", "execute_at": int(NOON.timestamp())}],
+    }
+
+
+def test_unreadable_queue_is_not_loaded():
+    queue = ScheduledQueue(FakeApi(error=XApiRejected("HTTP 429")))
+    assert not queue.load() and not queue.loaded
+
+
+def test_missing_url_is_created():
+    queue = loaded(entry("1", "https://a.com/other", NOON))
+    assert queue.plan("https://a.com/story", NOON) == ("create", [])
+
+
+@pytest.mark.parametrize("offset_s, action", [(0, "skip"), (59, "skip"), (-59, "skip"), (60, "reschedule")])
+def test_times_within_the_tolerance_are_the_same_slot(offset_s, action):
+    queue = loaded(entry("1", "https://a.com/story", NOON))
+    planned, stale = queue.plan("https://a.com/story/", NOON + timedelta(seconds=offset_s))
+    assert planned == action
+    assert stale == ([] if action == "skip" else ["1"])
+
+
+def test_duplicates_in_the_same_slot_keep_one_copy():
+    queue = loaded(entry("1", "https://a.com/story", NOON), entry("2", "https://a.com/story", NOON),
+                   entry("3", "https://a.com/story", NOON + timedelta(hours=1)))
+    assert queue.plan("https://a.com/story", NOON) == ("skip", ["2", "3"])
+
+
+def test_other_urls_in_the_same_slot_do_not_collide():
+    queue = loaded(entry("1", "https://a.com/one", NOON))
+    assert queue.plan("https://a.com/two", NOON) == ("create", [])
+
+
+def test_past_due_and_undated_copies_are_rescheduled():
+    queue = loaded(entry("1", "https://a.com/story", NOON - timedelta(days=2)),
+                   entry("2", "https://a.com/story", None))
+    assert queue.plan("https://a.com/story", NOON) == ("reschedule", ["1", "2"])
+
+
+def test_posts_scheduled_this_run_are_seen_by_later_items():
+    queue = loaded()
+    assert queue.create("Story https://a.com/story", NOON) == "new"
+    queue.remember("Story https://a.com/later", NOON)
+    assert queue.plan("https://a.com/story", NOON) == ("skip", [])
+    # A post remembered without an id cannot be deleted, so it is never reported as stale
+    assert queue.plan("https://a.com/later", NOON + timedelta(hours=1)) == ("reschedule", [])
+
+
+def test_delete_drops_the_post_from_the_index():
+    queue = loaded(entry("1", "https://a.com/story", NOON - timedelta(days=2)))
+    assert queue.delete("1", "https://a.com/story")
+    assert queue.plan("https://a.com/story", NOON) == ("create", [])
+    assert queue.api.calls[-1] == ("DeleteScheduledTweet", {"scheduled_tweet_id": "1"})
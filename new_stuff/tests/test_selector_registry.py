@@ -0,0 +1,92 @@
+import json
+
+import pytest
+
+from selector_registry import SelectorRegistry
+
+CANDIDATES = {"post_button": ["#new", "#old", "#older"]}
+
+
+class FakeLocator:
+    def __init__(self, page, selector):
+        self.page = page
+        self.parts = [part.strip() for part in selector.split(", ")]
+
+    @property
+    def first(self):
+        return self
+
+    def _matches(self):
+        def present(part):
+            shown = self.page.shown.get(part.removesuffix(":visible"))
+            return shown == "visible" or (shown == "attached" and not part.endswith(":visible"))
+        return [part for part in self.parts if present(part)]
+
+    def wait_for(self, state, timeout):
+        self.page.waits.append((self.parts, state, timeout))
+        if not self._matches():
+            raise TimeoutError(f"Timeout {timeout}ms exceeded")
+
+    def count(self):
+        return len(self._matches())
+
+
+class FakePage:
+    """`shown` maps a selector to 'visible' or 'attached' (in the DOM but hidden)."""
+
+    def __init__(self, **shown):
+        self.shown = {f"#{key}": value for key, value in shown.items()}
+        self.waits = []
+
+    def locator(self, selector):
+        return FakeLocator(self, selector)
+
+
+def registry(tmp_path, cache=None):
+    cache_file = tmp_path / "selector_cache.json"
+    if cache is not None:
+        cache_file.write_text(json.dumps(cache), encoding="utf-8")
+    return SelectorRegistry(cache_file, CANDIDATES)
+
+
+def test_first_matching_candidate_in_order_wins_and_is_remembered(tmp_path):
+    selectors = registry(tmp_path)
+    locator = selectors.locator(FakePage(old="visible", older="visible"), "post_button")
+    assert locator.parts == ["#old:visible"]
+    assert json.loads((tmp_path / "selector_cache.json").read_text(encoding="utf-8")) == {"post_button": "#old"}
+
+
+def test_remembered_candidate_is_waited_on_alone_first(tmp_path):
+    selectors = registry(tmp_path, {"post_button": "#older"})
+    page = FakePage(new="visible", older="visible")
+    assert selectors.locator(page, "post_button").parts == ["#older:visible"]
+    assert page.waits == [(["#older:visible"], "visible", 5000)]
+
+
+def test_stale_remembered_candidate_falls_back_to_the_rest_in_order(tmp_path):
+    selectors = registry(tmp_path, {"post_button": "#older"})
+    page = FakePage(old="visible")
+    assert selectors.locator(page, "post_button", timeout_ms=8000).parts == ["#old:visible"]
+    assert page.waits[0][0] == ["#older:visible"]
+    assert page.waits[1][0] == ["#older:visible", "#new:visible", "#old:visible"]
+    assert selectors.cache == {"post_button": "#old"}
+
+
+def test_hidden_markup_does_not_match_a_visible_lookup(tmp_path):
+    selectors = registry(tmp_path)
+    page = FakePage(new="attached", old="visible")
+    assert selectors.locator(page, "post_button").parts == ["#old:visible"]
+    assert selectors.locator(page, "post_button", state="attached").parts == ["#old"]
+
+
+def test_nothing_matching_raises(tmp_path):
+    with pytest.raises(LookupError, match="post_button"):
+        registry(tmp_path).locator(FakePage(), "post_button", timeout_ms=10)
+    assert not (tmp_path / "selector_cache.json").exists()
+
+
+def test_unknown_cached_selector_is_ignored(tmp_path):
+    selectors = registry(tmp_path, {"post_button": "#gone"})
+    page = FakePage(new="visible")
+    assert selectors.locator(page, "post_button").parts == ["#new:visible"]
+    assert len(page.waits) == 1
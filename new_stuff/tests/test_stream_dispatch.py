@@ -0,0 +1,180 @@
+import io
+import json
+import threading
+from itertools import islice
+
+import pytest
+
+websockets_server = pytest.importorskip("websockets.sync.server")
+
+from queue_backend import QueueBackend
+from realtime_queue import RealtimeSubscriber
+from stream_dispatch import StreamDispatcher
+from watermark import WatermarkStore
+
+TABLES = ["processed_urls", "to_process"]
+
+
+def insert_frame(table, record):
+    return json.dumps({"topic": f"realtime:public:{table}", "event": "postgres_changes", "ref": None,
+                       "payload": {"data": {"type": "INSERT", "table": table, "record": record}}})
+
+
+def row(row_id, bot, url):
+    return {"id": row_id, "bot": bot, "url": url, "title": f"Story number {row_id}", "time": "2024-01-01T10:00:00"}
+
+
+@pytest.fixture
+def realtime_server():
+    """A local stand-in for Supabase Realtime: acknowledges the joins, then sends `frames`."""
+    frames = []
+    joins = []
+
+    def handler(ws):
+        for _ in TABLES:
+            joins.append(json.loads(ws.recv()))
+        for frame in frames:
+            ws.send(frame)
+        for _ in ws:
+            pass
+
+    with websockets_server.serve(handler, "127.0.0.1", 0) as server:
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+        yield f"ws://127.0.0.1:{server.socket.getsockname()[1]}", frames, joins
+        server.shutdown()
+
+
+class FakeQueue(QueueBackend):
+    """One table of a shared queue: rows leased by `taken` belong to another runner."""
+
+    def __init__(self, table, watermarks, taken=()):
+        self.table = table
+        self.watermarks = watermarks
+        self.taken = set(taken)
+        self.calls = []
+
+    def fetch(self, full_reconcile=False):
+        return []
+
+    def claim(self, rows):
+        self.calls.append(("claim", [row["id"] for row in rows]))
+        return [row for row in rows if row["id"] not in self.taken]
+
+    def renew(self, rows):
+        pass
+
+    def release(self, rows):
+        self.calls.append(("release", [row["id"] for row in rows]))
+        self.watermarks.mark_pending(self.table, rows)
+
+    def ack(self, rows, created_ids=None):
+        self.calls.append(("ack", [row["id"] for row in rows], created_ids))
+        self.watermarks.mark_seen(self.table, rows)
+
+    def save(self):
+        self.watermarks.save()
+
+
+def queues(path, taken=()):
+    watermarks = WatermarkStore(path)
+    return {table: FakeQueue(table, watermarks, taken) for table in TABLES}
+
+
+class FakeSession:
+    def __init__(self):
+        self.stdin = io.StringIO()
+        self.returncode = None
+
+    def poll(self):
+        return self.returncode
+
+    def rows(self):
+        return [json.loads(line) for line in self.stdin.getvalue().splitlines()]
+
+
+def test_subscriber_reads_inserts_from_a_local_server(realtime_server):
+    url, frames, joins = realtime_server
+    frames += [
+        "not json",
+        json.dumps({"event": "phx_reply", "payload": {"status": "ok"}}),
+        insert_frame("processed_urls", row(1, "news", "https://a.com/x")),
+        json.dumps({"event": "INSERT", "payload": {"table": "to_process", "record": row(2, "tech", "https://b.com")}}),
+    ]
+    received = list(islice(RealtimeSubscriber(url, "key", TABLES).listen(), 2))
+    assert [(table, r["id"]) for table, r in received] == [("processed_urls", 1), ("to_process", 2)]
+    assert [join["topic"] for join in joins] == ["realtime:public:processed_urls", "realtime:public:to_process"]
+
+
+def test_streamed_rows_are_dispatched_deduplicated_and_marked(realtime_server, tmp_path):
+    url, frames, _ = realtime_server
+    frames += [
+        insert_frame("processed_urls", row(1, "news", "https://a.com/story")),
+        insert_frame("to_process", row(2, "news", "https://www.a.com/story?utm_source=feed")),
+        insert_frame("processed_urls", row(3, "tech", "https://b.com/gadget")),
+        insert_frame("processed_urls", row(4, "sports", "https://c.com/match")),
+    ]
+    table_queues = queues(tmp_path / "watermarks.json")
+    watermarks = table_queues["processed_urls"].watermarks
+    sessions = {"news": FakeSession(), "tech": FakeSession()}
+    dispatcher = StreamDispatcher(table_queues, sessions, restart=lambda category: FakeSession())
+
+    for table, record in islice(RealtimeSubscriber(url, "key", TABLES).listen(), 4):
+        dispatcher.dispatch(table, record)
+
+    assert [r["id"] for r in sessions["news"].rows()] == [1]
+    assert [r["id"] for r in sessions["tech"].rows()] == [3]
+    assert sessions["news"].rows()[0]["tweet_text"].endswith("https://a.com/story")
+    assert table_queues["processed_urls"].calls == [("claim", [1]), ("claim", [3])]
+    assert table_queues["to_process"].calls == []
+    assert watermarks.state["processed_urls"]["pending"] == [1, 3]
+
+    dispatcher.listener("news", {"event": "item_posted", "row_id": 1, "created_id": "99"})
+    dispatcher.listener("tech", {"event": "item_failed", "row_id": 3, "reason": "TimeoutError"})
+    assert table_queues["processed_urls"].calls[2:] == [("ack", [1], {"1": "99"}), ("release", [3])]
+    assert not watermarks.is_new("processed_urls", row(1, "news", "https://a.com/story"))
+    assert watermarks.state["processed_urls"]["pending"] == [3]
+
+    # A failed row stays pending, so it can be handed over again
+    assert dispatcher.dispatch("processed_urls", row(3, "tech", "https://b.com/gadget"))
+    assert dispatcher.in_flight.keys() == {"3"}
+    assert WatermarkStore(tmp_path / "watermarks.json").state["processed_urls"]["pending"] == [3]
+    dispatcher.close()
+    assert table_queues["processed_urls"].calls[-1] == ("release", [3])
+
+
+def test_rows_leased_by_another_runner_are_not_dispatched(tmp_path):
+    session = FakeSession()
+    dispatcher = StreamDispatcher(queues(tmp_path / "wm.json", taken={1}), {"news": session}, restart=None)
+    assert not dispatcher.dispatch("processed_urls", row(1, "news", "https://a.com/1"))
+    assert session.rows() == [] and dispatcher.in_flight == {}
+    dispatcher.close()
+
+
+def test_rows_of_a_dead_session_stay_pending(tmp_path):
+    table_queues = queues(tmp_path / "watermarks.json")
+    watermarks = table_queues["processed_urls"].watermarks
+    dead = FakeSession()
+    replacement = FakeSession()
+    sessions = {"news": dead}
+    dispatcher = StreamDispatcher(table_queues, sessions, restart=lambda category: replacement)
+
+    dispatcher.dispatch("processed_urls", row(1, "news", "https://a.com/1"))
+    dead.returncode = 1
+    dispatcher.dispatch("processed_urls", row(2, "news", "https://a.com/2"))
+
+    assert sessions["news"] is replacement
+    assert dispatcher.in_flight.keys() == {"2"}
+    assert watermarks.state["processed_urls"]["pending"] == [1, 2]
+    assert ("release", [1]) in table_queues["processed_urls"].calls
+    dispatcher.close()
+
+
+def test_recent_urls_are_bounded(tmp_path, monkeypatch):
+    monkeypatch.setattr("stream_dispatch.STREAM_RECENT_URLS", 2)
+    dispatcher = StreamDispatcher(queues(tmp_path / "wm.json"), {"news": FakeSession()}, restart=None)
+    for row_id in range(1, 5):
+        dispatcher.dispatch("processed_urls", row(row_id, "news", f"https://a.com/{row_id}"))
+        dispatcher.listener("news", {"event": "item_posted", "row_id": row_id})
+    assert len(dispatcher.recent_urls) == 2 and dispatcher.in_flight == {}
+    dispatcher.close()
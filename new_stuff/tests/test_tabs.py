@@ -0,0 +1,71 @@
+import os
+from datetime import timedelta
+
+import pytest
+
+pytest.importorskip("playwright")
+# process_bot reads its account from the environment when it is imported
+os.environ.setdefault("BOT_CATEGORY", "news")
+os.environ.setdefault("BOT_ACCOUNT", "news")
+import process_bot
+
+
+class FakePage:
+    def __init__(self, name):
+        self.name = name
+
+    def wait_for_timeout(self, _ms):
+        pass
+
+
+@pytest.fixture
+def lanes(monkeypatch):
+    """Replaces item processing with short yielded waits and records (page, row id) in finishing order."""
+    done, snapshots = [], []
+
+    def fake_steps(page, item, index, api, scheduled, log_func=None):
+        yield item.get("wait", 0.001)
+        if item.get("fails"):
+            raise RuntimeError("composer did not open")
+        done.append((page.name, item["id"]))
+
+    monkeypatch.setattr(process_bot, "process_item_steps", fake_steps)
+    monkeypatch.setattr(process_bot, "snapshot_page", lambda page, name: snapshots.append((page.name, name)))
+    monkeypatch.setattr(process_bot, "BOT_DEADLINE_TS", 0)
+    return done, snapshots
+
+
+def item(row_id, minutes_from_now, **extra):
+    when = process_bot.current_ist() + timedelta(minutes=minutes_from_now)
+    return {"id": row_id, "url": f"https://a.com/{row_id}", "time": when.strftime("%Y-%m-%d %H:%M:%S"), **extra}
+
+
+def test_post_now_items_stay_in_order_on_the_first_tab(lanes):
+    done, _ = lanes
+    items = [item(1, -10), item(2, 600, wait=0.05), item(3, -5), item(4, 600, wait=0.05), item(5, 0)]
+    assert [process_bot.is_post_now(i) for i in items] == [True, False, True, False, True]
+    process_bot.run_tabs([FakePage("tab1"), FakePage("tab2")], items, api=None, scheduled=None)
+
+    assert [row_id for page, row_id in done if page == "tab1" and row_id in (1, 3, 5)] == [1, 3, 5]
+    assert sorted(row_id for _, row_id in done) == [1, 2, 3, 4, 5]
+    # While the first tab works through post-now items, the second takes scheduled ones
+    assert ("tab2", 2) in done
+
+
+def test_a_failed_item_does_not_stop_the_other_lanes(lanes):
+    done, snapshots = lanes
+    items = [item(1, 600, fails=True), item(2, 600), item(3, 600)]
+    process_bot.run_tabs([FakePage("tab1"), FakePage("tab2")], items, api=None, scheduled=None)
+
+    assert sorted(row_id for _, row_id in done) == [2, 3]
+    assert snapshots == [("tab1", "98_tab_1_item_1_failure")]
+
+
+def test_items_are_deferred_once_the_deadline_is_near(lanes, monkeypatch, capsys):
+    done, _ = lanes
+    monkeypatch.setattr(process_bot, "deadline_reached", lambda: True)
+    process_bot.run_tabs([FakePage("tab1"), FakePage("tab2")], [item(1, -1), item(2, 600)], api=None, scheduled=None)
+
+    assert done == []
+    deferred = [line for line in capsys.readouterr().out.splitlines() if '"item_deferred"' in line]
+    assert len(deferred) == 2
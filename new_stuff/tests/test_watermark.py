@@ -0,0 +1,107 @@
+import re
+
+from watermark import WatermarkStore
+
+
+class FakeQuery:
+    """The slice of the Supabase query builder WatermarkStore uses, over an in-memory table."""
+
+    def __init__(self, rows, columns):
+        self.rows = rows
+        self.columns = columns
+
+    def or_(self, filters):
+        conditions = re.findall(r'(\w+)\.(gt|in)\.("[^"]*"|\([^)]*\)|[^,]+)', filters)
+
+        def matches(row):
+            for column, op, value in conditions:
+                if op == "in":
+                    if row[column] in {int(v) for v in value.strip("()").split(",")}:
+                        return True
+                elif column == "time":
+                    if row[column] > value.strip('"'):
+                        return True
+                elif row[column] > int(value):
+                    return True
+            return False
+        return FakeQuery([row for row in self.rows if matches(row)], self.columns)
+
+    def in_(self, column, values):
+        return FakeQuery([row for row in self.rows if row[column] in values], self.columns)
+
+    def order(self, column):
+        return FakeQuery(sorted(self.rows, key=lambda row: row[column]), self.columns)
+
+    def execute(self):
+        keys = None if self.columns == "*" else self.columns.split(",")
+        self.data = [{k: row[k] for k in keys} if keys else dict(row) for row in self.rows]
+        return self
+
+
+class FakeSupabase:
+    def __init__(self, rows):
+        self.rows = rows
+
+    def table(self, _name):
+        return self
+
+    def select(self, columns):
+        return FakeQuery(self.rows, columns)
+
+
+def rows(*ids):
+    return [{"id": i, "time": f"2024-01-01T00:00:{i:02d}", "url": f"https://example.com/{i}"} for i in ids]
+
+
+def test_first_fetch_reconciles_everything(tmp_path):
+    store = WatermarkStore(tmp_path / "wm.json")
+    fetched = store.fetch(FakeSupabase(rows(1, 2, 3)), "processed_urls")
+    assert [row["id"] for row in fetched] == [1, 2, 3]
+
+
+def test_seen_rows_are_not_fetched_again(tmp_path):
+    supabase = FakeSupabase(rows(1, 2, 3))
+    store = WatermarkStore(tmp_path / "wm.json")
+    store.mark_seen("processed_urls", store.fetch(supabase, "processed_urls"))
+    supabase.rows += rows(4)
+    assert [row["id"] for row in store.fetch(supabase, "processed_urls")] == [4]
+
+
+def test_pending_rows_come_back_behind_the_mark(tmp_path):
+    supabase = FakeSupabase(rows(1, 2, 3))
+    store = WatermarkStore(tmp_path / "wm.json")
+    fetched = store.fetch(supabase, "processed_urls")
+    store.mark_pending("processed_urls", [fetched[1]])
+    store.mark_seen("processed_urls", [fetched[0], fetched[2]])
+    assert [row["id"] for row in store.fetch(supabase, "processed_urls")] == [2]
+
+    store.mark_seen("processed_urls", [fetched[1]])
+    assert store.fetch(supabase, "processed_urls") == []
+
+
+def test_changed_time_makes_a_row_new_again(tmp_path):
+    store = WatermarkStore(tmp_path / "wm.json")
+    store.mark_seen("to_process", rows(5))
+    row = rows(5)[0]
+    assert not store.is_new("to_process", row)
+    assert store.is_new("to_process", dict(row, time="2024-02-01T00:00:00"))
+
+
+def test_state_survives_a_save(tmp_path):
+    path = tmp_path / "state" / "wm.json"
+    store = WatermarkStore(path)
+    store.mark_seen("processed_urls", rows(1, 2))
+    store.mark_pending("processed_urls", rows(3))
+    store.save()
+    reloaded = WatermarkStore(path)
+    assert not reloaded.is_new("processed_urls", rows(2)[0])
+    assert reloaded.is_new("processed_urls", rows(3)[0])
+
+
+def test_seen_map_is_bounded(tmp_path, monkeypatch):
+    monkeypatch.setattr("watermark.SEEN_ROWS_LIMIT", 2)
+    store = WatermarkStore(tmp_path / "wm.json")
+    store.mark_seen("processed_urls", rows(1, 2, 3, 4))
+    state = store.state["processed_urls"]
+    assert sorted(state["seen"], key=int) == ["3", "4"]
+    assert not store.is_new("processed_urls", rows(1)[0])
@@ -0,0 +1,139 @@
+import json
+import threading
+import urllib.error
+import urllib.request
+from http.server import BaseHTTPRequestHandler, HTTPServer
+
+import pytest
+
+pytest.importorskip("playwright")
+from playwright.sync_api import Error as PlaywrightError
+
+import tweeting_logic
+import x_api
+from x_api import XApi, XApiError, XApiRejected
+
+
+class StandInAPI(BaseHTTPRequestHandler):
+    """Answers every GraphQL request with the server's next canned (status, body)."""
+
+    def do_POST(self):
+        request = json.loads(self.rfile.read(int(self.headers["content-length"])))
+        self.server.requests.append((self.path, {k.lower(): v for k, v in self.headers.items()}, request))
+        status, body = self.server.replies.pop(0)
+        self.send_response(status)
+        self.end_headers()
+        self.wfile.write(body.encode())
+
+    def log_message(self, *_args):
+        pass
+
+
+@pytest.fixture
+def api_server(monkeypatch):
+    server = HTTPServer(("127.0.0.1", 0), StandInAPI)
+    server.requests, server.replies = [], []
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    monkeypatch.setattr(x_api, "API_BASE_URL", f"http://127.0.0.1:{server.server_port}/graphql")
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+class StandInPage:
+    """Does what _FETCH_SCRIPT does in the browser: sends the request with the ct0 cookie as CSRF token."""
+
+    url = "https://x.com/home"
+
+    def __init__(self, fail=None):
+        self.fail = fail
+        self.visited = []
+
+    def on(self, _event, _handler):
+        pass
+
+    def goto(self, url, **_kwargs):
+        self.visited.append(url)
+
+    def evaluate(self, _script, args):
+        if self.fail:
+            raise PlaywrightError(self.fail)
+        headers = dict(args["headers"], **{"content-type": "application/json", "x-csrf-token": "ct0-token"})
+        request = urllib.request.Request(args["url"], data=args["body"].encode(), headers=headers,
+                                         method=args["method"])
+        try:
+            with urllib.request.urlopen(request) as response:
+                return {"status": response.status, "text": response.read().decode()}
+        except urllib.error.HTTPError as e:
+            return {"status": e.code, "text": e.read().decode()}
+
+
+def ready_api(page):
+    api = XApi(page)
+    api.authorization = "Bearer test"
+    return api
+
+
+def created(rest_id):
+    return json.dumps({"data": {"create_tweet": {"tweet_results": {"result": {"rest_id": rest_id}}}}})
+
+
+def test_create_tweet_returns_the_new_id(api_server):
+    api_server.replies.append((200, created("1234")))
+    assert ready_api(StandInPage()).create_tweet("hello") == "1234"
+
+    path, headers, request = api_server.requests[0]
+    assert path == f"/graphql/{x_api.CREATE_TWEET_QUERY_ID}/CreateTweet"
+    assert headers["authorization"] == "Bearer test" and headers["x-csrf-token"] == "ct0-token"
+    assert request["variables"]["tweet_text"] == "hello"
+
+
+def test_errors_without_data_are_a_rejection(api_server):
+    api_server.replies.append((200, json.dumps({"errors": [{"message": "Duplicate"}]})))
+    with pytest.raises(XApiRejected, match="Duplicate"):
+        ready_api(StandInPage()).create_tweet("hello")
+
+    api_server.replies.append((403, "<html>forbidden</html>"))
+    with pytest.raises(XApiRejected, match="403"):
+        ready_api(StandInPage()).create_tweet("hello")
+
+
+def test_unreadable_success_is_not_a_rejection(api_server):
+    api_server.replies.append((200, "<html>oops</html>"))
+    with pytest.raises(XApiError) as error:
+        ready_api(StandInPage()).create_tweet("hello")
+    assert not isinstance(error.value, XApiRejected)
+
+
+@pytest.mark.parametrize("message", ["TypeError: Failed to fetch", "Target page, context or browser has been closed"])
+def test_page_errors_are_a_rejection(message):
+    with pytest.raises(XApiRejected, match="could not be sent"):
+        ready_api(StandInPage(fail=message)).create_tweet("hello")
+
+
+class FakeLocator:
+    def __init__(self, filled):
+        self.filled = filled
+
+    def fill(self, text):
+        self.filled.append(text)
+
+
+def test_rejected_direct_post_falls_back_to_the_composer(api_server, monkeypatch):
+    filled = []
+    monkeypatch.setattr(tweeting_logic, "POSTING_BACKEND", "api")
+    monkeypatch.setattr(tweeting_logic.SELECTORS, "locator", lambda page, name, **_kw: FakeLocator(filled))
+    api_server.replies.append((200, json.dumps({"errors": [{"message": "Rate limited"}]})))
+    page = StandInPage()
+
+    steps = tweeting_logic.post_now_steps(page, "hello", lambda *_args: None, "7", ready_api(page))
+    assert next(steps) == 3
+    assert page.visited == ["https://x.com/home"] and filled == ["hello"]
+
+
+def test_accepted_direct_post_does_not_touch_the_composer(api_server, monkeypatch):
+    monkeypatch.setattr(tweeting_logic, "POSTING_BACKEND", "api")
+    api_server.replies.append((200, created("55")))
+    page = StandInPage()
+    assert tweeting_logic.post_now(page, "hello", lambda *_args: None, "7", ready_api(page)) == "55"
+    assert page.visited == []